@@ -0,0 +1,239 @@
+"""
+Backtest historique des signaux RSI / divergence du screener.
+
+Rejoue les fenêtres de bougies d'un répertoire au format du CandleStore
+(un .npz par (instrument, granularité), voir candle_store.save_window) et
+émet, pour chaque bougie, le RSI et le code de divergence qu'aurait affichés
+le screener à la clôture de cette bougie, puis le rendement à N bougies.
+
+Historique : le store du scan ne garde que les fenêtres du scan (quelques
+centaines de bougies par TF) et un fetch complet peut y remplacer une
+fenêtre. Le backtest lit donc un répertoire dédié (RSI_HISTORY_DIR,
+.candle_history par défaut), rempli par --since : l'historique OANDA de
+chaque (paire, TF) y est téléchargé depuis la date donnée, en pages de
+5000 bougies (identifiants OANDA_ACCESS_TOKEN / OANDA_ENVIRONMENT de
+l'environnement ; ~7 pages par paire pour 5 ans de H1). Relancée, la
+commande ne demande que les bougies postérieures au dernier téléchargement.
+
+- RSI : récurrence de Wilder sur tout l'historique (indicators.wilder_rsi),
+  un seul passage. Le screener recalcule le RSI sur sa fenêtre de fetch :
+  les valeurs diffèrent pendant la période de chauffe puis convergent.
+- Divergences : divergence.rolling_divergence — mêmes règles que le scan
+  (lookback, distance, prominence 0.5·std, seuils de prix par instrument),
+  évaluées en glissant sans rappeler find_peaks à chaque bougie.
+- Résultat : un fichier .npz compressé au format long (une ligne par
+  bougie : instrument, TF, horodatage, RSI float32, signal int8, rendements
+  float32) et un résumé CSV par (instrument, TF) : nombre de signaux,
+  taux de réussite et rendement moyen orienté par horizon.
+
+    python backtest.py --since 2019-01-01 --timeframes H1 H4 --out backtest.npz
+    python backtest.py --store .candle_store    # fenêtres du scan, sans téléchargement
+"""
+import argparse
+import concurrent.futures
+import glob
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from candle_store import CandleStore, load_window
+from divergence import DIVERGENCE_LOOKBACK, DIVERGENCE_PEAK_DISTANCE, price_delta, rolling_divergence
+from indicators import wilder_rsi
+from scan_engine import (
+    ASSETS, OANDA_ACCESS_TOKEN, OANDA_ACCOUNT_ID, OANDA_ENVIRONMENT, configure, fetch_candle_history,
+)
+from scan_result import DIV_BEAR, DIV_BULL
+
+logger = logging.getLogger("rsi_screener")
+
+HORIZONS    = (5, 10, 20)
+HISTORY_DIR = os.environ.get("RSI_HISTORY_DIR", ".candle_history")
+
+
+def load_history(store_dir, since, timeframes=('H1', 'H4'), pairs=None):
+    """
+    Télécharge dans `store_dir` (format CandleStore) l'historique OANDA de
+    chaque (paire, TF) depuis `since`. Une fenêtre stockée qui remonte déjà à
+    `since` n'est complétée qu'à partir de sa dernière bougie. Retourne le
+    nombre de bougies stockées par (paire, TF) ; une clé en échec est omise.
+    """
+    since = pd.Timestamp(since)
+    since = since.tz_localize('UTC') if since.tzinfo is None else since.tz_convert('UTC')
+    store = CandleStore(store_dir)
+    sizes = {}
+    for pair in (pairs or ASSETS):
+        for timeframe_key in timeframes:
+            key     = (pair, timeframe_key)
+            stored  = store.get(key)
+            start   = since if stored is None or stored.index[0] > since else stored.index[-1]
+            candles = fetch_candle_history(pair, timeframe_key, start)
+            if candles is None:
+                logger.warning("History download failed for %s %s", pair, timeframe_key)
+                continue
+            window     = store.merge(key, candles, None)
+            sizes[key] = 0 if window is None else len(window)
+    return sizes
+
+
+def store_entries(store_dir, timeframes):
+    """Fichiers (chemin, paire, TF) du store pour les timeframes demandés."""
+    entries = []
+    for path in sorted(glob.glob(os.path.join(store_dir, "*.npz"))):
+        stem = os.path.basename(path)[:-len(".npz")]
+        if stem.startswith(".tmp_") or "_" not in stem:
+            continue
+        instrument, timeframe_key = stem.rsplit("_", 1)
+        if timeframe_key in timeframes:
+            entries.append((path, instrument.replace("_", "/", 1), timeframe_key))
+    return entries
+
+
+def forward_returns(closes, horizon):
+    """Rendement close[t+h] / close[t] - 1, NaN sur les h dernières bougies."""
+    out = np.full(len(closes), np.nan)
+    if len(closes) > horizon:
+        out[:-horizon] = closes[horizon:] / closes[:-horizon] - 1
+    return out
+
+
+def signal_onsets(codes):
+    """Première bougie de chaque série de signaux identiques (un signal reste visible plusieurs bougies)."""
+    previous = np.concatenate(([0], codes[:-1]))
+    return (codes != 0) & (codes != previous)
+
+
+def backtest_series(window, pair, timeframe_key, horizons=HORIZONS):
+    """Colonnes du backtest d'une série : time_ns, rsi, signal, fwd_<h>."""
+    closes = window['Close'].to_numpy(dtype=np.float64)
+    rsi    = wilder_rsi(closes)
+    codes  = rolling_divergence(
+        closes, rsi,
+        DIVERGENCE_LOOKBACK.get(timeframe_key, 30),
+        DIVERGENCE_PEAK_DISTANCE.get(timeframe_key, 5),
+        price_delta(pair),
+    )
+    columns = {
+        'time_ns': window.index.as_unit('ns').asi8,
+        'rsi':     rsi.astype(np.float32),
+        'signal':  codes,
+    }
+    for h in horizons:
+        columns[f'fwd_{h}'] = forward_returns(closes, h).astype(np.float32)
+    return columns
+
+
+def summarize(pair, timeframe_key, columns, horizons=HORIZONS):
+    """Une ligne de résumé : signaux déclenchés et issue orientée par horizon."""
+    codes  = columns['signal']
+    onsets = signal_onsets(codes)
+    row    = {
+        'pair':     pair,
+        'tf':       timeframe_key,
+        'bars':     len(codes),
+        'bull':     int(np.count_nonzero(onsets & (codes == DIV_BULL))),
+        'bear':     int(np.count_nonzero(onsets & (codes == DIV_BEAR))),
+    }
+    direction = codes[onsets].astype(np.float64)   # +1 haussière, -1 baissière
+    for h in horizons:
+        signed = columns[f'fwd_{h}'][onsets] * direction
+        signed = signed[~np.isnan(signed)]
+        row[f'hit_{h}']  = round(float(np.mean(signed > 0)), 4) if signed.size else None
+        row[f'mean_{h}'] = round(float(np.mean(signed)), 6) if signed.size else None
+    return row
+
+
+def _run_entry(entry):
+    path, pair, timeframe_key = entry
+    window = load_window(path)
+    if window is None or window.empty:
+        return entry, None, None
+    columns = backtest_series(window, pair, timeframe_key)
+    return entry, columns, summarize(pair, timeframe_key, columns)
+
+
+def run_backtest(store_dir, timeframes=('H1', 'H4'), out_path="backtest.npz", workers=None):
+    """
+    Backtest de tout l'univers du store, une série par process (CPU-bound).
+    Écrit `out_path` (.npz) et le résumé `<out_path>.csv` ; retourne le résumé.
+    """
+    entries = store_entries(store_dir, timeframes)
+    if not entries:
+        raise FileNotFoundError(
+            f"Aucune fenêtre {'/'.join(timeframes)} dans {store_dir} "
+            "(--since pour télécharger l'historique)"
+        )
+
+    instruments = sorted({pair for _, pair, _ in entries})
+    tf_names    = list(timeframes)
+    parts       = []
+    summary     = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        for (_, pair, timeframe_key), columns, row in executor.map(_run_entry, entries):
+            if columns is None:
+                logger.warning("Empty candle window for %s %s", pair, timeframe_key)
+                continue
+            n = len(columns['signal'])
+            columns['instrument'] = np.full(n, instruments.index(pair), dtype=np.int16)
+            columns['tf']         = np.full(n, tf_names.index(timeframe_key), dtype=np.int8)
+            parts.append(columns)
+            summary.append(row)
+    if not parts:
+        raise ValueError(f"Toutes les fenêtres {'/'.join(timeframes)} de {store_dir} sont vides")
+
+    table = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    np.savez_compressed(
+        out_path, instruments=np.array(instruments), timeframes=np.array(tf_names), **table
+    )
+    summary = pd.DataFrame(summary)
+    summary.to_csv(os.path.splitext(out_path)[0] + ".csv", index=False)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest des signaux RSI / divergence sur l'historique stocké")
+    parser.add_argument("--store", default=HISTORY_DIR,
+                        help="répertoire des fenêtres de bougies (.npz au format du CandleStore)")
+    parser.add_argument("--since", type=pd.Timestamp, default=None,
+                        help="date (ex. 2019-01-01) : télécharge d'abord l'historique OANDA depuis là")
+    parser.add_argument("--timeframes", nargs="+", default=["H1", "H4"])
+    parser.add_argument("--out", default="backtest.npz", help="fichier résultat (.npz ; résumé en .csv)")
+    parser.add_argument("--workers", type=int, default=None, help="process (défaut : nb de cœurs)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.WARNING,
+        format='%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+    )
+    if args.since is not None:
+        if not OANDA_ACCESS_TOKEN:
+            parser.error("OANDA_ACCESS_TOKEN absent de l'environnement (requis par --since)")
+        try:
+            configure(OANDA_ACCESS_TOKEN, OANDA_ENVIRONMENT, OANDA_ACCOUNT_ID)
+        except ValueError as e:
+            parser.error(str(e))
+        t0    = time.perf_counter()
+        sizes = load_history(args.store, args.since, args.timeframes)
+        print(
+            f"Historique : {len(sizes)} séries, {sum(sizes.values())} bougies dans {args.store} "
+            f"en {time.perf_counter() - t0:.1f} s"
+        )
+
+    t0 = time.perf_counter()
+    try:
+        summary = run_backtest(args.store, args.timeframes, args.out, args.workers)
+    except (FileNotFoundError, ValueError) as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - t0
+    with pd.option_context("display.width", 200, "display.max_rows", 500):
+        print(summary.to_string(index=False))
+    print(
+        f"{len(summary)} séries, {int(summary['bars'].sum())} bougies en {elapsed:.1f} s "
+        f"→ {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
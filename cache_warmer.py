@@ -0,0 +1,123 @@
+"""
+Préchauffage du cache de bougies en arrière-plan, calé sur les clôtures.
+
+Sans préchauffage, la première session après une clôture (ou après
+l'expiration du cache) paie tout le fetch du scan. Le CacheWarmer est un
+thread unique par process qui se réveille peu après la prochaine clôture
+possible d'une cellule (paire, TF) et rafraîchit les cellules dues dans le
+CandleStore, sous le token bucket partagé. Le scan suivant trouve alors
+toutes ses cellules à jour : le planificateur les sert sans appel OANDA.
+
+- réveil : min des prochaines clôtures (scan_planner.next_close_time, donc
+  fermeture du week-end comprise) + `delay_s`, jamais moins de
+  `min_interval_s` après le passage précédent (cellule restée due, p. ex.
+  jour férié sur un indice) ;
+- activité : chaque session appelle touch() ; sans touch() depuis `idle_s`
+  secondes, le thread s'arrête, et le touch() suivant le relance.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger("rsi_screener")
+
+
+class CacheWarmer:
+    """
+    warm()           → dict de compteurs du passage (cells, refreshed, errors) ;
+    next_close(now)  → instant epoch (s) de la prochaine clôture possible, ou None.
+    """
+
+    def __init__(self, warm, next_close, delay_s=10.0, idle_s=1800.0, min_interval_s=300.0,
+                 clock=time.time):
+        self._warm          = warm
+        self._next_close    = next_close
+        self.delay_s        = delay_s
+        self.idle_s         = idle_s
+        self.min_interval_s = min_interval_s
+        self._clock         = clock
+        self._lock          = threading.Lock()
+        self._wakeup        = threading.Event()
+        self._thread        = None
+        self._last_seen     = None
+        self._last_run      = None
+        self.next_wake      = None
+        self.runs           = 0
+        self.refreshed      = 0
+        self.errors         = 0
+        self.last_duration  = None
+        self.last_error     = None
+
+    def touch(self):
+        """Signal d'activité d'une session ; (re)démarre le thread si besoin."""
+        with self._lock:
+            self._last_seen = self._clock()
+            # FIX [RESTART-RACE] : _loop efface _thread sous le verrou au moment
+            # de s'arrêter — un thread encore vivant mais déjà décidé à sortir
+            # n'empêche plus le redémarrage (is_alive() restait vrai).
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._last_seen = None
+        self._wakeup.set()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def _idle_locked(self, now):
+        return self._last_seen is None or now - self._last_seen > self.idle_s
+
+    def _schedule(self, now):
+        close = self._next_close(now)
+        wake  = now + self.min_interval_s if close is None else close + self.delay_s
+        if self._last_run is not None:
+            wake = max(wake, self._last_run + self.min_interval_s)
+        return wake
+
+    def _loop(self):
+        self._wakeup.clear()
+        self.next_wake = self._schedule(self._clock())
+        while True:
+            now = self._clock()
+            with self._lock:
+                if self._idle_locked(now):
+                    self._thread   = None
+                    self.next_wake = None
+                    logger.info("Cache warmer stopped: no active session")
+                    return
+            if now < self.next_wake:
+                # Réveil au plus tard chaque minute pour vérifier l'activité.
+                self._wakeup.wait(min(self.next_wake - now, 60.0))
+                self._wakeup.clear()
+                continue
+
+            t0 = time.perf_counter()
+            try:
+                counts          = self._warm()
+                self.refreshed += counts.get('refreshed', 0)
+                self.errors    += counts.get('errors', 0)
+                self.last_error = None
+            except Exception as e:
+                logger.exception("Cache warm-up failed: %s", e)
+                self.errors    += 1
+                self.last_error = str(e)
+            self.runs         += 1
+            self.last_duration = time.perf_counter() - t0
+            self._last_run     = self._clock()
+            self.next_wake     = self._schedule(self._last_run)
+
+    def stats(self):
+        return {
+            'running':       self.running,
+            'runs':          self.runs,
+            'refreshed':     self.refreshed,
+            'errors':        self.errors,
+            'last_run':      self._last_run,
+            'last_duration': self.last_duration,
+            'next_wake':     self.next_wake,
+            'last_error':    self.last_error,
+        }
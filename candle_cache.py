@@ -0,0 +1,107 @@
+"""
+Cache process-wide des fenêtres de bougies servies au scan, borné en mémoire.
+
+L'ancien cache TTL de fetch_forex_data_oanda n'avait pas de taille maximale
+et sa clé contenait le cache_version du scan : chaque Rescan ajoutait jusqu'à
+165 DataFrames, conservés jusqu'à l'expiration du TTL. Ici :
+
+- clé : (instrument, granularité, count) — pas de version de scan ;
+- fraîcheur : une entrée expire à l'instant fourni par l'appelant (prochaine
+  clôture possible de sa dernière bougie, bornée par un âge maximal) ; une
+  entrée expirée est purgée à la lecture ;
+- invalidation explicite : invalidate(instrument, granularité) quand la
+  fenêtre stockée de la cellule change (fetch différentiel, préchauffage) ;
+- borne mémoire : au-delà de `max_bytes`, les fenêtres les moins récemment
+  servies sont évincées (ordre LRU) ; une fenêtre plus grosse que la borne
+  est servie sans être conservée.
+
+Les octets comptés sont la taille nominale des DataFrames (index compris) :
+une fenêtre peut partager ses tableaux avec le CandleStore ; l'invalidation
+à l'écriture évite qu'une vue retienne une ancienne fenêtre du store.
+"""
+import collections
+import threading
+import time
+
+
+def frame_nbytes(frame):
+    """Taille nominale d'un DataFrame (colonnes + index), en octets."""
+    return int(frame.memory_usage(index=True).sum())
+
+
+class CandleCache:
+    """Fenêtres de bougies par clé, avec échéance de fraîcheur, bornées en octets, thread-safe."""
+
+    def __init__(self, max_bytes=32 * 2**20, clock=time.time):
+        self.max_bytes     = max_bytes
+        self._clock        = clock
+        self._lock         = threading.Lock()
+        self._entries      = collections.OrderedDict()   # clé → (expire, fenêtre, octets), du moins au plus récent
+        self._bytes        = 0
+        self.hits          = 0
+        self.misses        = 0
+        self.evictions     = 0
+        self.expired       = 0
+        self.invalidations = 0
+
+    def _drop_locked(self, key):
+        _, _, nbytes = self._entries.pop(key)
+        self._bytes -= nbytes
+
+    def get(self, key):
+        """Fenêtre fraîche de `key`, ou None (absente ou expirée)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                self._drop_locked(key)
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, window, expires_at):
+        """Conserve `window` jusqu'à `expires_at` (epoch, s) ; ignorée si déjà expirée ou trop grosse."""
+        nbytes = frame_nbytes(window)
+        with self._lock:
+            if key in self._entries:
+                self._drop_locked(key)
+            if expires_at <= self._clock() or nbytes > self.max_bytes:
+                return
+            self._entries[key] = (expires_at, window, nbytes)
+            self._bytes       += nbytes
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop_locked(oldest)
+                self.evictions += 1
+
+    def invalidate(self, instrument=None, granularity=None):
+        """Retire les fenêtres de l'instrument / de la granularité (None : toutes) ; retourne leur nombre."""
+        with self._lock:
+            keys = [
+                key for key in self._entries
+                if instrument in (None, key[0]) and granularity in (None, key[1])
+            ]
+            for key in keys:
+                self._drop_locked(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries':       len(self._entries),
+                'bytes':         self._bytes,
+                'max_bytes':     self.max_bytes,
+                'hits':          self.hits,
+                'misses':        self.misses,
+                'evictions':     self.evictions,
+                'expired':       self.expired,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,364 @@
+"""
+Stockage des fenêtres de bougies complètes par (instrument, granularité).
+
+Permet le fetch différentiel : on mémorise la dernière bougie complète reçue
+et le scan suivant ne demande à OANDA que les bougies postérieures (paramètre
+`from`). Les nouvelles bougies sont fusionnées dans la fenêtre stockée, puis
+la fenêtre est ramenée à la taille configurée (CANDLE_COUNT).
+
+Persistance optionnelle : avec un répertoire, chaque fenêtre est écrite dans
+un fichier colonnaire compact (un .npz non compressé par clé : une colonne
+NumPy par champ + horodatages int64 en ns UTC). L'écriture passe par un
+fichier temporaire du même répertoire puis os.replace(), atomique en POSIX :
+un lecteur concurrent (autre session, autre thread, autre process) voit
+l'ancienne ou la nouvelle version, jamais un fichier tronqué.
+
+Exécution directe (`python candle_store.py`) : benchmark du parsing des
+réponses OANDA (ancien parseur vs colonnes NumPy), temps et pic mémoire ;
+l'équivalence des deux parseurs est couverte par tests/test_candle_store.py.
+"""
+import logging
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("rsi_screener")
+
+_TIME_COLUMN = "__time_ns__"
+
+
+CANDLE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class CandleColumns:
+    """
+    Bougies complètes en colonnes NumPy typées : horodatages int64 (ns epoch
+    UTC), OHLC float64 (ou float32), volume int32. Pas de DataFrame tant que
+    to_frame() n'est pas appelé.
+    """
+
+    __slots__ = ('time_ns', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, time_ns, open_, high, low, close, volume):
+        self.time_ns = time_ns
+        self.open    = open_
+        self.high    = high
+        self.low     = low
+        self.close   = close
+        self.volume  = volume
+
+    def __len__(self):
+        return len(self.time_ns)
+
+    @property
+    def index(self):
+        return pd.DatetimeIndex(self.time_ns.view('datetime64[ns]'), name='Time').tz_localize('UTC')
+
+    def to_frame(self):
+        """Vue DataFrame (index Time UTC, colonnes CANDLE_COLUMNS)."""
+        return pd.DataFrame(
+            {'Open': self.open, 'High': self.high, 'Low': self.low,
+             'Close': self.close, 'Volume': self.volume},
+            index=self.index,
+        )
+
+
+def _parse_times(times):
+    """Horodatages RFC3339 OANDA → int64 ns epoch UTC."""
+    try:
+        # Bougies alignées à la seconde : 'YYYY-MM-DDTHH:MM:SS' suffit à NumPy.
+        return np.array([t[:19] for t in times], dtype='datetime64[s]').astype('datetime64[ns]').view(np.int64)
+    except ValueError:
+        return pd.to_datetime(times, utc=True).as_unit('ns').asi8
+
+
+def _parse_prices(values, dtype, pair, timeframe_key):
+    """Chaînes de prix → tableau typé ; une valeur invalide devient NaN (et est signalée)."""
+    try:
+        return np.array(values, dtype=dtype), None
+    except (TypeError, ValueError):
+        out = np.empty(len(values), dtype=dtype)
+        for i, v in enumerate(values):
+            try:
+                out[i] = float(v)
+            except (TypeError, ValueError):
+                out[i] = np.nan
+        bad = np.isnan(out)
+        logger.error("Candle parse error for %s %s: %d invalid price(s)", pair, timeframe_key, int(bad.sum()))
+        return out, bad
+
+
+def _parse_volumes(values, pair, timeframe_key):
+    """Volumes → int32 ; une valeur invalide est signalée (masque) au lieu de faire échouer la réponse."""
+    try:
+        return np.array(values, dtype=np.int32), None
+    except (TypeError, ValueError, OverflowError):
+        out = np.zeros(len(values), dtype=np.int32)
+        bad = np.zeros(len(values), dtype=bool)
+        for i, v in enumerate(values):
+            try:
+                out[i] = int(v)
+            except (TypeError, ValueError, OverflowError):
+                bad[i] = True
+        logger.error("Candle parse error for %s %s: %d invalid volume(s)", pair, timeframe_key, int(bad.sum()))
+        return out, bad
+
+
+def parse_candle_columns(candles, pair="", timeframe_key="", price_dtype=np.float64):
+    """
+    Liste `candles` d'une réponse InstrumentsCandles → CandleColumns des
+    bougies complètes. Un seul passage sur la réponse remplit des colonnes
+    préallouées, converties ensuite en bloc par NumPy (pas de dict ni de
+    float() par bougie). Les bougies incomplètes ou malformées sont ignorées.
+    """
+    n      = len(candles)
+    times  = [None] * n
+    opens  = [None] * n
+    highs  = [None] * n
+    lows   = [None] * n
+    closes = [None] * n
+    vols   = [0] * n
+    k      = 0
+    for c in candles:
+        if not c.get('complete'):
+            continue
+        mid = c.get('mid')
+        if mid is None:
+            logger.error("Missing 'mid' key in candle for %s %s : %s", pair, timeframe_key, c)
+            continue
+        try:
+            times[k], opens[k], highs[k], lows[k], closes[k], vols[k] = (
+                c['time'], mid['o'], mid['h'], mid['l'], mid['c'], c['volume']
+            )
+        except KeyError as parse_err:
+            logger.error("Candle parse error for %s %s: %s", pair, timeframe_key, parse_err)
+            continue
+        k += 1
+
+    columns = []
+    invalid = np.zeros(k, dtype=bool)
+    for values in (opens, highs, lows, closes):
+        column, bad = _parse_prices(values[:k], price_dtype, pair, timeframe_key)
+        columns.append(column)
+        if bad is not None:
+            invalid |= bad
+    time_ns     = _parse_times(times[:k]) if k else np.empty(0, dtype=np.int64)
+    volume, bad = _parse_volumes(vols[:k], pair, timeframe_key)
+    if bad is not None:
+        invalid |= bad
+
+    if invalid.any():
+        keep    = ~invalid
+        time_ns = time_ns[keep]
+        volume  = volume[keep]
+        columns = [col[keep] for col in columns]
+    return CandleColumns(time_ns, *columns, volume)
+
+
+def parse_candles(candles, pair="", timeframe_key=""):
+    """
+    Liste `candles` d'une réponse InstrumentsCandles → DataFrame des bougies
+    complètes (index Time UTC, colonnes CANDLE_COLUMNS), éventuellement vide.
+    Les bougies incomplètes ou malformées sont ignorées.
+
+    PERF [COLUMNAR-PARSE] : vue DataFrame de parse_candle_columns.
+    """
+    return parse_candle_columns(candles, pair, timeframe_key).to_frame()
+
+
+def _parse_candles_reference(candles, pair="", timeframe_key=""):
+    """Ancien parseur (dict par bougie + pd.to_datetime), conservé pour le benchmark."""
+    data_list = []
+    for c in candles:
+        if not c.get('complete'):
+            continue
+        if 'mid' not in c:
+            continue
+        try:
+            data_list.append({
+                'Time':   c['time'],
+                'Open':   float(c['mid']['o']),
+                'High':   float(c['mid']['h']),
+                'Low':    float(c['mid']['l']),
+                'Close':  float(c['mid']['c']),
+                'Volume': int(c['volume'])
+            })
+        except (KeyError, ValueError):
+            continue
+
+    df = pd.DataFrame(data_list, columns=['Time', *CANDLE_COLUMNS])
+    df['Time'] = pd.to_datetime(df['Time'], utc=True)
+    df.set_index('Time', inplace=True)
+    return df
+
+
+def merge_candles(window, new_candles, max_len):
+    """
+    Fusionne `new_candles` dans `window` (DataFrames indexés par le temps) :
+    déduplication sur l'horodatage (la version la plus récente gagne), tri
+    chronologique, puis conservation des `max_len` dernières bougies.
+    """
+    if window is None or window.empty:
+        merged = new_candles
+    elif new_candles is None or new_candles.empty:
+        merged = window
+    else:
+        merged = pd.concat([window, new_candles])
+        merged = merged[~merged.index.duplicated(keep='last')]
+    if merged is None:
+        return None
+    if not merged.index.is_monotonic_increasing:
+        merged = merged.sort_index()
+    return merged.iloc[-max_len:] if max_len else merged
+
+
+def _store_filename(key):
+    pair, granularity = key
+    return f"{pair.replace('/', '_')}_{granularity}.npz"
+
+
+def save_window(path, window):
+    """Écriture atomique d'une fenêtre de bougies au format colonnaire .npz."""
+    columns = {col: window[col].to_numpy() for col in window.columns}
+    columns[_TIME_COLUMN] = window.index.as_unit('ns').asi8
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".npz", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            np.savez(fh, **columns)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def load_window(path):
+    """Lecture d'une fenêtre .npz ; None si absente ou illisible."""
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            index = pd.to_datetime(data[_TIME_COLUMN], utc=True)
+            columns = {name: data[name] for name in data.files if name != _TIME_COLUMN}
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Candle store file unreadable %s: %s", path, e)
+        return None
+    return pd.DataFrame(columns, index=pd.DatetimeIndex(index, name='Time'))
+
+
+class CandleStore:
+    """
+    Fenêtres de bougies thread-safe, clé (instrument, granularité).
+
+    directory=None : mémoire seule. Sinon la fenêtre est chargée depuis le
+    disque au premier accès à une clé et réécrite à chaque mise à jour, ce qui
+    survit aux redéploiements et redémarrages de Streamlit.
+    """
+
+    def __init__(self, directory=None):
+        self._lock      = threading.Lock()
+        self._windows   = {}
+        self._directory = directory
+        self._checked   = set()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self._directory, _store_filename(key))
+
+    def _load_locked(self, key):
+        # Chargement paresseux depuis le disque, une seule tentative par clé.
+        if self._directory and key not in self._windows and key not in self._checked:
+            self._checked.add(key)
+            window = load_window(self._path(key))
+            if window is not None and not window.empty:
+                self._windows[key] = window
+
+    def _persist(self, key, window):
+        if not self._directory:
+            return
+        try:
+            if window is None or window.empty:
+                os.unlink(self._path(key))
+            else:
+                save_window(self._path(key), window)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("Candle store write failed for %s: %s", key, e)
+
+    def get(self, key):
+        with self._lock:
+            self._load_locked(key)
+            return self._windows.get(key)
+
+    def last_time(self, key):
+        """Horodatage de la dernière bougie complète stockée, ou None."""
+        window = self.get(key)
+        if window is None or window.empty:
+            return None
+        return window.index[-1]
+
+    def merge(self, key, new_candles, max_len):
+        """Fusionne et stocke ; retourne la fenêtre résultante."""
+        with self._lock:
+            self._load_locked(key)
+            previous = self._windows.get(key)
+            if new_candles is None or new_candles.empty:
+                return previous
+            merged = merge_candles(previous, new_candles, max_len)
+            self._windows[key] = merged
+            self._persist(key, merged)
+            return merged
+
+    def replace(self, key, candles):
+        with self._lock:
+            self._checked.add(key)
+            if candles is None or candles.empty:
+                self._windows.pop(key, None)
+            else:
+                self._windows[key] = candles
+            self._persist(key, candles)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._windows)
+
+
+def _benchmark_parse(sizes=(200, 1000, 5000), repeat=20):
+    """Temps de parsing et pic mémoire : ancien parseur vs colonnes vs vue DataFrame."""
+    import time
+    import tracemalloc
+
+    from oanda_stub import synthetic_candles
+
+    for n in sizes:
+        candles = synthetic_candles('EUR_USD', 'H1', list(range(100000, 100000 + n)), 100000 + n - 1)
+
+        line = [f"{n:>5} bougies"]
+        for label, fn in (
+            ("ancien", _parse_candles_reference),
+            ("colonnes", parse_candle_columns),
+            ("colonnes+DataFrame", parse_candles),
+        ):
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                fn(candles)
+            elapsed = (time.perf_counter() - t0) / repeat
+
+            tracemalloc.start()
+            fn(candles)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            line.append(f"{label} {elapsed * 1e3:.2f} ms / {peak / 1024:.0f} KiB")
+        print(" | ".join(line))
+
+
+if __name__ == "__main__":
+    _benchmark_parse()
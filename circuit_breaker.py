@@ -0,0 +1,132 @@
+"""
+Disjoncteur (circuit breaker) process-wide devant l'API OANDA.
+
+Pendant une panne OANDA, chacun des 165 appels d'un scan retentait 3 fois
+avec backoff : le scan brûlait tout son budget avant d'afficher quoi que ce
+soit. Le disjoncteur observe les issues récentes et coupe court :
+
+- fermé      : tout passe ; sur les `window` dernières issues (au moins
+               `min_calls`), une proportion d'échecs ≥ `failure_rate` ouvre ;
+- ouvert     : toute requête est refusée immédiatement (l'appelant échoue
+               vite ou sert la fenêtre périmée du store) pendant `open_s` s ;
+- semi-ouvert: ensuite, `half_open_probes` requêtes de sonde passent ; un
+               succès referme, un échec rouvre pour `open_s` s. Une sonde
+               sans issue enregistrée après `open_s` s (exception non
+               comptée, thread abandonné) compte comme un échec : rouvre.
+
+Seules les pannes comptent comme échecs (5xx, timeouts, erreurs de
+connexion) : une réponse 4xx ou 429 prouve que le service répond.
+"""
+import collections
+import threading
+import time
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitBreaker:
+    """Machine à états thread-safe, avec compteurs et historique des transitions."""
+
+    def __init__(self, failure_rate=0.5, window=20, min_calls=10, open_s=30.0, half_open_probes=1,
+                 clock=time.time):
+        self.failure_rate     = failure_rate
+        self.min_calls        = min_calls
+        self.open_s           = open_s
+        self.half_open_probes = half_open_probes
+        self._clock           = clock
+        self._lock            = threading.Lock()
+        self._outcomes        = collections.deque(maxlen=window)
+        self._state           = CLOSED
+        self._opened_at       = None
+        self._probes          = 0
+        self._probe_at        = None
+        self.transitions      = collections.deque(maxlen=50)
+        self.successes        = 0
+        self.failures         = 0
+        self.rejected         = 0
+        self.opened           = 0
+
+    def _transition_locked(self, state, now):
+        self.transitions.append((now, self._state, state))
+        self._state = state
+        if state == OPEN:
+            self._opened_at = now
+            self.opened    += 1
+        elif state == CLOSED:
+            self._outcomes.clear()
+        self._probes = 0
+
+    def _refresh_locked(self, now):
+        if self._state == OPEN and now - self._opened_at >= self.open_s:
+            self._transition_locked(HALF_OPEN, now)
+        elif self._state == HALF_OPEN and self._probes and now - self._probe_at >= self.open_s:
+            # FIX [PROBE-TIMEOUT] : sonde partie sans jamais rendre d'issue —
+            # traitée comme un échec, sans rester bloqué en semi-ouvert.
+            self._transition_locked(OPEN, now)
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh_locked(self._clock())
+            return self._state
+
+    def allow(self):
+        """Vrai si une requête peut partir maintenant (sonde comprise en semi-ouvert)."""
+        with self._lock:
+            self._refresh_locked(self._clock())
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes  += 1
+                self._probe_at = self._clock()
+                return True
+            self.rejected += 1
+            return False
+
+    def fail_fast(self):
+        """
+        Vrai (refus compté) si le disjoncteur est ouvert — à tester avant de
+        consommer un jeton de débit ; la sonde semi-ouverte passe par allow().
+        """
+        with self._lock:
+            self._refresh_locked(self._clock())
+            if self._state != OPEN:
+                return False
+            self.rejected += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            if self._state == HALF_OPEN:
+                self._transition_locked(CLOSED, self._clock())
+            elif self._state == CLOSED:
+                self._outcomes.append(False)
+
+    def record_failure(self):
+        with self._lock:
+            now            = self._clock()
+            self.failures += 1
+            if self._state == HALF_OPEN:
+                self._transition_locked(OPEN, now)
+            elif self._state == CLOSED:
+                self._outcomes.append(True)
+                if (len(self._outcomes) >= self.min_calls
+                        and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate):
+                    self._transition_locked(OPEN, now)
+
+    def stats(self):
+        with self._lock:
+            now = self._clock()
+            self._refresh_locked(now)
+            recent = len(self._outcomes)
+            return {
+                'state':        self._state,
+                'failure_rate': sum(self._outcomes) / recent if recent else 0.0,
+                'successes':    self.successes,
+                'failures':     self.failures,
+                'rejected':     self.rejected,
+                'opened':       self.opened,
+                'retry_in_s':   max(0.0, self._opened_at + self.open_s - now) if self._state == OPEN else None,
+                'transitions':  list(self.transitions),
+            }
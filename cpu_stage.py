@@ -0,0 +1,201 @@
+"""
+Étage CPU du scan : RSI Wilder + divergences sur des blocs de clôtures
+(un bloc par timeframe, une ligne par instrument, séries alignées à droite
+avec NaN en tête), séparé de l'étage I/O (fetch OANDA).
+
+Trois exécutions, mêmes résultats :
+- inline    : dans le thread appelant ;
+- threads   : lots de lignes dans un pool de threads (lfilter / find_peaks
+              relâchent en partie le GIL) ;
+- processes : lots de lignes dans un pool de process. Chaque bloc est écrit
+              une fois dans un segment multiprocessing.shared_memory ; les
+              workers s'y attachent sans copie et ne reçoivent que (nom du
+              segment, forme, bornes du lot, paramètres). Seuls les résultats
+              (RSI final et code de divergence par ligne) reviennent par pickle.
+
+Exécution directe (`python cpu_stage.py`) : benchmark des trois modes sur un
+univers synthétique ; l'égalité des sorties est couverte par
+tests/test_cpu_stage.py.
+"""
+import concurrent.futures
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from divergence import MIN_BARS, detect_divergence_batch
+from indicators import RSI_PERIOD, wilder_rsi_matrix
+
+CPU_MODES = ('inline', 'threads', 'processes')
+
+
+class SharedBlock:
+    """
+    Bloc float64 (lignes × largeur) alloué en mémoire partagée, rempli en
+    place par l'étage I/O. À utiliser comme context manager (libération du
+    segment à la sortie).
+    """
+
+    def __init__(self, shape, shared=True):
+        self.shape = tuple(shape)
+        self._shm  = None
+        if shared and self.shape[0] and self.shape[1]:
+            nbytes     = int(np.prod(self.shape)) * np.dtype(np.float64).itemsize
+            self._shm  = shared_memory.SharedMemory(create=True, size=nbytes)
+            self.array = np.ndarray(self.shape, dtype=np.float64, buffer=self._shm.buf)
+            self.array.fill(np.nan)
+        else:
+            self.array = np.full(self.shape, np.nan)
+
+    @property
+    def name(self):
+        return self._shm.name if self._shm is not None else None
+
+    def close(self):
+        if self._shm is not None:
+            self.array = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def fill_block(block, series_list):
+    """Copie chaque série (1D ou None) dans sa ligne, alignée à droite."""
+    width = block.shape[1]
+    for i, values in enumerate(series_list):
+        if values is None or len(values) == 0:
+            continue
+        values = values[-width:]
+        block[i, width - len(values):] = values
+    return block
+
+
+def indicator_block(closes, lookback, peak_distance, price_deltas, period=RSI_PERIOD):
+    """
+    RSI final et code de divergence de chaque ligne d'un bloc de clôtures.
+
+    Sémantique du scan : RSI NaN (et pas de divergence) si la série compte
+    moins de period+1 bougies ; divergence évaluée sur les `lookback`
+    dernières bougies, ligne exclue sous MIN_BARS bougies.
+    """
+    rsi      = wilder_rsi_matrix(closes, period)
+    lengths  = np.count_nonzero(~np.isnan(closes), axis=1)
+    rsi_last = rsi[:, -1] if closes.shape[1] else np.full(len(closes), np.nan)
+    has_rsi  = (lengths >= period + 1) & ~np.isnan(rsi_last)
+
+    width    = min(lookback, closes.shape[1])
+    div_len  = np.where(has_rsi & (lengths >= MIN_BARS), np.minimum(lengths, lookback), 0)
+    codes    = detect_divergence_batch(
+        closes[:, closes.shape[1] - width:], rsi[:, closes.shape[1] - width:],
+        div_len, price_deltas, peak_distance,
+    )
+    return np.where(has_rsi, rsi_last, np.nan), codes
+
+
+def _shared_indicator_chunk(shm_name, shape, lo, hi, lookback, peak_distance, price_deltas, period):
+    """Worker process : s'attache au segment partagé, calcule les lignes lo..hi."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        block = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        out   = indicator_block(block[lo:hi], lookback, peak_distance, price_deltas, period)
+        del block
+        return out
+    finally:
+        shm.close()
+
+
+def make_executor(mode, workers=None):
+    """Pool adapté au mode (None pour inline). Process : contexte spawn, sûr sous Streamlit."""
+    if mode == 'threads':
+        return concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cpu-stage")
+    if mode == 'processes':
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return None
+
+
+def run_indicator_stage(tasks, mode='inline', executor=None, chunk_rows=64, period=RSI_PERIOD):
+    """
+    tasks : liste de (SharedBlock, lookback, peak_distance, price_deltas), un
+    par timeframe. Retourne, dans le même ordre, (rsi_last, codes) par tâche.
+    """
+    if mode not in CPU_MODES:
+        raise ValueError(f"mode CPU inconnu : {mode!r} (attendu : {', '.join(CPU_MODES)})")
+
+    pending = []
+    for t, (block, lookback, peak_distance, price_deltas) in enumerate(tasks):
+        price_deltas = np.asarray(price_deltas, dtype=np.float64)
+        rows         = block.shape[0]
+        for lo in range(0, rows, chunk_rows if mode != 'inline' else max(rows, 1)):
+            hi   = min(rows, lo + chunk_rows) if mode != 'inline' else rows
+            args = (lookback, peak_distance, price_deltas[lo:hi], period)
+            if mode == 'processes' and block.name is not None:
+                job = executor.submit(_shared_indicator_chunk, block.name, block.shape, lo, hi, *args)
+            elif mode == 'threads':
+                job = executor.submit(indicator_block, block.array[lo:hi], *args)
+            else:
+                job = indicator_block(block.array[lo:hi], *args)
+            pending.append((t, lo, hi, job))
+
+    results = [
+        (np.full(block.shape[0], np.nan), np.zeros(block.shape[0], dtype=np.int8))
+        for block, *_ in tasks
+    ]
+    for t, lo, hi, job in pending:
+        rsi_last, codes = job.result() if isinstance(job, concurrent.futures.Future) else job
+        results[t][0][lo:hi] = rsi_last
+        results[t][1][lo:hi] = codes
+    return results
+
+
+def _benchmark(n_instruments=400, repeat=3, workers=None):
+    """Univers synthétique (5 TF, 200 à 5000 bougies) : inline vs threads vs processes."""
+    import time
+
+    rng    = np.random.default_rng(11)
+    widths = {'H1': 5000, 'H4': 1000, 'D': 150, 'W': 100, 'M': 60}
+    params = {'H1': (40, 3), 'H4': (35, 5), 'D': (30, 4), 'W': (20, 3), 'M': (15, 2)}
+    deltas = rng.choice([0.0003, 0.001, 0.002], n_instruments)
+    series = {
+        tf: [
+            1.10 * np.exp(np.cumsum(rng.normal(0, 2e-3, int(rng.integers(width // 2, width + 1)))))
+            for _ in range(n_instruments)
+        ]
+        for tf, width in widths.items()
+    }
+
+    for mode in CPU_MODES:
+        executor = make_executor(mode, workers)
+        try:
+            if executor is not None:
+                # Démarrage des workers hors chronométrage.
+                list(executor.map(abs, range(workers or os.cpu_count() or 1)))
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                blocks = [SharedBlock((n_instruments, widths[tf]), shared=(mode == 'processes')) for tf in widths]
+                try:
+                    for block, tf in zip(blocks, widths):
+                        fill_block(block.array, series[tf])
+                    tasks = [(block, *params[tf], deltas) for block, tf in zip(blocks, widths)]
+                    run_indicator_stage(tasks, mode, executor)
+                finally:
+                    for block in blocks:
+                        block.close()
+            elapsed = (time.perf_counter() - t0) / repeat
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        print(f"{mode:<10} {elapsed * 1e3:8.1f} ms")
+    print(f"{n_instruments} instruments × {len(widths)} TF")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,96 @@
+"""
+Échéance de bout en bout d'un scan.
+
+Un Deadline est créé par scan et rendu visible à tout le code de fetch via
+une ContextVar (deadline_scope) : threads du scan (soumis avec
+contextvars.copy_context().run) et tâches asyncio du prefetch (qui héritent
+du contexte). Personne ne passe le budget en paramètre ; le préchauffage et
+la validation, hors scope, restent sans échéance.
+
+- remaining() / expired : budget restant ;
+- sleep(s) : attente de backoff / rate-limit, refusée (False, sans attendre)
+  si elle ne peut pas se terminer avant l'échéance ou si le scan est annulé ;
+  interrompue par cancel() ;
+- cancel() : fin anticipée (timeout global atteint) — les workers encore en
+  cours abandonnent à leur prochain point de contrôle ;
+- skip(clé) / skipped(clé) : trace des abandons dus à l'échéance, pour que
+  l'appelant distingue « hors délai » d'un échec OANDA.
+"""
+import contextlib
+import contextvars
+import threading
+import time
+
+_CURRENT = contextvars.ContextVar("scan_deadline", default=None)
+
+
+class Deadline:
+    """Instant limite (horloge monotone) et signal d'annulation partagés."""
+
+    def __init__(self, seconds, clock=time.monotonic):
+        self.seconds    = seconds
+        self._clock     = clock
+        self.expires_at = clock() + seconds
+        self._cancelled = threading.Event()
+        self._lock      = threading.Lock()
+        self._skipped   = set()
+
+    def remaining(self):
+        if self._cancelled.is_set():
+            return 0.0
+        return max(0.0, self.expires_at - self._clock())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0.0
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def allows(self, seconds):
+        """Vrai si une attente de `seconds` se termine avant l'échéance."""
+        return seconds < self.remaining()
+
+    def sleep(self, seconds):
+        """Attend `seconds` ; False sans attendre si le budget ne le permet pas, False si annulé."""
+        if not self.allows(seconds):
+            return False
+        return not self._cancelled.wait(seconds)
+
+    def skip(self, key):
+        with self._lock:
+            self._skipped.add(key)
+
+    def skipped(self, key):
+        with self._lock:
+            return key in self._skipped
+
+    def timeout(self, default):
+        """Timeout d'une opération bornée par le budget restant."""
+        return min(default, self.remaining())
+
+
+def current_deadline():
+    """Deadline du scan en cours dans ce contexte, ou None."""
+    return _CURRENT.get()
+
+
+@contextlib.contextmanager
+def deadline_scope(deadline):
+    token = _CURRENT.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _CURRENT.reset(token)
+
+
+def sleep(seconds, deadline=None):
+    """time.sleep borné par `deadline` (None : attente normale, toujours True)."""
+    if deadline is None:
+        time.sleep(seconds)
+        return True
+    return deadline.sleep(seconds)
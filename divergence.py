@@ -0,0 +1,486 @@
+"""
+Détection de divergences prix / RSI en lot : tous les instruments d'un même
+timeframe dans un bloc 2D (une ligne par instrument, fenêtres de lookback
+alignées à droite, NaN en tête pour les lignes plus courtes).
+
+Règles identiques à l'ancien detect_divergence par (paire, TF) :
+- pics / creux sur le Close (find_peaks, distance par TF, prominence
+  0.5·std des clôtures de la fenêtre) ;
+- baissière : plus haut prix plus haut de MIN_PRICE_DELTA, max RSI ±2
+  bougies autour du dernier pic inférieur de MIN_RSI_DELTA ;
+- haussière : symétrique sur les creux ; la baissière est prioritaire.
+
+Les extrema RSI ±2 sont calculés une fois pour tout le bloc (vue glissante),
+au lieu d'un découpage + filtre NaN par pic. find_peaks reste appelé ligne
+par ligne : son filtrage par distance et prominence n'a pas d'équivalent 2D.
+
+Mode glissant (rolling_divergence, utilisé par le backtest) : le signal de
+chaque bougie d'un long historique, sans rappeler find_peaks par bougie —
+candidats détectés une fois, bords de fenêtre avancés par pointeurs.
+
+Exécution directe (`python divergence.py`) : micro-benchmarks (lot et
+glissant) contre l'implémentation par paire ; l'égalité est couverte par
+tests/test_divergence.py.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import find_peaks
+
+from scan_result import DIV_BEAR, DIV_BULL, DIV_NONE
+
+MIN_RSI_DELTA   = 2.0
+RSI_HALF_WINDOW = 2
+MIN_BARS        = 10
+
+# Paramètres par timeframe (clé fetch OANDA), partagés par le screener et le backtest.
+DIVERGENCE_LOOKBACK      = {'H1': 40, 'H4': 35, 'D': 30, 'W': 20, 'M': 15}
+DIVERGENCE_PEAK_DISTANCE = {'H1': 3, 'H4': 5, 'D': 4, 'W': 3, 'M': 2}
+
+
+def price_delta(pair_name):
+    """
+    Seuil MIN_PRICE_DELTA adapté au type d'instrument.
+    """
+    if 'JPY' in pair_name:
+        return 0.0003
+    elif 'XAU' in pair_name:
+        return 0.002
+    elif any(idx in pair_name for idx in ('DE30', 'SPX500', 'NAS100', 'US30')):
+        return 0.003
+    return 0.001
+
+
+def divergence_inputs(closes, rsi, lookback):
+    """
+    Fenêtre de lookback (clôtures, RSI alignés) d'un instrument, ou None si la
+    série est trop courte (< MIN_BARS) ou sans RSI.
+    """
+    if rsi is None or len(closes) < MIN_BARS:
+        return None
+    lookback = min(lookback, len(closes))
+    return (
+        np.asarray(closes[-lookback:], dtype=np.float64),
+        np.asarray(rsi[-lookback:], dtype=np.float64),
+    )
+
+
+def stack_inputs(inputs, width):
+    """
+    Liste d'entrées (divergence_inputs ou None) → blocs (clôtures, RSI) de
+    largeur `width` alignés à droite + longueur valide par ligne (0 = exclue).
+    """
+    closes  = np.full((len(inputs), width), np.nan)
+    rsi     = np.full((len(inputs), width), np.nan)
+    lengths = np.zeros(len(inputs), dtype=np.int64)
+    for i, item in enumerate(inputs):
+        if item is None:
+            continue
+        n = len(item[0])
+        closes[i, width - n:] = item[0]
+        rsi[i, width - n:]    = item[1]
+        lengths[i]            = n
+    return closes, rsi, lengths
+
+
+def rsi_window_extrema(rsi, half_width=RSI_HALF_WINDOW):
+    """Max / min du RSI sur ±half_width bougies, NaN ignorés (NaN si tout est NaN)."""
+    padded  = np.pad(rsi, ((0, 0), (half_width, half_width)), constant_values=np.nan)
+    windows = sliding_window_view(padded, 2 * half_width + 1, axis=1)
+    return np.fmax.reduce(windows, axis=-1), np.fmin.reduce(windows, axis=-1)
+
+
+def _row_std(closes, lengths):
+    """np.std de la partie valide de chaque ligne, calculé par groupe de longueur."""
+    out = np.zeros(len(closes))
+    for n in np.unique(lengths[lengths > 0]):
+        rows      = np.flatnonzero(lengths == n)
+        out[rows] = np.std(closes[rows, closes.shape[1] - n:], axis=1)
+    return out
+
+
+def _last_two_peaks(closes, lengths, prominence, peak_distance, sign):
+    """Indices (colonnes du bloc) des deux derniers pics de sign·clôture, -1 sinon."""
+    width = closes.shape[1]
+    prev  = np.full(len(closes), -1)
+    last  = np.full(len(closes), -1)
+    for i in np.flatnonzero(lengths > 0):
+        offset   = width - lengths[i]
+        peaks, _ = find_peaks(
+            sign * closes[i, offset:], distance=peak_distance, prominence=prominence[i]
+        )
+        if len(peaks) >= 2:
+            prev[i] = offset + peaks[-2]
+            last[i] = offset + peaks[-1]
+    return prev, last
+
+
+def detect_divergence_batch(closes, rsi, lengths, price_deltas, peak_distance,
+                            min_rsi_delta=MIN_RSI_DELTA):
+    """
+    Codes de divergence (int8, DIV_NONE / DIV_BULL / DIV_BEAR) par ligne.
+
+    closes, rsi  : blocs (instruments × largeur) issus de stack_inputs
+    lengths      : longueur valide par ligne (0 = ligne exclue → DIV_NONE)
+    price_deltas : MIN_PRICE_DELTA par ligne (seuil relatif de prix)
+    """
+    lengths      = np.asarray(lengths)
+    price_deltas = np.asarray(price_deltas, dtype=np.float64)
+    codes        = np.full(len(closes), DIV_NONE, dtype=np.int8)
+    if not (lengths > 0).any():
+        return codes
+
+    price_std    = _row_std(closes, lengths)
+    prominence   = np.where(price_std > 0, price_std * 0.5, 0.0)
+    rsi_max, rsi_min = rsi_window_extrema(rsi)
+    rows         = np.arange(len(closes))
+
+    # --- Divergence baissière (higher high prix clôture + lower high RSI) ---
+    pp, lp  = _last_two_peaks(closes, lengths, prominence, peak_distance, 1.0)
+    has     = lp >= 0
+    pp, lp  = np.where(has, pp, 0), np.where(has, lp, 0)
+    bearish = (
+        has
+        & (closes[rows, lp] > closes[rows, pp] * (1 + price_deltas))
+        & ~np.isnan(rsi_max[rows, lp]) & ~np.isnan(rsi_max[rows, pp])
+        & (rsi_max[rows, lp] < rsi_max[rows, pp] - min_rsi_delta)
+    )
+
+    # --- Divergence haussière (lower low prix clôture + higher low RSI) ---
+    pt, lt  = _last_two_peaks(closes, lengths, prominence, peak_distance, -1.0)
+    has     = lt >= 0
+    pt, lt  = np.where(has, pt, 0), np.where(has, lt, 0)
+    bullish = (
+        has
+        & (closes[rows, lt] < closes[rows, pt] * (1 - price_deltas))
+        & ~np.isnan(rsi_min[rows, lt]) & ~np.isnan(rsi_min[rows, pt])
+        & (rsi_min[rows, lt] > rsi_min[rows, pt] + min_rsi_delta)
+    )
+
+    codes[bullish] = DIV_BULL
+    codes[bearish] = DIV_BEAR
+    return codes
+
+
+class _RangeMin:
+    """Minimum sur un intervalle [lo, hi] en O(1) (table clairsemée, O(n log n) en mémoire)."""
+
+    def __init__(self, values):
+        levels = [values]
+        width  = 1
+        while 2 * width <= len(values):
+            prev = levels[-1]
+            levels.append(np.minimum(prev[:-width], prev[width:]))
+            width *= 2
+        self._levels = [level.tolist() for level in levels]
+
+    def __call__(self, lo, hi):
+        k     = (hi - lo + 1).bit_length() - 1
+        level = self._levels[k]
+        a, b  = level[lo], level[hi - (1 << k) + 1]
+        return a if a < b else b
+
+
+def _nearest_greater(values):
+    """Indices du plus proche élément strictement supérieur à gauche (-1 sinon) et à droite (n sinon)."""
+    n     = len(values)
+    left  = [-1] * n
+    right = [n] * n
+    stack = []
+    for i, v in enumerate(values):
+        while stack and values[stack[-1]] <= v:
+            stack.pop()
+        left[i] = stack[-1] if stack else -1
+        stack.append(i)
+    stack = []
+    for i in range(n - 1, -1, -1):
+        v = values[i]
+        while stack and values[stack[-1]] <= v:
+            stack.pop()
+        right[i] = stack[-1] if stack else n
+        stack.append(i)
+    return left, right
+
+
+class _RollingPeaks:
+    """
+    Pics de `y` dans la fenêtre glissante [s, t], tels que les retiendrait
+    find_peaks(y[s:t+1], distance, prominence) — sans rappeler find_peaks.
+
+    - candidats : maxima locaux (plateaux compris) détectés une fois sur toute
+      la série ; un candidat est un pic de la fenêtre ssi son plateau a un
+      voisin de chaque côté dans la fenêtre ;
+    - distance : le filtre glouton de find_peaks ne relie que des candidats
+      distants de moins de `distance` ; ses composantes sont résolues une fois
+      et mémorisées, seules celles coupées par un bord de fenêtre sont
+      recalculées. Avec des hauteurs ex aequo, l'ordre de traitement dépend
+      de np.argsort sur tous les pics de la fenêtre (tri non stable) : la
+      composante est alors résolue avec ce même argsort, sans mémorisation ;
+    - prominence : bases bornées par la fenêtre, en O(1) par pic via le plus
+      proche élément supérieur et un minimum d'intervalle.
+    """
+
+    def __init__(self, y, distance):
+        peaks, props   = find_peaks(y, plateau_size=(None, None))
+        self.y         = y.tolist()
+        self.pos       = peaks.tolist()
+        self.left_edge = props['left_edges'].tolist()
+        self.right_edge = props['right_edges'].tolist()
+        self.distance  = int(np.ceil(distance))
+        self._min      = _RangeMin(y)
+        self._greater_left, self._greater_right = _nearest_greater(self.y)
+
+        # Composantes : candidats consécutifs distants de moins de `distance`.
+        self.comp       = [0] * len(self.pos)
+        self.comp_start = [0]
+        self.comp_end   = []
+        for k in range(1, len(self.pos)):
+            if self.pos[k] - self.pos[k - 1] >= self.distance:
+                self.comp_end.append(k - 1)
+                self.comp_start.append(k)
+            self.comp[k] = len(self.comp_start) - 1
+        self.comp_end.append(len(self.pos) - 1)
+        self._survivors = {}
+
+    def _distance_filter(self, lo, hi, a, b):
+        """Candidats lo..hi (fenêtre : candidats a..b) conservés par le filtre de distance."""
+        if lo == hi:
+            return [lo], True
+        pos     = self.pos
+        y       = self.y
+        idx     = list(range(lo, hi + 1))
+        keep    = dict.fromkeys(idx, True)
+        heights = [y[pos[k]] for k in idx]
+        if len(set(heights)) == len(heights):
+            order    = sorted(idx, key=lambda k: y[pos[k]])
+            cachable = True
+        else:
+            # Ex aequo : même ordre que find_peaks (argsort sur les pics de la fenêtre).
+            window   = np.argsort(np.array([y[pos[k]] for k in range(a, b + 1)])) + a
+            order    = [k for k in window.tolist() if lo <= k <= hi]
+            cachable = False
+        for j in reversed(order):
+            if not keep[j]:
+                continue
+            k = j - 1
+            while k >= lo and pos[j] - pos[k] < self.distance:
+                keep[k] = False
+                k -= 1
+            k = j + 1
+            while k <= hi and pos[k] - pos[j] < self.distance:
+                keep[k] = False
+                k += 1
+        return [k for k in idx if keep[k]], cachable
+
+    def survivors(self, c, lo, hi, a, b):
+        whole  = lo == self.comp_start[c] and hi == self.comp_end[c]
+        cached = self._survivors.get(c) if whole else None
+        if cached is None:
+            cached, cachable = self._distance_filter(lo, hi, a, b)
+            if whole and cachable:
+                self._survivors[c] = cached
+        return cached
+
+    def prominence(self, p, s, t):
+        v     = self.y[p]
+        left  = self._min(max(self._greater_left[p] + 1, s), p)
+        right = self._min(p, min(self._greater_right[p] - 1, t))
+        return v - (left if left > right else right)
+
+    def last_two(self, a, b, s, t, min_prominence):
+        """Positions (avant-dernier, dernier) des pics de la fenêtre, ou None."""
+        found = []
+        c     = self.comp[b]
+        while c >= 0:
+            lo = max(self.comp_start[c], a)
+            hi = min(self.comp_end[c], b)
+            if lo > hi:
+                break
+            for k in reversed(self.survivors(c, lo, hi, a, b)):
+                p = self.pos[k]
+                if self.prominence(p, s, t) >= min_prominence:
+                    found.append(p)
+                    if len(found) == 2:
+                        return found[1], found[0]
+            if lo == a:
+                break
+            c -= 1
+        return None
+
+
+def rolling_divergence(closes, rsi, lookback, peak_distance, price_delta,
+                       min_rsi_delta=MIN_RSI_DELTA):
+    """
+    Code de divergence à chaque bougie t, comme detect_divergence sur les
+    bougies 0..t (fenêtre des `lookback` dernières) avec le RSI `rsi` —
+    sans rappeler find_peaks à chaque bougie.
+
+    Pics et creux sont maintenus par _RollingPeaks (bords de fenêtre avancés
+    par pointeurs, composantes du filtre de distance mémorisées) ; l'écart-type
+    des fenêtres et les extrema RSI ±2 sont calculés en bloc.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    rsi    = np.asarray(rsi, dtype=np.float64)
+    n      = len(closes)
+    codes  = np.full(n, DIV_NONE, dtype=np.int8)
+    if n < MIN_BARS:
+        return codes
+
+    # Écart-type de chaque fenêtre (mêmes opérations que np.std sur la fenêtre).
+    window_std = np.empty(n)
+    head       = min(lookback - 1, n)
+    for t in range(head):
+        window_std[t] = np.std(closes[:t + 1])
+    if n >= lookback:
+        window_std[lookback - 1:] = np.std(sliding_window_view(closes, lookback), axis=1)
+    min_prominence = np.where(window_std > 0, window_std * 0.5, 0.0).tolist()
+
+    rsi_max, rsi_min = (e[0].tolist() for e in rsi_window_extrema(rsi[np.newaxis, :]))
+    rsi_list = rsi.tolist()
+    x        = closes.tolist()
+
+    def _rsi_extreme(p, s, t, full, reduce):
+        # Extremum RSI ±2 borné par la fenêtre ; seul un pic au bord est rogné.
+        if p - RSI_HALF_WINDOW >= s and p + RSI_HALF_WINDOW <= t:
+            return full[p]
+        window = [v for v in rsi_list[max(s, p - RSI_HALF_WINDOW):min(t, p + RSI_HALF_WINDOW) + 1] if v == v]
+        return reduce(window) if window else np.nan
+
+    sides = []
+    for sign in (1.0, -1.0):
+        peaks = _RollingPeaks(sign * closes, peak_distance)
+        sides.append([peaks, 0, -1])   # [pics, premier candidat dans la fenêtre, dernier]
+
+    for t in range(MIN_BARS - 1, n):
+        s = max(0, t - lookback + 1)
+        last_two = []
+        for side in sides:
+            peaks, a, b = side
+            while a < len(peaks.pos) and peaks.left_edge[a] <= s:
+                a += 1
+            while b + 1 < len(peaks.pos) and peaks.right_edge[b + 1] < t:
+                b += 1
+            side[1], side[2] = a, b
+            last_two.append(peaks.last_two(a, b, s, t, min_prominence[t]) if b - a >= 1 else None)
+
+        # --- Divergence baissière (higher high prix clôture + lower high RSI) ---
+        if last_two[0] is not None:
+            pp, lp = last_two[0]
+            if x[lp] > x[pp] * (1 + price_delta):
+                hi_lp = _rsi_extreme(lp, s, t, rsi_max, max)
+                hi_pp = _rsi_extreme(pp, s, t, rsi_max, max)
+                if hi_lp < hi_pp - min_rsi_delta:
+                    codes[t] = DIV_BEAR
+                    continue
+
+        # --- Divergence haussière (lower low prix clôture + higher low RSI) ---
+        if last_two[1] is not None:
+            pt, lt = last_two[1]
+            if x[lt] < x[pt] * (1 - price_delta):
+                lo_lt = _rsi_extreme(lt, s, t, rsi_min, min)
+                lo_pt = _rsi_extreme(pt, s, t, rsi_min, min)
+                if lo_lt > lo_pt + min_rsi_delta:
+                    codes[t] = DIV_BULL
+
+    return codes
+
+
+def _detect_divergence_reference(price_close_full, rsi_full, lookback, peak_distance, price_delta):
+    """Ancienne détection par paire (closures ±2 + find_peaks), pour contrôle."""
+    if rsi_full is None or len(price_close_full) < MIN_BARS:
+        return DIV_NONE
+    lookback    = min(lookback, len(price_close_full))
+    price_close = price_close_full[-lookback:]
+    rsi_vals    = rsi_full[-lookback:]
+    n           = len(rsi_vals)
+
+    price_std      = np.std(price_close)
+    prominence_val = price_std * 0.5 if price_std > 0 else 0.0
+
+    def rsi_window(idx, fn):
+        window = rsi_vals[max(0, idx - 2):min(n, idx + 3)]
+        valid  = window[~np.isnan(window)]
+        return float(fn(valid)) if len(valid) > 0 else np.nan
+
+    peaks, _ = find_peaks(price_close, distance=peak_distance, prominence=prominence_val)
+    if len(peaks) >= 2:
+        pp, lp = peaks[-2], peaks[-1]
+        hi_lp, hi_pp = rsi_window(lp, np.max), rsi_window(pp, np.max)
+        if price_close[lp] > price_close[pp] * (1 + price_delta) and not (np.isnan(hi_lp) or np.isnan(hi_pp)):
+            if hi_lp < hi_pp - MIN_RSI_DELTA:
+                return DIV_BEAR
+
+    troughs, _ = find_peaks(-price_close, distance=peak_distance, prominence=prominence_val)
+    if len(troughs) >= 2:
+        pt, lt = troughs[-2], troughs[-1]
+        lo_lt, lo_pt = rsi_window(lt, np.min), rsi_window(pt, np.min)
+        if price_close[lt] < price_close[pt] * (1 - price_delta) and not (np.isnan(lo_lt) or np.isnan(lo_pt)):
+            if lo_lt > lo_pt + MIN_RSI_DELTA:
+                return DIV_BULL
+
+    return DIV_NONE
+
+
+def _benchmark(n_instruments=300, n_bars=200, lookback=40, peak_distance=3, repeat=5):
+    """Micro-benchmark lot vs par paire sur séries aléatoires (longueurs variées)."""
+    import time
+
+    from indicators import wilder_rsi
+
+    rng     = np.random.default_rng(7)
+    lengths = rng.integers(5, n_bars, n_instruments)
+    lengths[: n_instruments // 2] = n_bars
+    series  = [
+        1.10 * np.exp(np.cumsum(rng.normal(0, 2e-3, n)) + 0.01 * np.sin(np.arange(n) / rng.uniform(1.5, 4)))
+        for n in lengths
+    ]
+    rsis    = [wilder_rsi(s) for s in series]
+    deltas  = rng.choice([0.0003, 0.001, 0.002], n_instruments)
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for s, r, d in zip(series, rsis, deltas):
+            _detect_divergence_reference(s, r, lookback, peak_distance, d)
+    t_loop = (time.perf_counter() - t0) / repeat
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        closes, rsi, valid = stack_inputs(
+            [divergence_inputs(s, r, lookback) for s, r in zip(series, rsis)], lookback
+        )
+        detect_divergence_batch(closes, rsi, valid, deltas, peak_distance)
+    t_batch = (time.perf_counter() - t0) / repeat
+
+    print(f"par paire {t_loop * 1e3:.2f} ms | lot {t_batch * 1e3:.2f} ms | x{t_loop / t_batch:.1f}")
+
+
+def _benchmark_rolling(n_bars=3000, seeds=(3, 4, 5)):
+    """Micro-benchmark glissant vs detect_divergence rejoué à chaque bougie."""
+    import time
+
+    from indicators import wilder_rsi
+
+    t_roll = t_ref = 0.0
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        x   = 1.10 * np.exp(np.cumsum(rng.normal(0, 2e-3, n_bars)) + 0.01 * np.sin(np.arange(n_bars) / 2.5))
+        for closes in (x, np.round(x, 4)):
+            rsi = wilder_rsi(closes)
+            for tf, lookback in DIVERGENCE_LOOKBACK.items():
+                distance = DIVERGENCE_PEAK_DISTANCE[tf]
+                t0 = time.perf_counter()
+                rolling_divergence(closes, rsi, lookback, distance, 0.001)
+                t1 = time.perf_counter()
+                for t in range(n_bars):
+                    _detect_divergence_reference(closes[:t + 1], rsi[:t + 1], lookback, distance, 0.001)
+                t_roll += t1 - t0
+                t_ref  += time.perf_counter() - t1
+    bars = n_bars * len(seeds) * 2 * len(DIVERGENCE_LOOKBACK)
+    print(
+        f"glissant — {bars} bougies : par bougie {t_ref / bars * 1e6:.1f} µs | "
+        f"glissant {t_roll / bars * 1e6:.1f} µs | x{t_ref / t_roll:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    _benchmark()
+    _benchmark_rolling()
@@ -0,0 +1,101 @@
+"""
+Cache process-wide des exports d'un scan (PDF / JSON / CSV), rendus à la demande.
+
+Les exports ne sont plus produits à la fin de chaque scan ni copiés dans
+l'état de chaque session : le premier téléchargement d'un format le rend,
+les suivants (toutes sessions qui affichent le même scan) le relisent ici.
+
+- clé : (identifiant du scan, format) — un résultat de scan est immuable ;
+- single-flight : deux sessions qui demandent le même export en même temps
+  ne déclenchent qu'un rendu ;
+- borne mémoire : au-delà de `max_bytes`, les exports les moins récemment
+  servis sont évincés (ordre LRU) ; un export plus gros que la borne est
+  servi sans être conservé ;
+- prerender() : rendu anticipé dans un thread démon (optionnel), pour que le
+  tableau s'affiche avant que FPDF ne tourne.
+"""
+import collections
+import logging
+import threading
+import time
+
+from single_flight import SingleFlight
+
+logger = logging.getLogger("rsi_screener")
+
+
+class ExportCache:
+    """Octets des exports par clé, bornés en taille totale, thread-safe."""
+
+    def __init__(self, max_bytes=64 * 2**20):
+        self.max_bytes = max_bytes
+        self._lock     = threading.Lock()
+        self._entries  = collections.OrderedDict()   # clé → bytes, du moins au plus récent
+        self._bytes    = 0
+        self._flights  = SingleFlight()
+        self.hits      = 0
+        self.renders   = 0
+        self.evictions = 0
+        self.render_s  = 0.0
+
+    def _lookup_locked(self, key):
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+        return data
+
+    def get(self, key, fn, *args):
+        """Export de `key`, rendu par fn(*args) → bytes au premier appel."""
+        with self._lock:
+            data = self._lookup_locked(key)
+            if data is not None:
+                self.hits += 1
+                return data
+        return self._flights.do(key, self._render, key, fn, *args)
+
+    def _render(self, key, fn, *args):
+        with self._lock:
+            # Rendu terminé par un autre appelant entre la lecture et le vol.
+            data = self._lookup_locked(key)
+            if data is not None:
+                self.hits += 1
+                return data
+
+        t0   = time.perf_counter()
+        data = fn(*args)
+        with self._lock:
+            self.renders  += 1
+            self.render_s += time.perf_counter() - t0
+            if len(data) <= self.max_bytes:
+                self._entries[key] = data
+                self._bytes       += len(data)
+                while self._bytes > self.max_bytes:
+                    _, evicted      = self._entries.popitem(last=False)
+                    self._bytes    -= len(evicted)
+                    self.evictions += 1
+        return data
+
+    def prerender(self, key, fn, *args):
+        """Rendu de `key` en arrière-plan s'il n'est pas déjà en cache."""
+        def _run():
+            try:
+                self.get(key, fn, *args)
+            except Exception as e:
+                logger.exception("Export pre-render failed for %s: %s", key, e)
+
+        with self._lock:
+            if key in self._entries:
+                return
+        threading.Thread(target=_run, name=f"export-{key}", daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries':   len(self._entries),
+                'bytes':     self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits':      self.hits,
+                'renders':   self.renders,
+                'evictions': self.evictions,
+                'render_s':  self.render_s,
+            }
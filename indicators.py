@@ -0,0 +1,330 @@
+"""
+Moteur d'indicateurs vectorisé — indépendant de Streamlit.
+
+Le RSI Wilder est une récurrence linéaire du premier ordre :
+
+    avg[t] = avg[t-1] * (p-1)/p + x[t] / p
+
+ce qui correspond exactement à un filtre IIR que scipy.signal.lfilter
+applique en C sur un bloc 2D complet (une ligne par instrument). Plus
+aucune boucle Python par bougie.
+
+Exécution directe (`python indicators.py`) : micro-benchmark contre la
+boucle de référence historique ; l'équivalence est couverte par
+tests/test_indicators.py (`python -m pytest`).
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+RSI_PERIOD = 14
+
+
+def _as_rows(closes):
+    """Normalise l'entrée en matrice float64 (instruments × bougies)."""
+    arr = np.asarray(closes, dtype=np.float64)
+    if arr.ndim == 1:
+        arr = arr[np.newaxis, :]
+    if arr.ndim != 2:
+        raise ValueError(f"closes doit être 1D ou 2D, reçu ndim={arr.ndim}")
+    return arr
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    """
+    Conversion vectorisée (avg_gain, avg_loss) → RSI avec les mêmes cas
+    limites que la version scalaire :
+    - marché plat  (0, 0)   → 50
+    - hausse pure  (>0, 0)  → 100
+    - chute pure   (0, >0)  → 0
+    Les NaN en entrée restent NaN.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    rsi = np.where((avg_loss == 0) & (avg_gain > 0), 100.0, rsi)
+    rsi = np.where((avg_gain == 0) & (avg_loss > 0), 0.0, rsi)
+    rsi = np.where((avg_gain == 0) & (avg_loss == 0), 50.0, rsi)
+    return rsi
+
+
+def wilder_smooth_matrix(closes, period=RSI_PERIOD):
+    """
+    RSI Wilder vectorisé sur un bloc de clôtures (n_instruments × n_bougies).
+
+    Les séries plus courtes que la largeur du bloc sont complétées par des NaN
+    en tête (alignement à droite sur la bougie la plus récente). Chaque ligne
+    doit être contiguë après ce padding.
+
+    Sémantique strictement identique à l'ancienne boucle de calculate_rsi :
+    seed SMA sur les deltas 1..period, premier RSI à l'indice `period`
+    (relatif au premier prix valide), NaN avant. Une ligne comptant moins de
+    period+1 prix valides est entièrement NaN.
+
+    Retourne (rsi, avg_gain_last, avg_loss_last) : la matrice RSI float64 de
+    même forme que l'entrée, et les moyennes Wilder à la dernière bougie de
+    chaque ligne (NaN si la ligne est trop courte) — de quoi amorcer un
+    RsiState incrémental sans second passage.
+    """
+    block = _as_rows(closes)
+    n_rows, n_cols = block.shape
+    out = np.full((n_rows, n_cols), np.nan)
+    last_gain = np.full(n_rows, np.nan)
+    last_loss = np.full(n_rows, np.nan)
+    if n_cols < period + 1 or n_rows == 0:
+        return out, last_gain, last_loss
+
+    # Alignement à gauche : le premier prix valide de chaque ligne en colonne 0.
+    valid      = ~np.isnan(block)
+    has_valid  = valid.any(axis=1)
+    start      = np.where(has_valid, valid.argmax(axis=1), n_cols)
+    lengths    = n_cols - start
+    cols       = (np.arange(n_cols)[np.newaxis, :] + start[:, np.newaxis]) % n_cols
+    aligned    = np.take_along_axis(block, cols, axis=1)
+    tail_mask  = np.arange(n_cols)[np.newaxis, :] >= lengths[:, np.newaxis]
+    aligned[tail_mask] = np.nan
+
+    delta  = np.diff(aligned, axis=1)
+    gains  = np.clip(delta, 0.0, None)
+    losses = np.clip(-delta, 0.0, None)
+
+    # Seed Wilder : SMA sur les `period` premiers deltas (indices prix 1..period).
+    seed_gain = gains[:, :period].mean(axis=1)
+    seed_loss = losses[:, :period].mean(axis=1)
+
+    # La boucle historique réappliquait le delta d'indice `period` sur le seed :
+    # on conserve ce comportement pour rester bit-compatible au bruit flottant près.
+    b      = [1.0 / period]
+    a      = [1.0, -(period - 1.0) / period]
+    decay  = (period - 1.0) / period
+    avg_gain, _ = lfilter(b, a, gains[:, period - 1:], axis=1,
+                          zi=(seed_gain * decay)[:, np.newaxis])
+    avg_loss, _ = lfilter(b, a, losses[:, period - 1:], axis=1,
+                          zi=(seed_loss * decay)[:, np.newaxis])
+
+    aligned_rsi = np.full((n_rows, n_cols), np.nan)
+    aligned_rsi[:, period:] = _rsi_from_averages(avg_gain, avg_loss)
+    aligned_rsi[lengths < period + 1] = np.nan
+    aligned_rsi[tail_mask] = np.nan
+
+    long_enough = lengths >= period + 1
+    last_idx    = np.clip(lengths - 1 - period, 0, None)[:, np.newaxis]
+    last_gain[long_enough] = np.take_along_axis(avg_gain, last_idx, axis=1)[long_enough, 0]
+    last_loss[long_enough] = np.take_along_axis(avg_loss, last_idx, axis=1)[long_enough, 0]
+
+    # Retour à l'alignement d'origine (padding en tête).
+    np.put_along_axis(out, cols, aligned_rsi, axis=1)
+    out[~has_valid] = np.nan
+    return out, last_gain, last_loss
+
+
+def wilder_rsi_matrix(closes, period=RSI_PERIOD):
+    """
+    RSI Wilder vectorisé sur un bloc de clôtures (n_instruments × n_bougies).
+    Voir wilder_smooth_matrix ; retourne uniquement la matrice RSI.
+    """
+    return wilder_smooth_matrix(closes, period)[0]
+
+
+def wilder_rsi(closes, period=RSI_PERIOD):
+    """Raccourci 1D de wilder_rsi_matrix — retourne un vecteur float64."""
+    return wilder_rsi_matrix(closes, period)[0]
+
+
+class RsiState:
+    """
+    État RSI Wilder persistant pour un couple (instrument, granularité).
+
+    Contient les dernières moyennes avg_gain / avg_loss, la dernière clôture
+    et l'horodatage de la dernière bougie complète, plus la série RSI de la
+    fenêtre courante (nécessaire à detect_divergence). Immuable : advance()
+    retourne un nouvel état, ce qui permet de le partager entre threads sans
+    verrou.
+    """
+
+    __slots__ = ('period', 'avg_gain', 'avg_loss', 'last_close', 'last_ts', 'rsi_series')
+
+    def __init__(self, period, avg_gain, avg_loss, last_close, last_ts, rsi_series):
+        self.period     = period
+        self.avg_gain   = avg_gain
+        self.avg_loss   = avg_loss
+        self.last_close = last_close
+        self.last_ts    = last_ts
+        self.rsi_series = rsi_series
+
+    @classmethod
+    def from_closes(cls, close_series, period=RSI_PERIOD):
+        """Recalcul complet sur une série de clôtures indexée par le temps. None si trop courte."""
+        if close_series is None or len(close_series) < period + 1:
+            return None
+        rsi, avg_gain, avg_loss = wilder_smooth_matrix(
+            close_series.to_numpy(dtype=np.float64), period
+        )
+        if np.isnan(avg_gain[0]) or np.isnan(avg_loss[0]):
+            return None
+        return cls(
+            period, float(avg_gain[0]), float(avg_loss[0]),
+            float(close_series.iloc[-1]), close_series.index[-1],
+            pd.Series(rsi[0], index=close_series.index),
+        )
+
+    def is_contiguous_with(self, close_series):
+        """
+        Vrai si la série récupérée prolonge exactement cet état : la dernière
+        bougie connue y figure avec la même clôture, et l'historique RSI
+        conservé couvre le début de la fenêtre. Sinon il y a un trou (ou une
+        fenêtre différente) et seul un recalcul complet est fiable.
+        """
+        if close_series is None or close_series.empty or self.rsi_series.empty:
+            return False
+        if self.rsi_series.index[0] > close_series.index[0]:
+            return False
+        try:
+            known_close = close_series.loc[self.last_ts]
+        except KeyError:
+            return False
+        return float(known_close) == self.last_close
+
+    def advance(self, new_closes):
+        """
+        Avance l'état sur les seules nouvelles clôtures (série indexée par le
+        temps, toutes postérieures à last_ts) — coût O(nouvelles bougies).
+        """
+        if new_closes is None or new_closes.empty:
+            return self
+
+        values = new_closes.to_numpy(dtype=np.float64)
+        delta  = np.diff(values, prepend=self.last_close)
+        gains  = np.clip(delta, 0.0, None)
+        losses = np.clip(-delta, 0.0, None)
+
+        b     = [1.0 / self.period]
+        a     = [1.0, -(self.period - 1.0) / self.period]
+        decay = (self.period - 1.0) / self.period
+        avg_gain, _ = lfilter(b, a, gains,  zi=[self.avg_gain * decay])
+        avg_loss, _ = lfilter(b, a, losses, zi=[self.avg_loss * decay])
+
+        new_rsi = pd.Series(_rsi_from_averages(avg_gain, avg_loss), index=new_closes.index)
+        return RsiState(
+            self.period, float(avg_gain[-1]), float(avg_loss[-1]),
+            float(values[-1]), new_closes.index[-1],
+            pd.concat([self.rsi_series, new_rsi]),
+        )
+
+    def trimmed_to(self, index):
+        """Même état, série RSI restreinte à la fenêtre `index` (borne la mémoire)."""
+        return RsiState(
+            self.period, self.avg_gain, self.avg_loss, self.last_close, self.last_ts,
+            self.rsi_series.reindex(index),
+        )
+
+
+class RsiStateStore:
+    """Registre thread-safe des RsiState, clé (instrument, granularité)."""
+
+    def __init__(self):
+        self._lock   = threading.Lock()
+        self._states = {}
+
+    def get(self, key):
+        with self._lock:
+            return self._states.get(key)
+
+    def put(self, key, state):
+        with self._lock:
+            if state is None:
+                self._states.pop(key, None)
+            else:
+                self._states[key] = state
+
+    def __len__(self):
+        with self._lock:
+            return len(self._states)
+
+
+def rsi_series_incremental(close_series, store, key, period=RSI_PERIOD):
+    """
+    Série RSI de la fenêtre `close_series`, en réutilisant l'état stocké sous
+    `key` lorsqu'il est contigu (seules les bougies postérieures à last_ts
+    sont traitées), sinon recalcul complet. Met à jour le registre.
+
+    Note : une fois avancé, l'état conserve son seed d'origine ; le résultat
+    peut donc différer d'un recalcul sur la seule fenêtre de l'ordre de
+    ((p-1)/p)^len(fenêtre), soit ~1e-6 sur 200 bougies H1.
+    """
+    state = store.get(key)
+    if state is not None and state.period == period and state.is_contiguous_with(close_series):
+        state = state.advance(close_series[close_series.index > state.last_ts])
+    else:
+        state = RsiState.from_closes(close_series, period)
+
+    if state is None:
+        store.put(key, None)
+        return None
+
+    state = state.trimmed_to(close_series.index)
+    store.put(key, state)
+    return state.rsi_series
+
+
+def _wilder_rsi_reference(closes, period=RSI_PERIOD):
+    """
+    Boucle Python historique de calculate_rsi, conservée uniquement comme
+    référence pour le contrôle d'équivalence et le benchmark.
+    """
+    close_prices = np.asarray(closes, dtype=np.float64)
+    if len(close_prices) < period + 1:
+        return np.full(len(close_prices), np.nan)
+
+    delta  = np.diff(close_prices, prepend=np.nan)
+    gains  = np.clip(delta, 0.0, None)
+    losses = np.clip(-delta, 0.0, None)
+
+    avg_gain = gains[1:period + 1].mean()
+    avg_loss = losses[1:period + 1].mean()
+    rsi_list = [np.nan] * period
+
+    for i in range(period, len(close_prices)):
+        avg_gain = (avg_gain * (period - 1) + gains[i]) / period
+        avg_loss = (avg_loss * (period - 1) + losses[i]) / period
+        if avg_gain == 0 and avg_loss == 0:
+            rsi_list.append(50.0)
+        elif avg_loss == 0:
+            rsi_list.append(100.0)
+        elif avg_gain == 0:
+            rsi_list.append(0.0)
+        else:
+            rs = avg_gain / avg_loss
+            rsi_list.append(100.0 - 100.0 / (1.0 + rs))
+
+    return np.asarray(rsi_list, dtype=np.float64)
+
+
+def _benchmark(n_instruments=33, n_bars=200, repeat=20):
+    """Micro-benchmark boucle de référence vs bloc 2D."""
+    import time
+
+    rng    = np.random.default_rng(42)
+    closes = 1.10 * np.exp(np.cumsum(rng.normal(0, 1e-3, (n_instruments, n_bars)), axis=1))
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for row in closes:
+            _wilder_rsi_reference(row)
+    t_loop = (time.perf_counter() - t0) / repeat
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        wilder_rsi_matrix(closes)
+    t_vec = (time.perf_counter() - t0) / repeat
+
+    print(
+        f"{n_instruments}×{n_bars} : boucle {t_loop * 1e3:.2f} ms | "
+        f"bloc 2D {t_vec * 1e3:.2f} ms | x{t_loop / t_vec:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    _benchmark()
+    _benchmark(n_instruments=300, n_bars=2000, repeat=3)
@@ -0,0 +1,238 @@
+"""
+Instrumentation du pipeline de scan : latences par étape et compteurs.
+
+Jusqu'ici seuls les logger.warning renseignaient sur un scan lent ; on ne
+savait pas quelle part allait à l'attente de débit, aux backoffs, à la
+latence HTTP, au parsing, au RSI, aux divergences ou aux exports.
+
+- StageMetrics : registre du process — un histogramme de latence (buckets
+  cumulés façon Prometheus) et des compteurs par étiquettes (étape,
+  instrument, granularité, issue) ; exporté en texte Prometheus
+  (to_prometheus) ou en JSON (to_json) ;
+- ScanSummary : totaux par étape d'un seul scan (appels, temps cumulé, max,
+  issues), rendu visible à tout le code du scan par une ContextVar
+  (scan_metrics_scope), comme l'échéance de deadline.py : chaque observation
+  du registre y est aussi ajoutée ;
+- serve_metrics : endpoint HTTP local (/metrics, /metrics.json) dans un
+  thread démon.
+
+Les temps des étapes parallèles (6 workers, tâches asyncio) se cumulent : le
+total d'une étape est du temps de travail, pas du temps mural.
+"""
+import bisect
+import collections
+import contextlib
+import contextvars
+import http.server
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger("rsi_screener")
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_LABELS = ('stage', 'instrument', 'granularity', 'outcome')
+
+_SCAN = contextvars.ContextVar("scan_metrics", default=None)
+
+
+class ScanSummary:
+    """Totaux par étape d'un scan : appels, temps cumulé, max et issues ; compteurs d'événements."""
+
+    def __init__(self):
+        self._lock   = threading.Lock()
+        self._stages = {}                          # étape → [appels, total_s, max_s, Counter(issue)]
+        self._events = collections.Counter()       # (événement, issue) → n
+
+    def add(self, stage, seconds, outcome):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = [0, 0.0, 0.0, collections.Counter()]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2]  = max(entry[2], seconds)
+            entry[3][outcome] += 1
+
+    def count(self, event, outcome, n=1):
+        with self._lock:
+            self._events[(event, outcome)] += n
+
+    def as_dict(self):
+        """{'stages': {étape: {calls, total_s, max_s, outcomes}}, 'events': {événement: {issue: n}}}."""
+        with self._lock:
+            events = {}
+            for (event, outcome), n in sorted(self._events.items()):
+                events.setdefault(event, {})[outcome] = n
+            return {
+                'stages': {
+                    stage: {
+                        'calls':    calls,
+                        'total_s':  round(total, 4),
+                        'max_s':    round(peak, 4),
+                        'outcomes': dict(outcomes),
+                    }
+                    for stage, (calls, total, peak, outcomes) in sorted(self._stages.items())
+                },
+                'events': events,
+            }
+
+
+@contextlib.contextmanager
+def scan_metrics_scope(summary):
+    token = _SCAN.set(summary)
+    try:
+        yield summary
+    finally:
+        _SCAN.reset(token)
+
+
+class StageMetrics:
+    """Histogrammes de latence et compteurs étiquetés, thread-safe."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets     = tuple(buckets)
+        self._lock       = threading.Lock()
+        self._histograms = {}                      # étiquettes → [comptes par bucket (+Inf inclus), somme, n]
+        self._counters   = collections.Counter()   # (événement, instrument, granularité, issue) → n
+
+    def observe(self, stage, seconds, instrument='', granularity='', outcome='ok'):
+        """Ajoute une durée (s) à l'histogramme de l'étape et au ScanSummary courant."""
+        key   = (stage, instrument, granularity, outcome)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1]        += seconds
+            entry[2]        += 1
+        summary = _SCAN.get()
+        if summary is not None:
+            summary.add(stage, seconds, outcome)
+
+    @contextlib.contextmanager
+    def timer(self, stage, instrument='', granularity='', outcome='ok'):
+        """Chronomètre un bloc ; issue 'error' si le bloc lève."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.observe(stage, time.perf_counter() - t0, instrument, granularity, 'error')
+            raise
+        self.observe(stage, time.perf_counter() - t0, instrument, granularity, outcome)
+
+    def count(self, event, instrument='', granularity='', outcome='ok', n=1):
+        with self._lock:
+            self._counters[(event, instrument, granularity, outcome)] += n
+        summary = _SCAN.get()
+        if summary is not None:
+            summary.count(event, outcome, n)
+
+    def snapshot(self):
+        """Histogrammes (buckets cumulés) et compteurs, sous forme de listes de dicts."""
+        with self._lock:
+            histograms = [
+                (key, list(counts), total, n) for key, (counts, total, n) in sorted(self._histograms.items())
+            ]
+            counters = sorted(self._counters.items())
+        out = {'buckets': list(self.buckets), 'histograms': [], 'counters': []}
+        for key, counts, total, n in histograms:
+            cumulative, running = [], 0
+            for c in counts:
+                running += c
+                cumulative.append(running)
+            out['histograms'].append({
+                **dict(zip(_LABELS, key)), 'count': n, 'sum': total, 'cumulative': cumulative,
+            })
+        for (event, instrument, granularity, outcome), n in counters:
+            out['counters'].append({
+                'event': event, 'instrument': instrument, 'granularity': granularity,
+                'outcome': outcome, 'value': n,
+            })
+        return out
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False)
+
+    def to_prometheus(self, prefix="rsi_screener"):
+        """Format d'exposition texte Prometheus 0.0.4."""
+        snap  = self.snapshot()
+        edges = [_le(b) for b in snap['buckets']] + ['+Inf']
+        lines = [
+            f"# HELP {prefix}_stage_seconds Latence par étape du pipeline de scan.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for h in snap['histograms']:
+            labels = _labels(h, _LABELS)
+            for le, value in zip(edges, h['cumulative']):
+                lines.append(f'{prefix}_stage_seconds_bucket{{{labels},le="{le}"}} {value}')
+            lines.append(f"{prefix}_stage_seconds_sum{{{labels}}} {h['sum']!r}")
+            lines.append(f"{prefix}_stage_seconds_count{{{labels}}} {h['count']}")
+        lines += [
+            f"# HELP {prefix}_events_total Événements du pipeline de scan (retries, abandons, hits de cache...).",
+            f"# TYPE {prefix}_events_total counter",
+        ]
+        for c in snap['counters']:
+            lines.append(f"{prefix}_events_total{{{_labels(c, ('event',) + _LABELS[1:])}}} {c['value']}")
+        return "\n".join(lines) + "\n"
+
+
+def http_outcome(status):
+    """Issue d'une réponse HTTP : ok, throttled (429), client_error (4xx), server_error (5xx), error."""
+    if not isinstance(status, int):
+        return 'error'
+    if status < 400:
+        return 'ok'
+    if status == 429:
+        return 'throttled'
+    return 'client_error' if status < 500 else 'server_error'
+
+
+def _le(bound):
+    return repr(float(bound))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(entry, names):
+    return ",".join(f'{name}="{_escape(entry[name])}"' for name in names)
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        registry = self.server.registry
+        path     = self.path.split('?', 1)[0]
+        if path == '/metrics':
+            body, ctype = registry.to_prometheus(), 'text/plain; version=0.0.4; charset=utf-8'
+        elif path == '/metrics.json':
+            body, ctype = registry.to_json(), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve_metrics(registry, port, host='127.0.0.1'):
+    """
+    Sert /metrics (Prometheus) et /metrics.json depuis un thread démon ;
+    retourne le serveur (server.server_address pour le port effectif).
+    """
+    server = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry       = registry
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("Metrics endpoint on http://%s:%d/metrics", *server.server_address[:2])
+    return server
@@ -0,0 +1,329 @@
+"""
+Backend de fetch OANDA asyncio — alternative au ThreadPoolExecutor.
+
+Un seul client HTTP keep-alive (httpx.AsyncClient, pool de connexions)
+porte toutes les requêtes (paire, TF), lancées comme tâches indépendantes.
+Deux limites distinctes :
+- concurrence : nombre max de requêtes en vol (asyncio.Semaphore) ;
+- débit       : token bucket rate_limit.TokenBucket, éventuellement le seau
+                partagé par tout le process (même budget que les threads).
+
+Politique de retry identique au backend threads (_request_candles) :
+400/401/403 fatals, 429/5xx/timeouts retentés avec backoff exponentiel +
+jitter, sous l'échéance du scan s'il y en a une (deadline.current_deadline,
+héritée par les tâches) : pas de tentative après l'échéance, pas d'attente
+qui la dépasse, timeout HTTP borné par le budget restant. Disjoncteur
+optionnel (circuit_breaker.CircuitBreaker, celui du process) : alimenté par
+chaque issue, il fait échouer vite les requêtes tant qu'il est ouvert. Le parsing passe
+par candle_store.parse_candles : les DataFrames
+produits sont identiques à ceux de fetch_forex_data_oanda. Registre
+metrics.StageMetrics optionnel : mêmes étapes chronométrées que le backend
+threads, plus l'attente du sémaphore de concurrence.
+
+Exécution directe (`python oanda_async.py`) : benchmark threads vs asyncio
+contre le serveur factice oanda_stub ; l'égalité des sorties est couverte
+par tests/test_oanda_async.py.
+"""
+import asyncio
+import logging
+import random
+import time
+
+import httpx
+
+from candle_store import parse_candles
+from circuit_breaker import OPEN
+from deadline import current_deadline
+from metrics import StageMetrics, http_outcome
+from rate_limit import TokenBucket
+
+logger = logging.getLogger("rsi_screener")
+
+OANDA_API_URLS = {
+    'practice': 'https://api-fxpractice.oanda.com',
+    'live':     'https://api-fxtrade.oanda.com',
+}
+
+_FATAL_STATUS = (400, 401, 403)
+
+
+class AsyncOandaFetcher:
+    """
+    Client InstrumentsCandles asynchrone, à utiliser comme context manager :
+
+        async with AsyncOandaFetcher(token, 'practice') as fetcher:
+            df, received = await fetcher.request_candles('EUR/USD', 'H1', params)
+    """
+
+    def __init__(self, access_token, environment='practice', base_url=None,
+                 max_concurrency=6, rate_per_sec=20.0, timeout=10, max_retries=3,
+                 rate_limiter=None, circuit_breaker=None, metrics=None):
+        self._base_url    = base_url or OANDA_API_URLS[environment]
+        self._token       = access_token
+        self._timeout     = timeout
+        self._max_retries = max_retries
+        self._max_conc    = max_concurrency
+        self._client      = None
+        self._semaphore   = None
+        self._limiter     = rate_limiter
+        self._breaker     = circuit_breaker
+        self._metrics     = metrics if metrics is not None else StageMetrics()
+        if self._limiter is None and rate_per_sec:
+            self._limiter = TokenBucket(rate_per_sec, burst=max_concurrency)
+        self.requests     = 0
+        self.retries      = 0
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(
+            base_url=self._base_url,
+            headers={
+                'Authorization':   f'Bearer {self._token}',
+                'Accept-Encoding': 'gzip, deflate',
+            },
+            timeout=self._timeout,
+            limits=httpx.Limits(
+                max_connections=self._max_conc,
+                max_keepalive_connections=self._max_conc,
+            ),
+        )
+        self._semaphore = asyncio.Semaphore(self._max_conc)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._client.aclose()
+        self._client = None
+
+    async def _wait_unless_open(self, wait, step=0.25):
+        """
+        Attente rate-limit par tranches : toutes les tâches réservent leur jeton
+        d'emblée, les dernières attendent plusieurs secondes — si le disjoncteur
+        s'ouvre entre-temps, elles échouent vite au lieu d'attendre pour rien.
+        """
+        end = time.monotonic() + wait
+        while True:
+            left = end - time.monotonic()
+            if left <= 0:
+                return True
+            if self._breaker is not None and self._breaker.fail_fast():
+                return False
+            await asyncio.sleep(min(step, left))
+
+    async def request_candles(self, pair, timeframe_key, params):
+        """
+        Même contrat que _request_candles côté threads : (DataFrame des bougies
+        complètes — éventuellement vide, nb de bougies reçues), ou (None, 0).
+        """
+        url      = f"/v3/instruments/{pair.replace('/', '_')}/candles"
+        deadline = current_deadline()
+        metrics  = self._metrics
+
+        for attempt in range(self._max_retries):
+            if deadline is not None and deadline.expired:
+                logger.warning("Scan deadline reached — skipping %s %s", pair, timeframe_key)
+                deadline.skip(pair)
+                metrics.count('fetch_aborted', pair, timeframe_key, 'deadline')
+                return None, 0
+            try:
+                if self._breaker is not None and self._breaker.fail_fast():
+                    logger.warning("OANDA circuit open — failing fast %s %s", pair, timeframe_key)
+                    metrics.count('fetch_aborted', pair, timeframe_key, 'circuit_open')
+                    return None, 0
+                if self._limiter is not None:
+                    wait = self._limiter.reserve()
+                    if wait > 0:
+                        if deadline is not None and not deadline.allows(wait):
+                            self._limiter.release()
+                            logger.warning("Rate-limit wait exceeds scan deadline — skipping %s %s", pair, timeframe_key)
+                            deadline.skip(pair)
+                            metrics.count('fetch_aborted', pair, timeframe_key, 'deadline')
+                            return None, 0
+                        t0     = time.perf_counter()
+                        waited = await self._wait_unless_open(wait)
+                        metrics.observe('rate_limit_wait', time.perf_counter() - t0, pair, timeframe_key,
+                                        'ok' if waited else 'circuit_open')
+                        if not waited:
+                            self._limiter.release()
+                            logger.warning("OANDA circuit opened during rate-limit wait — failing fast %s %s",
+                                           pair, timeframe_key)
+                            metrics.count('fetch_aborted', pair, timeframe_key, 'circuit_open')
+                            return None, 0
+                if self._breaker is not None and not self._breaker.allow():
+                    if self._limiter is not None:
+                        self._limiter.release()
+                    logger.warning("OANDA circuit open — failing fast %s %s", pair, timeframe_key)
+                    metrics.count('fetch_aborted', pair, timeframe_key, 'circuit_open')
+                    return None, 0
+                t0 = time.perf_counter()
+                async with self._semaphore:
+                    sent = time.perf_counter()
+                    metrics.observe('semaphore_wait', sent - t0, pair, timeframe_key)
+                    self.requests += 1
+                    timeout  = self._timeout if deadline is None else deadline.timeout(self._timeout)
+                    try:
+                        response = await self._client.get(url, params=params, timeout=timeout)
+                    except httpx.HTTPError:
+                        metrics.observe('http', time.perf_counter() - sent, pair, timeframe_key, 'network_error')
+                        if self._breaker is not None:
+                            self._breaker.record_failure()   # timeout, connexion
+                        raise
+                    metrics.observe('http', time.perf_counter() - sent, pair, timeframe_key,
+                                    http_outcome(response.status_code))
+                if self._limiter is not None:
+                    self._limiter.observe(response.status_code, response.headers.get('Retry-After'))
+                if self._breaker is not None:
+                    if response.status_code >= 500:
+                        self._breaker.record_failure()
+                    else:
+                        self._breaker.record_success()
+
+                if response.status_code == 200:
+                    with metrics.timer('parse', pair, timeframe_key):
+                        candles = response.json().get('candles', [])
+                        df      = parse_candles(candles, pair, timeframe_key)
+                    return df, len(candles)
+
+                if response.status_code in _FATAL_STATUS:
+                    logger.error(
+                        "Fatal OANDA error %s for %s %s — aborting retries: %s",
+                        response.status_code, pair, timeframe_key, response.text[:200]
+                    )
+                    metrics.count('fetch_aborted', pair, timeframe_key, 'fatal')
+                    return None, 0
+
+                logger.warning(
+                    "async fetch attempt %d/%d HTTP %s for %s %s",
+                    attempt + 1, self._max_retries, response.status_code, pair, timeframe_key
+                )
+
+            except (httpx.HTTPError, ValueError) as e:
+                logger.warning(
+                    "async fetch attempt %d/%d failed for %s %s: %s",
+                    attempt + 1, self._max_retries, pair, timeframe_key, e
+                )
+
+            if self._breaker is not None and self._breaker.state == OPEN:
+                logger.warning("OANDA circuit opened — no retry for %s %s", pair, timeframe_key)
+                metrics.count('fetch_aborted', pair, timeframe_key, 'circuit_open')
+                return None, 0
+            if attempt < self._max_retries - 1:
+                backoff = min(60, 2 ** attempt) + random.random()
+                if deadline is not None and not deadline.allows(backoff):
+                    logger.warning(
+                        "Backoff %.1fs exceeds scan deadline — giving up %s %s", backoff, pair, timeframe_key
+                    )
+                    deadline.skip(pair)
+                    metrics.observe('backoff', 0.0, pair, timeframe_key, 'deadline')
+                    metrics.count('fetch_aborted', pair, timeframe_key, 'deadline')
+                    return None, 0
+                self.retries += 1
+                with metrics.timer('backoff', pair, timeframe_key):
+                    await asyncio.sleep(backoff)
+
+        logger.error("Fetch definitively failed for %s %s", pair, timeframe_key)
+        metrics.count('fetch_aborted', pair, timeframe_key, 'retries_exhausted')
+        return None, 0
+
+
+async def run_plan_async(plan, fetcher, pair, timeframe_key):
+    """Pilote asynchrone d'un plan de fenêtre (générateur params → réponse)."""
+    try:
+        params = next(plan)
+        while True:
+            params = plan.send(await fetcher.request_candles(pair, timeframe_key, params))
+    except StopIteration as done:
+        return done.value
+
+
+async def fetch_plans(fetcher, plans, on_done=None):
+    """
+    Exécute des plans indépendants en parallèle.
+
+    plans   : dict clé → (pair, timeframe_key, plan)
+    on_done : callback(clé, résultat, nb_terminés, total) appelé à chaque fin
+    Retourne dict clé → fenêtre (DataFrame ou None).
+    """
+    async def _run(key, pair, timeframe_key, plan):
+        try:
+            return key, await run_plan_async(plan, fetcher, pair, timeframe_key)
+        except Exception as e:
+            logger.exception("Async plan crashed for %s %s: %s", pair, timeframe_key, e)
+            return key, None
+
+    tasks = [
+        asyncio.create_task(_run(key, pair, tf, plan))
+        for key, (pair, tf, plan) in plans.items()
+    ]
+    results = {}
+    for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+        key, value = await task
+        results[key] = value
+        if on_done is not None:
+            on_done(key, value, done, len(tasks))
+    return results
+
+
+def _full_plan(timeframe_key, count):
+    """Plan minimal (une requête complète) pour le benchmark."""
+    df, _ = yield {'granularity': timeframe_key, 'count': count}
+    return df if df is not None and not df.empty else None
+
+
+def _benchmark(n_instruments=33, latency=0.05):
+    """Threads (oandapyV20 + Semaphore(3) + jitter) vs asyncio, contre le stub."""
+    import concurrent.futures
+    import threading
+    import time
+
+    import oandapyV20.endpoints.instruments as instruments
+    import oandapyV20.oandapyV20 as v20
+    import pandas as pd
+    from oandapyV20 import API
+
+    from oanda_stub import serve_in_thread
+
+    counts = {'H1': 200, 'H4': 200, 'D': 150, 'W': 100, 'M': 60}
+    pairs  = [f"SYN{i:03d}/USD" for i in range(n_instruments)]
+    cells  = [(pair, tf) for pair in pairs for tf in counts]
+    server = serve_in_thread(latency=latency, now=pd.Timestamp('2024-06-05 12:30', tz='UTC'))
+    v20.TRADING_ENVIRONMENTS['stub'] = {'api': server.base_url, 'stream': server.base_url}
+
+    # --- Backend threads (reproduction du chemin historique) ---
+    client    = API(access_token="stub", environment='stub', request_params={"timeout": 10})
+    semaphore = threading.Semaphore(3)
+
+    def _sync_fetch(pair, tf):
+        time.sleep(random.uniform(0.05, 0.15))
+        with semaphore:
+            r = instruments.InstrumentsCandles(
+                instrument=pair.replace('/', '_'), params={'granularity': tf, 'count': counts[tf]}
+            )
+            client.request(r)
+        return parse_candles(r.response.get('candles', []), pair, tf)
+
+    t0 = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
+        futures = [executor.submit(_sync_fetch, p, tf) for p, tf in cells]
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
+    t_sync = time.perf_counter() - t0
+
+    # --- Backend asyncio ---
+    async def _async_all():
+        async with AsyncOandaFetcher("stub", base_url=server.base_url,
+                                     max_concurrency=6, rate_per_sec=0) as fetcher:
+            plans = {(p, tf): (p, tf, _full_plan(tf, counts[tf])) for p, tf in cells}
+            return await fetch_plans(fetcher, plans)
+
+    t0 = time.perf_counter()
+    asyncio.run(_async_all())
+    t_async = time.perf_counter() - t0
+    server.shutdown()
+
+    print(
+        f"{len(cells)} requêtes, latence stub {latency * 1e3:.0f} ms : "
+        f"threads {t_sync:.2f} s | asyncio {t_async:.2f} s | x{t_sync / t_async:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,170 @@
+"""
+Serveur OANDA v20 factice (endpoint /v3/instruments/{instrument}/candles)
+pour les essais et benchmarks des backends de fetch, sans compte ni réseau.
+
+Les bougies sont déterministes : le prix est une fonction du numéro absolu de
+bougie et de l'instrument, donc deux requêtes qui se recouvrent renvoient des
+valeurs identiques (indispensable pour valider fetch différentiel et
+agrégation). La dernière bougie de chaque série est incomplète, comme chez
+OANDA. Latence, taux d'erreurs 5xx et de réponses 429 (avec Retry-After)
+sont paramétrables.
+
+    python oanda_stub.py --port 8765 --latency 0.05
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+_DURATION = {
+    'M1': pd.Timedelta(minutes=1), 'M5': pd.Timedelta(minutes=5), 'M15': pd.Timedelta(minutes=15),
+    'H1': pd.Timedelta(hours=1), 'H4': pd.Timedelta(hours=4), 'D': pd.Timedelta(days=1),
+    'W': pd.Timedelta(days=7), 'M': pd.Timedelta(days=30),   # M approximé à 30 jours
+}
+_EPOCH = pd.Timestamp('2000-01-01', tz='UTC')
+
+
+def synthetic_candles(instrument, granularity, bar_numbers, now_bar):
+    """Bougies OANDA (format JSON v20) pour les numéros de bougie demandés."""
+    seed  = (zlib.crc32(f"{instrument}:{granularity}".encode()) % 1000) / 100.0
+    base  = 100.0 if 'JPY' in instrument else 1.0 + (zlib.crc32(instrument.encode()) % 50) / 100.0
+    n     = np.asarray(bar_numbers, dtype=np.float64)
+    close = base * (1 + 0.02 * np.sin(n / 7.0 + seed) + 0.01 * np.sin(n / 3.1 + 2 * seed))
+    open_ = base * (1 + 0.02 * np.sin((n - 1) / 7.0 + seed) + 0.01 * np.sin((n - 1) / 3.1 + 2 * seed))
+    high  = np.maximum(open_, close) * 1.0005
+    low   = np.minimum(open_, close) * 0.9995
+    duration = _DURATION[granularity]
+    out = []
+    for i, bar in enumerate(bar_numbers):
+        ts = _EPOCH + duration * int(bar)
+        out.append({
+            'complete': bool(bar < now_bar),
+            'volume':   int(100 + bar % 50),
+            'time':     ts.strftime('%Y-%m-%dT%H:%M:%S.000000000Z'),
+            'mid': {
+                'o': f"{open_[i]:.5f}", 'h': f"{high[i]:.5f}",
+                'l': f"{low[i]:.5f}",   'c': f"{close[i]:.5f}",
+            },
+        })
+    return out
+
+
+class StubOandaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, comme l'API réelle
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        server.request_count += 1
+        if server.latency:
+            time.sleep(server.latency)
+
+        url   = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+        if len(parts) != 4 or parts[:2] != ['v3', 'instruments'] or parts[3] != 'candles':
+            self._send_json(404, {'errorMessage': 'Not found'})
+            return
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            self._send_json(401, {'errorMessage': 'Insufficient authorization to perform request.'})
+            return
+        if server.throttle_rate and random.random() < server.throttle_rate:
+            self._send_json(429, {'errorMessage': 'Rate limit exceeded (stub)'},
+                            headers={'Retry-After': str(server.retry_after)})
+            return
+        if server.error_rate and random.random() < server.error_rate:
+            self._send_json(503, {'errorMessage': 'Service unavailable (stub)'})
+            return
+
+        instrument  = parts[2]
+        query       = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        granularity = query.get('granularity', 'S5')
+        if granularity not in _DURATION:
+            self._send_json(400, {'errorMessage': f"Invalid value specified for 'granularity': {granularity}"})
+            return
+
+        duration = _DURATION[granularity]
+        now_bar  = int((server.now() - _EPOCH) // duration)
+        count    = min(int(query.get('count', 500)), 5000)
+        if 'from' in query:
+            from_ts  = pd.Timestamp(query['from'])
+            from_ts  = from_ts.tz_localize('UTC') if from_ts.tzinfo is None else from_ts
+            first    = int(-(-(from_ts - _EPOCH) // duration))
+            if query.get('includeFirst', 'true').lower() == 'false' and _EPOCH + duration * first == from_ts:
+                first += 1
+            bars = list(range(first, min(first + count, now_bar + 1)))
+        elif 'to' in query:
+            # Bougies commencées avant `to` ; l'historique commence à _EPOCH.
+            to_ts    = pd.Timestamp(query['to'])
+            to_ts    = to_ts.tz_localize('UTC') if to_ts.tzinfo is None else to_ts
+            last     = min(int(-(-(to_ts - _EPOCH) // duration)) - 1, now_bar)
+            bars = list(range(max(last - count + 1, 0), last + 1))
+        else:
+            bars = list(range(now_bar - count + 1, now_bar + 1))
+
+        self._send_json(200, {
+            'instrument':  instrument,
+            'granularity': granularity,
+            'candles':     synthetic_candles(instrument, granularity, bars, now_bar),
+        })
+
+
+class StubOandaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency=0.0, error_rate=0.0, now=None,
+                 throttle_rate=0.0, retry_after=1):
+        super().__init__(address, StubOandaHandler)
+        self.latency       = latency
+        self.error_rate    = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after   = retry_after
+        self.request_count = 0
+        self._now          = now
+
+    def now(self):
+        return self._now if self._now is not None else pd.Timestamp.now(tz='UTC')
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def serve_in_thread(latency=0.0, error_rate=0.0, now=None, port=0, throttle_rate=0.0, retry_after=1):
+    """Démarre le stub dans un thread daemon ; retourne le serveur (voir .base_url, .shutdown())."""
+    server = StubOandaServer(("127.0.0.1", port), latency=latency, error_rate=error_rate, now=now,
+                             throttle_rate=throttle_rate, retry_after=retry_after)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur OANDA v20 factice (candles)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="latence par requête (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="proportion de réponses 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="proportion de réponses 429")
+    args = parser.parse_args()
+    server = StubOandaServer(("127.0.0.1", args.port), latency=args.latency, error_rate=args.error_rate,
+                             throttle_rate=args.throttle_rate)
+    print(f"Stub OANDA sur {server.base_url}")
+    server.serve_forever()
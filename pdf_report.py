@@ -0,0 +1,306 @@
+"""
+Rapport PDF du scan (FPDF) : page de synthèse puis tableau RSI / divergences.
+
+Le tableau était rendu avec un FPDF.cell() par cellule (≈100 µs chacune :
+mise en forme du texte, bordure, changements de couleurs), ce qui devient le
+poste dominant sur un univers de plusieurs centaines d'instruments. Chemin
+rapide, même rendu :
+
+- styles : code de style de chaque cellule calculé en une passe NumPy
+  (np.select sur la matrice RSI), textes formatés en une liste ;
+- plages de style : par ligne, les cellules contiguës de même fond sont
+  fusionnées en un seul rectangle ; par page, rectangles puis textes sont
+  émis groupés par couleur (quelques changements de couleur par page au
+  lieu de deux par cellule) ;
+- gabarit de page : géométrie des colonnes, en-tête du tableau et grille de
+  bordures calculés une fois et rejoués à chaque page ; police réglée une
+  fois par section, largeurs de caractères mises en table pour le centrage ;
+- pagination explicite : le tableau continue sur autant de pages que
+  nécessaire, en-tête de colonnes répété en haut de chaque page.
+
+Exécution directe (`python pdf_report.py`) : temps de rendu et taille du
+PDF pour 33, 300 et 1000 instruments synthétiques.
+"""
+import numpy as np
+from fpdf import FPDF
+
+from scan_result import DIV_BEAR, DIV_BULL
+
+C_BG_HEADER   = (44,  62,  80)
+C_TEXT_HEADER = (255, 255, 255)
+C_OVERSOLD    = (220, 20,  60)
+C_OVERBOUGHT  = (0,   180, 80)
+C_NEUTRAL_BG  = (240, 240, 240)
+C_TEXT_DARK   = (10,  10,  10)
+C_WHITE       = (255, 255, 255)
+C_BLACK       = (0,   0,   0)
+
+# Styles de cellule : (fond, texte), indexés par _cell_styles.
+STYLE_NEUTRAL, STYLE_EXTREME_LOW, STYLE_OVERSOLD, STYLE_EXTREME_HIGH, STYLE_OVERBOUGHT = range(5)
+CELL_STYLES = (
+    (C_NEUTRAL_BG,    C_TEXT_DARK),
+    ((255, 100, 100), C_WHITE),
+    (C_OVERSOLD,      C_WHITE),
+    ((100, 255, 100), C_BLACK),
+    (C_OVERBOUGHT,    C_WHITE),
+)
+
+PAGE_W, PAGE_H  = 297, 210   # A4 paysage (mm)
+MARGIN          = 10
+BOTTOM_MARGIN   = 15
+TABLE_W         = PAGE_W - 2 * MARGIN
+PAIR_W          = 40
+HEAD_H          = 9
+ROW_H           = 8
+
+
+def _pdf_str(text):
+    """Conversion UTF-8 → latin-1 pour FPDF (Arial intégré ne supporte pas UTF-8)."""
+    return text.encode('latin-1', errors='replace').decode('latin-1')
+
+
+class _ReportPDF(FPDF):
+    """Classe PDF interne avec header/footer personnalisés."""
+
+    def __init__(self, scan_ts="", **kwargs):
+        super().__init__(**kwargs)
+        self._scan_ts = scan_ts
+
+    def header(self):
+        self.set_font('Arial', 'B', 16)
+        self.set_text_color(20, 20, 20)
+        self.cell(0, 10, _pdf_str('MARKET SCANNER - RAPPORT STRATEGIQUE'), 0, 1, 'C')
+        self.set_font('Arial', 'I', 9)
+        self.set_text_color(100, 100, 100)
+        self.cell(0, 5, _pdf_str('Genere le: ' + self._scan_ts), 0, 1, 'C')
+        self.ln(5)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.set_text_color(150, 150, 150)
+        self.cell(
+            0, 10,
+            _pdf_str('Page ' + str(self.page_no()) + ' | Analyse technique automatisee'),
+            0, 0, 'C'
+        )
+
+
+def _cell_styles(rsi):
+    """Code de style (CELL_STYLES) de chaque cellule RSI ; NaN → neutre."""
+    with np.errstate(invalid='ignore'):
+        return np.select(
+            [rsi <= 20, rsi <= 30, rsi >= 80, rsi >= 70],
+            [STYLE_EXTREME_LOW, STYLE_OVERSOLD, STYLE_EXTREME_HIGH, STYLE_OVERBOUGHT],
+            STYLE_NEUTRAL,
+        ).astype(np.int8)
+
+
+def _cell_texts(result):
+    """Libellés des cellules : RSI à 2 décimales ou N/A, suffixe (BULL) / (BEAR)."""
+    suffix = {DIV_BULL: " (BULL)", DIV_BEAR: " (BEAR)"}
+    return [
+        [(f"{val:.2f}" if val == val else "N/A") + suffix.get(div, "") for val, div in zip(rsi_row, div_row)]
+        for rsi_row, div_row in zip(result.rsi.tolist(), result.divergence.tolist())
+    ]
+
+
+def _style_runs(styles, edges):
+    """Plages (x0, x1, style) de cellules contiguës de même style sur une ligne."""
+    runs  = []
+    start = 0
+    for j in range(1, len(styles) + 1):
+        if j == len(styles) or styles[j] != styles[start]:
+            runs.append((edges[start], edges[j], styles[start]))
+            start = j
+    return runs
+
+
+class _TableTemplate:
+    """Géométrie du tableau et largeurs de caractères, calculées une fois par rapport."""
+
+    def __init__(self, pdf, timeframes):
+        self.edges = [MARGIN, MARGIN + PAIR_W] + [
+            MARGIN + PAIR_W + (j + 1) * (TABLE_W - PAIR_W) / len(timeframes) for j in range(len(timeframes))
+        ]
+        self.labels = ["Paire"] + [_pdf_str(tf) for tf in timeframes]
+        pdf.set_font('Arial', '', 9)
+        self.body_font_size = pdf.font_size
+        self._body_widths   = {}
+        self._pdf           = pdf
+
+    def text_width(self, text):
+        widths = self._body_widths
+        total  = 0.0
+        for ch in text:
+            w = widths.get(ch)
+            if w is None:
+                w = widths[ch] = self._pdf.get_string_width(ch)
+            total += w
+        return total
+
+    def draw_header(self, pdf, y):
+        pdf.set_font('Arial', 'B', 10)
+        pdf.set_fill_color(*C_BG_HEADER)
+        pdf.set_draw_color(*C_BLACK)
+        pdf.rect(MARGIN, y, TABLE_W, HEAD_H, 'DF')
+        for x in self.edges[1:-1]:
+            pdf.line(x, y, x, y + HEAD_H)
+        pdf.set_text_color(*C_TEXT_HEADER)
+        baseline = y + 0.5 * HEAD_H + 0.3 * pdf.font_size
+        for x0, x1, label in zip(self.edges, self.edges[1:], self.labels):
+            pdf.text(x0 + (x1 - x0 - pdf.get_string_width(label)) / 2, baseline, label)
+        return y + HEAD_H
+
+    def draw_rows(self, pdf, y, pairs, styles, texts):
+        """Lignes d'une page : fonds par plages et par couleur, grille, textes par couleur."""
+        pdf.set_font('Arial', '', 9)
+        fills = {}
+        inks  = {}
+        for r, (pair, row_styles, row_texts) in enumerate(zip(pairs, styles, texts)):
+            top      = y + r * ROW_H
+            baseline = top + 0.5 * ROW_H + 0.3 * self.body_font_size
+            for x0, x1, style in _style_runs((STYLE_NEUTRAL, *row_styles), self.edges):
+                fills.setdefault(style, []).append((x0, top, x1 - x0))
+            for x0, x1, style, text in zip(
+                self.edges, self.edges[1:], (STYLE_NEUTRAL, *row_styles), (pair, *row_texts)
+            ):
+                inks.setdefault(CELL_STYLES[style][1], []).append(
+                    (x0 + (x1 - x0 - self.text_width(text)) / 2, baseline, text)
+                )
+
+        for style, rects in fills.items():
+            pdf.set_fill_color(*CELL_STYLES[style][0])
+            for x, top, w in rects:
+                pdf.rect(x, top, w, ROW_H, 'F')
+
+        bottom = y + len(pairs) * ROW_H
+        pdf.set_draw_color(*C_BLACK)
+        for r in range(len(pairs) + 1):
+            pdf.line(MARGIN, y + r * ROW_H, MARGIN + TABLE_W, y + r * ROW_H)
+        for x in self.edges:
+            pdf.line(x, y, x, bottom)
+
+        for color, items in inks.items():
+            pdf.set_text_color(*color)
+            for x, baseline, text in items:
+                pdf.text(x, baseline, text)
+        return bottom
+
+
+def _draw_table(pdf, result):
+    """Tableau paginé à partir de la position courante, en-tête répété sur chaque page."""
+    template = _TableTemplate(pdf, result.timeframes)
+    styles   = _cell_styles(result.rsi).tolist()
+    texts    = _cell_texts(result)
+    pairs    = [_pdf_str(pair) for pair in result.pairs]
+    limit    = PAGE_H - BOTTOM_MARGIN
+
+    start = 0
+    y     = pdf.get_y()
+    while start < len(pairs):
+        if y + HEAD_H + ROW_H > limit:
+            pdf.add_page()
+            y = pdf.get_y()
+        y     = template.draw_header(pdf, y)
+        count = max(1, int((limit - y) // ROW_H))
+        end   = min(len(pairs), start + count)
+        template.draw_rows(pdf, y, pairs[start:end], styles[start:end], texts[start:end])
+        start = end
+        y     = limit   # page pleine : la suite commence sur une nouvelle page
+
+
+def create_pdf_report(result, stats, last_scan_time):
+    """Génération PDF avec stats pré-calculées."""
+    pdf = _ReportPDF(scan_ts=str(last_scan_time), orientation='L', unit='mm', format='A4')
+    pdf.set_auto_page_break(auto=True, margin=BOTTOM_MARGIN)
+
+    avg_global_rsi = stats['avg_rsi']
+    market_bias    = stats['market_bias']
+    bias_color     = stats['bias_color']
+    total_bull_div = stats['total_bull_div']
+    total_bear_div = stats['total_bear_div']
+    extreme_count  = stats['extreme_count']
+
+    # --- PAGE 1 ---
+    pdf.add_page()
+
+    pdf.set_fill_color(245, 247, 250)
+    pdf.rect(10, 25, 277, 35, 'F')
+    pdf.set_xy(15, 30)
+    pdf.set_font('Arial', 'B', 12)
+    pdf.set_text_color(*C_TEXT_DARK)
+    pdf.cell(50, 8, _pdf_str("BIAIS DE MARCHE:"), 0, 0, 'L')
+    pdf.set_font('Arial', 'B', 14)
+    pdf.set_text_color(*bias_color)
+    pdf.cell(100, 8, _pdf_str(market_bias), 0, 1, 'L')
+    pdf.set_xy(15, 40)
+    pdf.set_text_color(*C_TEXT_DARK)
+    pdf.set_font('Arial', '', 10)
+    pdf.cell(
+        0, 6,
+        _pdf_str(f"RSI Moyen Global: {avg_global_rsi:.2f} | Signaux Extremes (<20/>80): {extreme_count}"),
+        0, 1, 'L'
+    )
+    pdf.cell(
+        0, 6,
+        _pdf_str(f"Divergences: {total_bull_div} Haussieres (BULL) vs {total_bear_div} Baissieres (BEAR)"),
+        0, 1, 'L'
+    )
+    pdf.ln(15)
+
+    pdf.set_text_color(*C_TEXT_DARK)
+    pdf.set_font('Arial', 'B', 12)
+    pdf.cell(0, 8, _pdf_str("STATISTIQUES PAR TIMEFRAME"), 0, 1, 'L')
+    pdf.set_font('Arial', '', 9)
+
+    for tf in result.timeframes:
+        s = stats['by_tf'][tf]
+        pdf.cell(
+            0, 6,
+            _pdf_str(
+                f"[{tf}] :: <=20: {s['extreme_oversold']} | 20-30: {s['oversold']} || "
+                f">=80: {s['extreme_overbought']} | 70-80: {s['overbought']} || "
+                f"DIV.BULL: {s['bull_div']} | DIV.BEAR: {s['bear_div']}"
+            ),
+            0, 1, 'L'
+        )
+    pdf.ln(5)
+
+    # PERF [PDF-FAST] : tableau par plages de style et gabarit rejoué (voir en-tête du module).
+    _draw_table(pdf, result)
+
+    return bytes(pdf.output())
+
+
+def _benchmark(sizes=(33, 300, 1000), repeat=3):
+    """Univers synthétiques (5 TF, ~5 % de cellules manquantes) : temps de rendu et taille du PDF."""
+    import re
+    import time
+    import warnings
+
+    from scan_engine import TIMEFRAMES_DISPLAY, compute_statistics
+    from scan_result import ScanResult
+
+    # Police 'Arial' et paramètre ln= : avertissements fpdf2 connus, hors sujet ici.
+    warnings.simplefilter("ignore", DeprecationWarning)
+    rng = np.random.default_rng(7)
+    for n in sizes:
+        result = ScanResult(
+            [f"SYM{i:04d}/USD" for i in range(n)], TIMEFRAMES_DISPLAY,
+            rng.uniform(5, 95, (n, len(TIMEFRAMES_DISPLAY))),
+            rng.choice([0, 0, 0, DIV_BULL, DIV_BEAR], (n, len(TIMEFRAMES_DISPLAY))).astype(np.int8),
+        )
+        result.rsi[rng.random(result.rsi.shape) < 0.05] = np.nan
+        stats = compute_statistics(result)
+
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            data = create_pdf_report(result, stats, "01/01/2025 00:00:00")
+        elapsed = (time.perf_counter() - t0) / repeat
+        pages   = len(re.findall(rb"/Type /Page\b(?!s)", data))
+        print(f"{n:>5} instruments  {elapsed * 1e3:8.1f} ms  {len(data) / 1024:8.1f} Ko  {pages} pages")
+
+
+if __name__ == "__main__":
+    _benchmark()
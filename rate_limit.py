@@ -0,0 +1,127 @@
+"""
+Token bucket adaptatif pour le budget de requêtes OANDA (par compte).
+
+- `rate` jetons/s, capacité `burst` : rafales courtes autorisées, débit
+  moyen plafonné — remplace Semaphore(3) + sleeps aléatoires.
+- Réservation à la GCRA : reserve() retire un jeton (le solde peut devenir
+  négatif) et retourne l'attente nécessaire. Les appelants sont servis dans
+  l'ordre de réservation ; le même seau sert les threads (acquire) et
+  asyncio (await asyncio.sleep(reserve())).
+- Adaptation : un 429 divise le débit (plancher min_rate) et un en-tête
+  Retry-After (secondes ou date HTTP) suspend tous les départs jusqu'à
+  l'échéance ; le débit remonte ensuite linéairement vers le débit nominal
+  en `recovery_s` secondes.
+"""
+import datetime
+import email.utils
+import threading
+import time
+
+
+def parse_retry_after(value, now=None):
+    """
+    Retry-After → secondes : délai numérique ou date HTTP (RFC 9110, comparée
+    à `now`, epoch en s, horloge murale par défaut ; date passée → 0) ; None
+    si absent ou invalide.
+    """
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError, IndexError):
+            return None
+        if date.tzinfo is None:   # '-0000' : les dates HTTP sont toujours en GMT
+            date = date.replace(tzinfo=datetime.timezone.utc)
+        return max(0.0, date.timestamp() - (time.time() if now is None else now))
+    return seconds if seconds >= 0 else None
+
+
+class TokenBucket:
+    """Limiteur de débit thread-safe, partagé par tout le process."""
+
+    def __init__(self, rate, burst=1, min_rate=0.5, decrease_factor=0.5,
+                 recovery_s=60.0, clock=time.monotonic):
+        self.base_rate        = float(rate)
+        self.burst            = float(max(1, burst))
+        self.min_rate         = float(min(min_rate, rate))
+        self.decrease_factor  = decrease_factor
+        self.recovery_s       = recovery_s
+        self._clock           = clock
+        self._lock            = threading.Lock()
+        self._rate            = float(rate)
+        self._tokens          = float(self.burst)
+        self._last            = clock()
+        self._paused_until    = 0.0
+        # Compteurs exposés via stats()
+        self._requests        = 0
+        self._delayed         = 0
+        self._throttled       = 0
+        self._wait_total      = 0.0
+
+    def _refill_locked(self, now):
+        elapsed    = max(0.0, now - self._last)
+        recovering = max(0.0, now - max(self._last, self._paused_until))
+        self._last = now
+        # Remontée progressive du débit après un 429, une fois la pause écoulée.
+        if self._rate < self.base_rate and self.recovery_s > 0:
+            self._rate = min(self.base_rate, self._rate + recovering * self.base_rate / self.recovery_s)
+        self._tokens = min(self.burst, self._tokens + elapsed * self._rate)
+
+    def reserve(self):
+        """Réserve un jeton ; retourne l'attente (s) avant de pouvoir émettre."""
+        with self._lock:
+            now = self._clock()
+            self._refill_locked(now)
+            self._tokens -= 1.0
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+            wait = max(wait, self._paused_until - now)
+            self._requests += 1
+            if wait > 0:
+                self._delayed    += 1
+                self._wait_total += wait
+            return wait
+
+    def release(self):
+        """Rend un jeton réservé mais non utilisé (départ annulé pendant l'attente)."""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1.0)
+
+    def acquire(self):
+        """Version bloquante (threads)."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def on_throttled(self, retry_after=None):
+        """Réponse 429 : réduction multiplicative du débit + pause éventuelle."""
+        with self._lock:
+            now = self._clock()
+            self._refill_locked(now)
+            self._throttled     += 1
+            self._rate   = max(self.min_rate, self._rate * self.decrease_factor)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+    def observe(self, status_code, retry_after_header=None):
+        """Point d'entrée commun des clients HTTP : réagit aux 429."""
+        if status_code == 429:
+            self.on_throttled(parse_retry_after(retry_after_header))
+
+    def stats(self):
+        with self._lock:
+            self._refill_locked(self._clock())
+            return {
+                'rate':          round(self._rate, 3),
+                'base_rate':     self.base_rate,
+                'burst':         self.burst,
+                'requests':      self._requests,
+                'delayed':       self._delayed,
+                'throttled':     self._throttled,
+                'wait_total_s':  round(self._wait_total, 3),
+                'paused_for_s':  round(max(0.0, self._paused_until - self._clock()), 3),
+            }
@@ -0,0 +1,119 @@
+"""
+Agrégation locale de bougies OHLC fines (H1) en H4 / D / W / M.
+
+Les frontières de bougies reproduisent l'alignement OANDA :
+- dailyAlignment    : heure de début du jour de trading (17h par défaut)
+- weeklyAlignment   : jour d'ancrage de la semaine (Friday par défaut)
+- alignmentTimezone : fuseau de référence (America/New_York par défaut)
+
+Une bougie dérivée n'est conservée que si elle est complète : sa fin est
+atteinte par la dernière bougie source complète, et la première bougie est
+écartée si la source démarre au milieu de sa période.
+"""
+import numpy as np
+import pandas as pd
+
+DERIVABLE_GRANULARITIES = ('H4', 'D', 'W', 'M')
+
+_WEEKDAYS = {
+    'Monday': 0, 'Tuesday': 1, 'Wednesday': 2, 'Thursday': 3,
+    'Friday': 4, 'Saturday': 5, 'Sunday': 6,
+}
+
+_SOURCE_DURATION = {'H1': pd.Timedelta(hours=1), 'H4': pd.Timedelta(hours=4), 'D': pd.Timedelta(days=1)}
+
+
+def bucket_bounds(index, granularity, daily_alignment=17, weekly_anchor='Friday',
+                  timezone='America/New_York'):
+    """
+    Début et fin (UTC) de la bougie `granularity` contenant chaque horodatage
+    de `index` (DatetimeIndex tz-aware).
+    """
+    if granularity not in DERIVABLE_GRANULARITIES:
+        raise ValueError(f"Granularité non dérivable : {granularity}")
+    if weekly_anchor not in _WEEKDAYS:
+        raise ValueError(f"weekly_anchor invalide : {weekly_anchor}")
+
+    local    = index.tz_convert(timezone)
+    naive    = local.tz_localize(None)
+    shift    = pd.Timedelta(hours=daily_alignment)
+    # Jour de trading : commence à `daily_alignment` heure locale.
+    day_open = (naive - shift).floor('D')
+
+    if granularity == 'H4':
+        start = (naive - shift).floor('4h') + shift
+        end   = start + pd.Timedelta(hours=4)
+    elif granularity == 'D':
+        start = day_open + shift
+        end   = start + pd.Timedelta(days=1)
+    elif granularity == 'W':
+        offset = (day_open.dayofweek - _WEEKDAYS[weekly_anchor]) % 7
+        start  = day_open - pd.to_timedelta(offset, unit='D') + shift
+        end    = start + pd.Timedelta(days=7)
+    else:
+        # Un jour de trading ouvert la veille à `daily_alignment` appartient au
+        # mois de sa date de clôture (ex. dim. 17h → lundi 1er = nouveau mois).
+        trade_date = day_open + pd.Timedelta(days=1)
+        month      = trade_date.to_period('M')
+        start      = month.to_timestamp() - pd.Timedelta(days=1) + shift
+        end        = (month + 1).to_timestamp() - pd.Timedelta(days=1) + shift
+
+    # Heure ambiguë (retour à l'heure d'hiver) : choix constant de l'heure
+    # standard — seul compte le regroupement, pas le libellé exact.
+    not_dst = np.zeros(len(index), dtype=bool)
+    start = pd.DatetimeIndex(start).tz_localize(timezone, ambiguous=not_dst, nonexistent='shift_forward')
+    end   = pd.DatetimeIndex(end).tz_localize(timezone, ambiguous=not_dst, nonexistent='shift_forward')
+    return start.tz_convert('UTC'), end.tz_convert('UTC')
+
+
+def resample_candles(source, granularity, source_granularity='H1', daily_alignment=17,
+                     weekly_anchor='Friday', timezone='America/New_York'):
+    """
+    Agrège un DataFrame OHLCV (index temps UTC, bougies complètes) dans la
+    granularité cible. Retourne uniquement les bougies dérivées complètes,
+    indexées par leur heure de début comme les bougies OANDA.
+    """
+    columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+    if source is None or source.empty:
+        return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], tz='UTC', name='Time'))
+
+    keys, end = bucket_bounds(source.index, granularity, daily_alignment, weekly_anchor, timezone)
+
+    grouped = source.groupby(keys, sort=True)
+    out = pd.DataFrame({
+        'Open':   grouped['Open'].first(),
+        'High':   grouped['High'].max(),
+        'Low':    grouped['Low'].min(),
+        'Close':  grouped['Close'].last(),
+        'Volume': grouped['Volume'].sum(),
+    })
+    out.index.name = 'Time'
+
+    bucket_end  = pd.Series(end, index=keys).groupby(level=0).first()
+    source_done = source.index[-1] + _SOURCE_DURATION.get(source_granularity, pd.Timedelta(hours=1))
+    complete    = (bucket_end <= source_done).to_numpy().copy()
+    # Première bougie écartée si la source commence en cours de période.
+    if source.index[0] > keys[0]:
+        complete[0] = False
+    return out.loc[complete]
+
+
+def compare_ohlc(native, derived, columns=('Open', 'High', 'Low', 'Close'), rtol=1e-9):
+    """
+    Compare bougies natives et dérivées sur leurs horodatages communs.
+    Retourne un dict de diagnostic (horodatages propres à chaque côté,
+    bougies communes, bougies dont l'OHLC diffère).
+    """
+    if native is None or derived is None:
+        return {'common': 0, 'native_only': 0, 'derived_only': 0, 'ohlc_mismatch': 0}
+
+    common = native.index.intersection(derived.index)
+    n_vals = native.loc[common, list(columns)].to_numpy(dtype=np.float64)
+    d_vals = derived.loc[common, list(columns)].to_numpy(dtype=np.float64)
+    mismatch = ~np.isclose(n_vals, d_vals, rtol=rtol, atol=0.0).all(axis=1)
+    return {
+        'common':        int(len(common)),
+        'native_only':   int(len(native.index.difference(derived.index))),
+        'derived_only':  int(len(derived.index.difference(native.index))),
+        'ohlc_mismatch': int(mismatch.sum()),
+    }
@@ -0,0 +1,123 @@
+"""
+Tableau HTML des résultats de l'app Streamlit, mémoïsé.
+
+app.py est ré-exécuté à chaque rerun (clic sur un bouton, rafraîchissement) :
+le tableau y était reconstruit en entier à chaque fois, cellule par cellule
+(échappement, classe CSS, formatage) par concaténations successives. Les
+caches vivent ici, dans un module importé une fois par process, donc
+partagés par les reruns et par toutes les sessions :
+
+- fragments de ligne : mémoïsés par (paire, statut, RSI, divergences) ; après
+  un rescan, seules les lignes dont les valeurs ont changé sont reconstruites ;
+- tableau complet d'un scan terminé : mémoïsé par identifiant de scan
+  (scan_table_html), les derniers TABLE_CACHE_SCANS scans.
+"""
+import collections
+import functools
+import html as html_lib
+import threading
+
+from scan_engine import RSI_OVERBOUGHT, RSI_OVERSOLD, TIMEFRAMES_DISPLAY
+from scan_result import DIV_BEAR, DIV_BULL, STATUS_ERROR, STATUS_PARTIAL, STATUS_TIMEOUT
+
+ROW_CACHE_SIZE    = 4096
+TABLE_CACHE_SCANS = 8
+
+_TABLE_HEAD = (
+    '<table class="rsi-table"><thead><tr><th>Devises</th>'
+    + ''.join(f'<th>{tf}</th>' for tf in TIMEFRAMES_DISPLAY)
+    + '</tr></thead><tbody>'
+)
+_TABLE_TAIL = '</tbody></table>'
+
+_STATUS_BADGES = {
+    STATUS_ERROR:   ' <span style="color:#FF4B4B;font-size:10px;">⚠ERR</span>',
+    STATUS_PARTIAL: ' <span style="color:#FFA500;font-size:10px;">⚠PART</span>',
+    STATUS_TIMEOUT: ' <span style="color:#FFA500;font-size:10px;">⏱TIMEOUT</span>',
+}
+_DIVERGENCE_ICONS = {
+    DIV_BULL: '<span class="divergence-arrow bullish-arrow">&#8593;</span>',
+    DIV_BEAR: '<span class="divergence-arrow bearish-arrow">&#8595;</span>',
+}
+
+_TABLE_LOCK  = threading.Lock()
+_TABLES      = collections.OrderedDict()   # scan_id → HTML, du moins au plus récent
+_TABLE_HITS  = collections.Counter()
+
+
+def format_rsi(value):
+    return "N/A" if value is None else f"{value:.2f}"
+
+def get_rsi_class(value):
+    if value is None:             return "neutral-cell"
+    elif value <= RSI_OVERSOLD:   return "oversold-cell"
+    elif value >= RSI_OVERBOUGHT: return "overbought-cell"
+    return "neutral-cell"
+
+
+@functools.lru_cache(maxsize=ROW_CACHE_SIZE)
+def _row_html(pair, status, rsi_row, div_row):
+    """Fragment <tr> d'un actif terminé ; RSI NaN passés en None (NaN != NaN casserait la clé)."""
+    cells = ''.join(
+        f'<td class="{get_rsi_class(rsi_val)}">{format_rsi(rsi_val)} {_DIVERGENCE_ICONS.get(divergence, "")}</td>'
+        for rsi_val, divergence in zip(rsi_row, div_row)
+    )
+    return (
+        f'<tr><td class="devises-cell">{html_lib.escape(str(pair))}{_STATUS_BADGES.get(status, "")}</td>'
+        f'{cells}</tr>'
+    )
+
+
+@functools.lru_cache(maxsize=ROW_CACHE_SIZE)
+def _pending_row_html(pair):
+    return (
+        f'<tr><td class="devises-cell">{html_lib.escape(str(pair))} <span style="font-size:10px;">⏳</span></td>'
+        + '<td class="neutral-cell">…</td>' * len(TIMEFRAMES_DISPLAY) + '</tr>'
+    )
+
+
+def results_table_html(result, done=None):
+    """
+    Tableau HTML du ScanResult, lignes dans l'ordre de ASSETS. `done` (rendu
+    progressif) : masque des actifs terminés, les autres restent en attente (⏳).
+    """
+    finished = [True] * len(result) if done is None else done.tolist()
+    rows     = []
+    for pair, finished_row, status, rsi_row, div_row in zip(
+        result.pairs, finished, result.status.tolist(), result.rsi.tolist(), result.divergence.tolist()
+    ):
+        if not finished_row:
+            rows.append(_pending_row_html(pair))
+            continue
+        rows.append(_row_html(pair, status, tuple(None if v != v else v for v in rsi_row), tuple(div_row)))
+    return _TABLE_HEAD + ''.join(rows) + _TABLE_TAIL
+
+
+def scan_table_html(scan_id, result):
+    """Tableau complet d'un scan terminé, construit une fois par scan pour tout le process."""
+    with _TABLE_LOCK:
+        html = _TABLES.get(scan_id)
+        if html is not None:
+            _TABLES.move_to_end(scan_id)
+            _TABLE_HITS['hits'] += 1
+            return html
+    html = results_table_html(result)
+    with _TABLE_LOCK:
+        _TABLE_HITS['builds'] += 1
+        _TABLES[scan_id] = html
+        while len(_TABLES) > TABLE_CACHE_SCANS:
+            _TABLES.popitem(last=False)
+    return html
+
+
+def table_cache_stats():
+    rows = _row_html.cache_info()
+    with _TABLE_LOCK:
+        return {
+            'tables':      len(_TABLES),
+            'table_hits':  _TABLE_HITS['hits'],
+            'builds':      _TABLE_HITS['builds'],
+            'row_hits':    rows.hits,
+            'row_misses':  rows.misses,
+            'rows_cached': rows.currsize,
+        }
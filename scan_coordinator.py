@@ -0,0 +1,148 @@
+"""
+Coordination des scans au niveau du process (toutes sessions Streamlit).
+
+- single-flight : si un scan du même univers est en cours, les nouvelles
+  demandes s'y rattachent au lieu d'en lancer un second ;
+- fraîcheur : une demande arrivant moins de `freshness_s` secondes après
+  la fin du dernier scan reçoit ce résultat tel quel ;
+- progression : chaque ScanJob expose (terminés, total, message), que toutes
+  les sessions rattachées lisent en direct ;
+- résultat partiel : le scan publie un instantané après chaque actif terminé
+  (publish), que les sessions affichent au fil de l'eau (partial).
+
+Le corps du scan s'exécute dans un thread dédié, indépendant des sessions :
+une session qui se ferme n'interrompt pas le scan des autres.
+"""
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger("rsi_screener")
+
+
+class ScanJob:
+    """Un scan partagé : progression, résultat ou erreur, horodatages."""
+
+    def __init__(self, scan_id, universe):
+        self.scan_id          = scan_id
+        self.universe         = universe
+        self.started_at       = time.time()
+        self.finished_at      = None
+        self.result           = None
+        self.error            = None
+        self.warnings         = []
+        self.attached         = 1
+        self.first_partial_at = None
+        self._lock            = threading.Lock()
+        self._done_event      = threading.Event()
+        self._progress        = (0, 0, "Initialisation du scan parallèle...")
+        self._partial         = (0, None)
+
+    # --- Côté scan ---
+    def report(self, completed, total, message):
+        with self._lock:
+            self._progress = (completed, total, message)
+
+    def warn(self, message):
+        with self._lock:
+            self.warnings.append(message)
+
+    def publish(self, snapshot):
+        """Remplace l'instantané partiel ; `snapshot` ne doit plus être modifié ensuite."""
+        with self._lock:
+            if self.first_partial_at is None:
+                self.first_partial_at = time.time()
+            self._partial = (self._partial[0] + 1, snapshot)
+
+    def _finish(self, result=None, error=None):
+        self.result      = result
+        self.error       = error
+        self.finished_at = time.time()
+        self._done_event.set()
+
+    # --- Côté sessions ---
+    @property
+    def done(self):
+        return self._done_event.is_set()
+
+    def progress(self):
+        with self._lock:
+            return self._progress
+
+    def partial(self):
+        """(version, dernier instantané publié ou None) ; la version croît à chaque publication."""
+        with self._lock:
+            return self._partial
+
+    def wait(self, timeout=None):
+        return self._done_event.wait(timeout)
+
+    def age(self):
+        return None if self.finished_at is None else time.time() - self.finished_at
+
+
+class ScanCoordinator:
+    """Registre process-wide des scans, clé = univers scanné."""
+
+    def __init__(self, freshness_s=60.0):
+        self.freshness_s = freshness_s
+        self._lock       = threading.Lock()
+        self._running    = {}
+        self._latest     = {}
+        self._ids        = itertools.count(1)
+        self.started     = 0
+        self.attached    = 0
+        self.served_fresh = 0
+
+    def request(self, universe, runner):
+        """
+        Retourne le ScanJob à suivre pour `universe` : le scan en cours, le
+        dernier scan réussi s'il est encore frais, ou un nouveau scan lancé
+        avec runner(job) → dict résultat.
+        """
+        with self._lock:
+            job = self._running.get(universe)
+            if job is not None:
+                job.attached  += 1
+                self.attached += 1
+                return job
+
+            latest = self._latest.get(universe)
+            if latest is not None and latest.age() is not None and latest.age() < self.freshness_s:
+                self.served_fresh += 1
+                return latest
+
+            job = ScanJob(next(self._ids), universe)
+            self._running[universe] = job
+            self.started += 1
+
+        threading.Thread(
+            target=self._run, args=(job, runner), name=f"scan-{job.scan_id}", daemon=True
+        ).start()
+        return job
+
+    def _run(self, job, runner):
+        try:
+            result = runner(job)
+            job._finish(result=result)
+        except Exception as e:
+            logger.exception("Shared scan %s crashed: %s", job.scan_id, e)
+            job._finish(error=str(e))
+        with self._lock:
+            self._running.pop(job.universe, None)
+            if job.error is None:
+                self._latest[job.universe] = job
+
+    def latest(self, universe):
+        with self._lock:
+            return self._latest.get(universe)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'running':      len(self._running),
+                'started':      self.started,
+                'attached':     self.attached,
+                'served_fresh': self.served_fresh,
+            }
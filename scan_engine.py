@@ -0,0 +1,1595 @@
+"""
+Moteur de scan headless du screener RSI & divergences.
+
+Le pipeline complet — fetch OANDA (delta, store, planificateur, single-flight,
+backend threads ou asyncio), RSI, divergences, statistiques, exports JSON /
+CSV / PDF — sans dépendance à Streamlit : importable depuis un script, un
+notebook ou un cron sans effet de bord (ni logging configuré, ni I/O réseau
+à l'import ; seules les variables d'environnement sont lues).
+
+- Identifiants : OANDA_ACCESS_TOKEN, OANDA_ACCOUNT_ID, OANDA_ENVIRONMENT
+  (practice | live) dans l'environnement, ou configure() — app.py y passe
+  ses secrets Streamlit.
+- Ressources du process (rate limiter, stores, coordinateur de scans, pool
+  CPU, client OANDA) : fonctions get_*() mémoïsées, l'équivalent headless de
+  st.cache_resource. L'app et la CLI partagent ainsi les mêmes singletons.
+- API : scan(on_progress) → ScanJob terminé (job.result : ScanResult,
+  statistiques, exports) ; write_exports(job.result, out_dir) → chemins.
+
+CLI, avec mesure du démarrage à froid (imports, scan, écriture) :
+
+    OANDA_ACCESS_TOKEN=... python scan_engine.py --out reports/
+"""
+import time
+
+_IMPORT_T0 = time.perf_counter()   # démarrage à froid : coût des imports ci-dessous
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import requests
+from oandapyV20 import API
+import oandapyV20.endpoints.instruments as instruments
+from oandapyV20.exceptions import V20Error          # FIX [RETRY] : import explicite pour distinguer erreurs fatales vs retryables
+
+from candle_cache import CandleCache
+from candle_store import CandleStore, parse_candles
+from circuit_breaker import CLOSED, OPEN, CircuitBreaker
+from cpu_stage import SharedBlock, fill_block, make_executor, run_indicator_stage
+from deadline import Deadline, current_deadline, deadline_scope, sleep as deadline_sleep
+from divergence import (
+    DIVERGENCE_LOOKBACK, DIVERGENCE_PEAK_DISTANCE, detect_divergence_batch, divergence_inputs,
+    price_delta, stack_inputs,
+)
+from export_cache import ExportCache
+from indicators import RsiStateStore, rsi_series_incremental, wilder_rsi
+from metrics import ScanSummary, StageMetrics, http_outcome, scan_metrics_scope, serve_metrics
+from oanda_async import AsyncOandaFetcher, fetch_plans
+from pdf_report import create_pdf_report
+from rate_limit import TokenBucket
+from resample import compare_ohlc, resample_candles
+from scan_coordinator import ScanCoordinator
+from scan_planner import cell_is_due, next_close_time
+from scan_result import (
+    DIV_BEAR, DIV_BULL, DIV_LABELS, DIV_NONE, STATUS_ERROR, STATUS_OK, STATUS_PARTIAL, STATUS_TIMEOUT,
+    ScanResult,
+)
+from single_flight import SingleFlight
+
+# --- CONFIGURATION ---
+
+logger = logging.getLogger("rsi_screener")
+
+RSI_PERIOD     = 14
+RSI_OVERSOLD   = 30
+RSI_OVERBOUGHT = 70
+MAX_RETRIES    = 3
+API_TIMEOUT    = 10
+
+# Répertoire du store de bougies persistant ("" = mémoire seule).
+CANDLE_STORE_DIR = os.environ.get("RSI_CANDLE_STORE_DIR", ".candle_store")
+
+# Alignement des bougies OANDA (valeurs par défaut de l'API, envoyées explicitement).
+OANDA_DAILY_ALIGNMENT = 17
+OANDA_WEEKLY_ANCHOR   = 'Friday'
+OANDA_ALIGNMENT_TZ    = 'America/New_York'
+
+# Mode agrégation : une série H1 longue dérive H4/D/W/M localement.
+# 33000 H1 ≈ 62 mois de séance forex (~515 H1 par mois) : couvre M=60, donc
+# tous les TF. Au-delà de OANDA_MAX_COUNT, l'historique est complété en pages
+# vers le passé (7 appels au premier scan à froid, puis 1 delta par scan).
+# Les TF que l'historique disponible ne couvre pas restent natifs.
+OANDA_MAX_COUNT          = 5000
+AGGREGATION_MODE         = os.environ.get("RSI_AGGREGATION_MODE", "0") == "1"
+AGGREGATION_SOURCE       = 'H1'
+AGGREGATION_SOURCE_COUNT = 33000
+AGGREGATION_TARGETS      = ('H4', 'D', 'W', 'M')
+
+# Planificateur : ne re-demander une cellule (paire, TF) que si une nouvelle
+# bougie complète a pu se former depuis la dernière connue.
+SCAN_PLANNER = os.environ.get("RSI_SCAN_PLANNER", "1") == "1"
+
+# Scans partagés entre sessions : un Rescan dans cette fenêtre (s) après la
+# fin du dernier scan reçoit ce résultat au lieu de relancer 165 requêtes.
+SCAN_FRESHNESS_S = 60
+
+# Échéance de bout en bout d'un scan (s) : fetchs, retries et backoffs s'y
+# plient ; à l'échéance, le résultat partiel est publié (cellules TIMEOUT).
+# Dimensionnement : à froid, au plus 33 actifs × 5 TF = 165 requêtes (moins
+# les cellules que le planificateur sait à jour), plafonnées par le token
+# bucket (OANDA_RATE_PER_SEC → ~17s minimum) et servies par 6 workers ou
+# ASYNC_MAX_CONCURRENCY requêtes asyncio à 1-2s de latence : ~30-60s. La
+# marge couvre les retries et backoffs d'un OANDA dégradé et les pauses
+# Retry-After d'un 429 sans couper un scan valide ; le disjoncteur, lui,
+# fait échouer tout de suite quand OANDA est indisponible.
+SCAN_DEADLINE_S = 300
+
+# Rendu progressif (étage CPU 'fused') : chaque actif terminé est publié au
+# ScanJob avec les statistiques courantes, sans attendre la fin du scan. Les
+# divergences sont alors détectées ligne par ligne au lieu d'un lot par TF.
+STREAM_RESULTS = os.environ.get("RSI_STREAM_RESULTS", "1") == "1"
+
+# Backend de fetch : 'threads' (oandapyV20 + ThreadPoolExecutor) ou 'asyncio'
+# (client httpx keep-alive unique, voir oanda_async.py).
+FETCH_BACKEND         = os.environ.get("RSI_FETCH_BACKEND", "threads")
+ASYNC_MAX_CONCURRENCY = 6
+
+# Étage CPU (RSI + divergences) : 'fused' (historique : calcul dans les threads
+# I/O, état RSI incrémental) ou pipeline I/O → CPU en blocs par TF exécuté
+# 'inline', dans un pool de 'threads' ou de 'processes' (voir cpu_stage.py).
+CPU_STAGE   = os.environ.get("RSI_CPU_STAGE", "fused")
+CPU_WORKERS = None   # None : nb de cœurs
+
+# Budget de requêtes OANDA partagé par tout le process (token bucket adaptatif).
+OANDA_RATE_PER_SEC = 10.0
+OANDA_RATE_BURST   = 5
+
+# Disjoncteur OANDA (circuit_breaker.py) : ouvert dès que CIRCUIT_FAILURE_RATE
+# des CIRCUIT_WINDOW dernières requêtes (au moins CIRCUIT_MIN_CALLS) échouent
+# sur panne (5xx, timeout, connexion) ; sonde semi-ouverte après CIRCUIT_OPEN_S.
+CIRCUIT_FAILURE_RATE = float(os.environ.get("RSI_CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_WINDOW       = 20
+CIRCUIT_MIN_CALLS    = 10
+CIRCUIT_OPEN_S       = 30
+
+# Préchauffage du cache de bougies en arrière-plan (cache_warmer.py) : réveil
+# WARMER_DELAY_S après chaque clôture possible, arrêt sans session active
+# depuis WARMER_IDLE_S, pas plus d'un passage par WARMER_MIN_INTERVAL_S.
+CACHE_WARMER          = os.environ.get("RSI_CACHE_WARMER", "0") == "1"
+WARMER_DELAY_S        = 10
+WARMER_IDLE_S         = 1800
+WARMER_MIN_INTERVAL_S = 300
+WARMER_WORKERS        = 2
+
+# Cache des fenêtres servies au scan (candle_cache.py), par (paire, TF, count) :
+# une fenêtre reste servie jusqu'à la prochaine clôture possible de sa dernière
+# bougie, au plus FETCH_CACHE_TTL_S s, dans CANDLE_CACHE_MAX_BYTES (LRU).
+FETCH_CACHE_TTL_S      = 300
+CANDLE_CACHE_MAX_BYTES = int(os.environ.get("RSI_CANDLE_CACHE_MAX_BYTES", 32 * 2**20))
+
+# Exports rendus au premier téléchargement, mémorisés par (scan, format) pour
+# toutes les sessions dans EXPORT_CACHE_MAX_BYTES (export_cache.py) ;
+# RSI_EXPORT_PRERENDER=1 les rend en arrière-plan dès la fin du scan.
+EXPORT_FORMATS         = ('pdf', 'json', 'csv')
+EXPORT_CACHE_MAX_BYTES = 64 * 2**20
+EXPORT_PRERENDER       = os.environ.get("RSI_EXPORT_PRERENDER", "0") == "1"
+
+# Instrumentation (metrics.py) : latences par étape et compteurs du pipeline,
+# servis en local sur /metrics (Prometheus) et /metrics.json si RSI_METRICS_PORT
+# est non nul (0 : pas d'endpoint, résumé par scan toujours calculé).
+METRICS_PORT = int(os.environ.get("RSI_METRICS_PORT", "0"))
+
+# --- IDENTIFIANTS OANDA ---
+# Lus dans l'environnement ; app.py les remplace par ses secrets via configure().
+OANDA_ACCOUNT_ID   = os.environ.get("OANDA_ACCOUNT_ID")   # lu pour validation ; non utilisé dans les appels instruments
+OANDA_ACCESS_TOKEN = os.environ.get("OANDA_ACCESS_TOKEN")
+OANDA_ENVIRONMENT  = os.environ.get("OANDA_ENVIRONMENT", "practice")
+OANDA_ENVIRONMENTS = ("practice", "live")
+
+_CACHE_LOCK   = threading.Lock()
+_CACHE_COUNTS = collections.Counter()
+
+# (paire, TF) → première bougie de l'historique OANDA, atteinte en pagination.
+_HISTORY_START = {}
+
+# ===================== ASSETS — LISTE CANONIQUE 33 INSTRUMENTS =====================
+ASSETS = [
+    'EUR/USD', 'GBP/USD', 'USD/JPY', 'USD/CHF', 'USD/CAD', 'AUD/USD', 'NZD/USD',
+    'EUR/GBP', 'EUR/JPY', 'EUR/CHF', 'EUR/AUD', 'EUR/CAD', 'EUR/NZD',
+    'GBP/JPY', 'GBP/CHF', 'GBP/AUD', 'GBP/CAD', 'GBP/NZD',
+    'AUD/JPY', 'AUD/CAD', 'AUD/CHF', 'AUD/NZD',
+    'CAD/JPY', 'CAD/CHF', 'CHF/JPY', 'NZD/JPY', 'NZD/CAD', 'NZD/CHF',
+    'DE30/EUR', 'XAU/USD', 'SPX500/USD', 'NAS100/USD', 'US30/USD',
+]
+
+RESTRICTED_ASSETS = {'DE30/EUR', 'SPX500/USD', 'NAS100/USD', 'US30/USD', 'XAU/USD'}
+
+# Source canonique unique en tuples (display_name, fetch_key)
+TIMEFRAMES = [
+    ('H1',     'H1'),
+    ('H4',     'H4'),
+    ('Daily',  'D'),
+    ('Weekly', 'W'),
+    ('Monthly','M'),
+]
+TIMEFRAMES_DISPLAY    = [tf[0] for tf in TIMEFRAMES]
+TIMEFRAMES_FETCH_KEYS = [tf[1] for tf in TIMEFRAMES]
+
+CANDLE_COUNT            = {'H1': 200, 'H4': 200, 'D': 150, 'W': 100, 'M': 60}
+CANDLE_COUNT_RESTRICTED = {'H1': 200, 'H4': 200, 'D': 100, 'W': 52,  'M': 24}
+
+
+@functools.lru_cache(maxsize=None)
+def get_oanda_rate_limiter():
+    # Token bucket global au process — OANDA limite par compte, pas par session.
+    return TokenBucket(OANDA_RATE_PER_SEC, burst=OANDA_RATE_BURST)
+
+
+@functools.lru_cache(maxsize=None)
+def get_circuit_breaker():
+    # Un disjoncteur par process, partagé par les backends threads et asyncio.
+    return CircuitBreaker(
+        CIRCUIT_FAILURE_RATE, window=CIRCUIT_WINDOW, min_calls=CIRCUIT_MIN_CALLS, open_s=CIRCUIT_OPEN_S
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_rsi_state_store():
+    # États RSI Wilder par (paire, TF), partagés par toutes les sessions du process.
+    return RsiStateStore()
+
+
+@functools.lru_cache(maxsize=None)
+def get_candle_store():
+    # Fenêtres de bougies complètes par (paire, TF) pour le fetch différentiel,
+    # persistées sur disque : un redémarrage ne repart plus d'un cache froid.
+    return CandleStore(directory=CANDLE_STORE_DIR or None)
+
+
+@functools.lru_cache(maxsize=None)
+def get_candle_cache():
+    # Fenêtres servies au scan, partagées par toutes les sessions, bornées en mémoire.
+    return CandleCache(CANDLE_CACHE_MAX_BYTES)
+
+
+@functools.lru_cache(maxsize=None)
+def get_scan_coordinator():
+    # Scans partagés par toutes les sessions : single-flight + fenêtre de fraîcheur.
+    return ScanCoordinator(freshness_s=SCAN_FRESHNESS_S)
+
+
+@functools.lru_cache(maxsize=None)
+def get_fetch_flights():
+    # Fetchs identiques en vol, coalescés par (paire, TF, count) pour tout le process.
+    return SingleFlight()
+
+
+@functools.lru_cache(maxsize=None)
+def get_export_cache():
+    # Exports par (scan, format), partagés par toutes les sessions qui affichent ce scan.
+    return ExportCache(EXPORT_CACHE_MAX_BYTES)
+
+
+@functools.lru_cache(maxsize=None)
+def get_stage_metrics():
+    # Histogrammes et compteurs par étape, cumulés sur la vie du process.
+    return StageMetrics()
+
+
+@functools.lru_cache(maxsize=None)
+def get_metrics_server():
+    # Un seul endpoint par process ; None si désactivé ou si le port est pris.
+    if not METRICS_PORT:
+        return None
+    try:
+        return serve_metrics(get_stage_metrics(), METRICS_PORT)
+    except OSError as e:
+        logger.warning("Metrics endpoint unavailable on port %s: %s", METRICS_PORT, e)
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def get_cpu_executor():
+    # Pool de l'étage CPU, créé une fois par process (None en 'fused' / 'inline').
+    return make_executor(CPU_STAGE, CPU_WORKERS) if CPU_STAGE in ('threads', 'processes') else None
+
+
+@functools.lru_cache(maxsize=None)
+def get_oanda_client():
+    client  = API(
+        access_token=OANDA_ACCESS_TOKEN,
+        environment=OANDA_ENVIRONMENT,
+        request_params={"timeout": API_TIMEOUT}
+    )
+    # V20Error ne conserve pas les en-têtes : le hook de session requests voit
+    # chaque réponse brute et transmet 429 / Retry-After au token bucket.
+    limiter = get_oanda_rate_limiter()
+    client.client.hooks['response'].append(
+        lambda resp, *args, **kwargs: limiter.observe(resp.status_code, resp.headers.get('Retry-After'))
+    )
+    return client
+
+def configure(access_token, environment="practice", account_id=None):
+    """
+    Identifiants OANDA du process ; le client est recréé s'ils changent.
+
+    FIX [ENV] : whitelist stricte — une typo ne connecte plus silencieusement
+    au compte live (rate-limits différents, token exposé à un endpoint différent).
+    """
+    global OANDA_ACCESS_TOKEN, OANDA_ENVIRONMENT, OANDA_ACCOUNT_ID
+    if environment not in OANDA_ENVIRONMENTS:
+        raise ValueError(
+            f"OANDA_ENVIRONMENT invalide : '{environment}'. "
+            "Valeurs acceptées : 'practice' ou 'live'."
+        )
+    changed = (access_token, environment) != (OANDA_ACCESS_TOKEN, OANDA_ENVIRONMENT)
+    OANDA_ACCESS_TOKEN, OANDA_ENVIRONMENT, OANDA_ACCOUNT_ID = access_token, environment, account_id
+    if changed:
+        get_oanda_client.cache_clear()
+
+
+# =============================================================================
+# INDICATEURS
+# =============================================================================
+
+def calculate_rsi(prices, period=RSI_PERIOD, state_key=None):
+    """
+    RSI Wilder — seed SMA correct + gestion explicite de tous les cas limites.
+
+    Cas limites :
+    - avg_gain == 0 et avg_loss == 0  (marché plat)  → RSI = 50
+    - avg_gain >  0 et avg_loss == 0  (tendance pure) → RSI = 100
+    - avg_gain == 0 et avg_loss >  0  (chute pure)    → RSI = 0
+    - données insuffisantes (< period+1)              → np.nan
+
+    PERF [RSI-VECTOR] : le lissage Wilder est délégué à indicators.wilder_rsi
+    (filtre linéaire scipy sur tableaux NumPy) au lieu de la boucle Python
+    bougie par bougie sur gains.iloc[i] / losses.iloc[i].
+
+    PERF [RSI-STATE] : avec state_key=(paire, TF), l'état Wilder persistant du
+    process est avancé sur les seules nouvelles bougies s'il est contigu aux
+    données reçues ; recalcul complet sinon (trou, premier scan).
+    """
+    try:
+        if prices is None or len(prices) < period + 1:
+            return np.nan, None
+
+        close_prices = prices['Close']
+        if state_key is not None:
+            rsi_series = rsi_series_incremental(
+                close_prices, get_rsi_state_store(), state_key, period
+            )
+            if rsi_series is None:
+                return np.nan, None
+        else:
+            rsi_series = pd.Series(
+                wilder_rsi(close_prices.to_numpy(dtype=np.float64), period),
+                index=close_prices.index
+            )
+
+        if rsi_series.empty or pd.isna(rsi_series.iloc[-1]):
+            return np.nan, None
+
+        return float(rsi_series.iloc[-1]), rsi_series
+
+    except Exception as e:
+        logger.warning("calculate_rsi error: %s", e)
+        return np.nan, None
+
+
+def _divergence_inputs(price_data, rsi_series, timeframe_key):
+    """Fenêtre de lookback (clôtures, RSI réindexé sur les prix) d'une cellule, ou None."""
+    if rsi_series is None:
+        return None
+    lookback = DIVERGENCE_LOOKBACK.get(timeframe_key, 30)
+    return divergence_inputs(
+        price_data['Close'].to_numpy(),
+        rsi_series.reindex(price_data.index[-lookback:]).to_numpy(),
+        lookback,
+    )
+
+
+def detect_divergence_codes(inputs, timeframe_key, pair_names):
+    """
+    PERF [DIVERGENCE-BATCH] : codes de divergence de tous les instruments d'un
+    TF en un seul appel à divergence.detect_divergence_batch (bloc 2D, extrema
+    RSI ±2 précalculés). `inputs` : une entrée _divergence_inputs (ou None) par
+    instrument, dans l'ordre de `pair_names`.
+    """
+    with get_stage_metrics().timer('divergence', pair_names[0] if len(pair_names) == 1 else '', timeframe_key):
+        closes, rsi, lengths = stack_inputs(inputs, DIVERGENCE_LOOKBACK.get(timeframe_key, 30))
+        return detect_divergence_batch(
+            closes, rsi, lengths,
+            [price_delta(pair) for pair in pair_names],
+            DIVERGENCE_PEAK_DISTANCE.get(timeframe_key, 5),
+        )
+
+
+def detect_row_divergence_codes(inputs, pair_name):
+    """
+    Codes de divergence d'un seul instrument, un par TF (entrées dans l'ordre
+    de TIMEFRAMES) — rendu progressif. detect_divergence_batch traite chaque
+    ligne indépendamment : mêmes codes que le lot par TF.
+    """
+    return [
+        detect_divergence_codes([inputs[j]], tf_key, [pair_name])[0]
+        for j, (_, tf_key) in enumerate(TIMEFRAMES)
+    ]
+
+
+def detect_divergence(price_data, rsi_series, timeframe_key, pair_name=""):
+    """
+    Détection divergence avec lookback adaptatif par TF (une cellule ; le scan
+    passe par detect_divergence_codes, tous les instruments d'un TF en lot).
+
+    FIX [DIVERGENCE-CLOSE] : utilisation du prix de clôture au lieu de High/Low.
+    Les mèches extrêmes (spikes) créent des pics sur High/Low sans que le RSI
+    ne réagisse, générant de faux signaux. Le Close reflète le consensus de la
+    bougie et s'aligne mieux avec la dynamique du RSI.
+
+    FIX [PROMINENCE] : ajout d'un seuil de prominence adaptatif via np.std().
+    Sans ce paramètre, find_peaks capte du bruit de tick, particulièrement sur H1
+    et H4, produisant des divergences sur des micro-variations sans intérêt.
+
+    Alignement index : rsi_series réindexé sur price_data via .reindex() pour
+    éviter tout décalage en cas de trous de marché.
+    """
+    code = detect_divergence_codes(
+        [_divergence_inputs(price_data, rsi_series, timeframe_key)], timeframe_key, [pair_name]
+    )[0]
+    return DIV_LABELS[int(code)]
+
+
+# =============================================================================
+# FETCH OANDA
+# =============================================================================
+
+def _oanda_time(ts):
+    """Horodatage pandas (UTC) → RFC3339 accepté par le paramètre `from` d'OANDA."""
+    return pd.Timestamp(ts).tz_convert('UTC').strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def _request_candles(pair, timeframe_key, params):
+    """
+    Appel InstrumentsCandles avec retry sélectif, timeout et rate-limit
+    (token bucket adaptatif partagé, réduit sur 429 / Retry-After).
+
+    Retourne (DataFrame des bougies complètes — éventuellement vide,
+    nombre total de bougies reçues), ou (None, 0) en cas d'échec définitif.
+
+    FIX [RETRY] : distinction explicite erreurs fatales (4xx hors 429) vs retryables
+    (429, 5xx, timeout réseau). Une erreur 401/403 (token invalide) ne doit jamais
+    être retentée : elle retournerait None immédiatement au lieu de saturer
+    les rate-limits OANDA sur 3 tentatives inutiles.
+
+    FIX [BACKOFF] : backoff exponentiel avec jitter (min(60, 2^attempt) + random())
+    au lieu du sleep linéaire fixe 1.5*(attempt+1). Réduit les collisions de threads
+    sur OANDA lors des rafales d'erreurs.
+
+    FIX [DEADLINE] : sous l'échéance du scan (deadline.current_deadline), aucune
+    tentative n'est lancée après l'échéance et aucune attente (rate-limit ou
+    backoff) n'est commencée si elle ne peut pas finir à temps : la cellule
+    échoue tout de suite au lieu de retenir le scan.
+
+    PERF [CIRCUIT-BREAKER] : chaque issue alimente le disjoncteur du process
+    (5xx, timeouts et erreurs de connexion = échecs). Disjoncteur ouvert :
+    échec immédiat, sans requête ni backoff.
+
+    PERF [METRICS] : attente de débit, latence HTTP (par issue), parsing et
+    backoffs sont chronométrés ; chaque abandon est compté avec sa cause.
+    """
+    instrument   = pair.replace('/', '_')
+    api_client   = get_oanda_client()
+    rate_limiter = get_oanda_rate_limiter()
+    breaker      = get_circuit_breaker()
+    deadline     = current_deadline()
+    metrics      = get_stage_metrics()
+
+    for attempt in range(MAX_RETRIES):
+        if deadline is not None and deadline.expired:
+            logger.warning("Scan deadline reached — skipping %s %s", pair, timeframe_key)
+            deadline.skip(pair)
+            metrics.count('fetch_aborted', pair, timeframe_key, 'deadline')
+            return None, 0
+        sent = None
+        try:
+            if breaker.fail_fast():   # avant tout jeton de débit
+                logger.warning("OANDA circuit open — failing fast %s %s", pair, timeframe_key)
+                metrics.count('fetch_aborted', pair, timeframe_key, 'circuit_open')
+                return None, 0
+            # PERF [TOKEN-BUCKET] : budget req/s explicite au lieu de
+            # Semaphore(3) + sleep aléatoire 50-150 ms avant chaque tentative.
+            wait = rate_limiter.reserve()
+            if wait > 0:
+                t0    = time.perf_counter()
+                slept = deadline_sleep(wait, deadline)
+                metrics.observe('rate_limit_wait', time.perf_counter() - t0, pair, timeframe_key,
+                                'ok' if slept else 'deadline')
+                if not slept:
+                    rate_limiter.release()   # jeton réservé mais jamais utilisé
+                    logger.warning("Rate-limit wait exceeds scan deadline — skipping %s %s", pair, timeframe_key)
+                    deadline.skip(pair)
+                    metrics.count('fetch_aborted', pair, timeframe_key, 'deadline')
+                    return None, 0
+            if not breaker.allow():
+                rate_limiter.release()
+                logger.warning("OANDA circuit open — failing fast %s %s", pair, timeframe_key)
+                metrics.count('fetch_aborted', pair, timeframe_key, 'circuit_open')
+                return None, 0
+            r    = instruments.InstrumentsCandles(instrument=instrument, params=params)
+            sent = time.perf_counter()
+            api_client.request(r)
+            metrics.observe('http', time.perf_counter() - sent, pair, timeframe_key)
+            sent = None
+            breaker.record_success()
+
+            candles = r.response.get('candles', [])
+            with metrics.timer('parse', pair, timeframe_key):
+                df = parse_candles(candles, pair, timeframe_key)
+            return df, len(candles)
+
+        except V20Error as e:
+            # FIX [RETRY] : pas de retry sur erreurs d'authentification ou de
+            # paramètres invalides — échouer vite évite de saturer les rate-limits.
+            err_code = getattr(e, 'code', None)
+            if sent is not None:
+                metrics.observe('http', time.perf_counter() - sent, pair, timeframe_key, http_outcome(err_code))
+            if isinstance(err_code, int) and err_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()   # 4xx / 429 : le service répond
+            if err_code in (400, 401, 403):
+                logger.error(
+                    "Fatal OANDA error %s for %s %s — aborting retries: %s",
+                    err_code, pair, timeframe_key, e
+                )
+                metrics.count('fetch_aborted', pair, timeframe_key, 'fatal')
+                return None, 0
+            # 429 (rate limit) et 5xx (server error) → retry avec backoff
+            logger.warning(
+                "fetch_forex_data_oanda attempt %d/%d V20Error %s for %s %s: %s",
+                attempt + 1, MAX_RETRIES, err_code, pair, timeframe_key, e
+            )
+
+        except Exception as e:
+            network = isinstance(e, requests.RequestException)   # timeout, connexion
+            if network:
+                breaker.record_failure()
+            if sent is not None:
+                metrics.observe('http', time.perf_counter() - sent, pair, timeframe_key,
+                                'network_error' if network else 'error')
+            logger.warning(
+                "fetch_forex_data_oanda attempt %d/%d failed for %s %s: %s",
+                attempt + 1, MAX_RETRIES, pair, timeframe_key, e
+            )
+
+        if breaker.state == OPEN:
+            logger.warning("OANDA circuit opened — no retry for %s %s", pair, timeframe_key)
+            metrics.count('fetch_aborted', pair, timeframe_key, 'circuit_open')
+            return None, 0
+        if attempt < MAX_RETRIES - 1:
+            # FIX [BACKOFF] : exponentiel avec jitter
+            backoff = min(60, 2 ** attempt) + random.random()
+            t0      = time.perf_counter()
+            slept   = deadline_sleep(backoff, deadline)
+            metrics.observe('backoff', time.perf_counter() - t0, pair, timeframe_key, 'ok' if slept else 'deadline')
+            if not slept:
+                logger.warning(
+                    "Backoff %.1fs exceeds scan deadline — giving up %s %s", backoff, pair, timeframe_key
+                )
+                deadline.skip(pair)
+                metrics.count('fetch_aborted', pair, timeframe_key, 'deadline')
+                return None, 0
+
+    logger.error("Fetch definitively failed for %s %s", pair, timeframe_key)
+    metrics.count('fetch_aborted', pair, timeframe_key, 'retries_exhausted')
+    return None, 0
+
+
+def _candle_count(pair, timeframe_key):
+    count_map = CANDLE_COUNT_RESTRICTED if pair in RESTRICTED_ASSETS else CANDLE_COUNT
+    return count_map.get(timeframe_key, 150)
+
+
+def _covers(window, count):
+    """
+    Vrai si la fenêtre stockée couvre une requête de `count` bougies. OANDA
+    inclut la bougie en cours dans `count` : un fetch complet ne stocke donc
+    que count-1 bougies complètes en séance.
+    """
+    return window is not None and len(window) >= count - 1
+
+
+def _history_covers(key, window, count):
+    """_covers, ou fenêtre qui remonte déjà au début de l'historique OANDA de la clé."""
+    return _covers(window, count) or (
+        window is not None and not window.empty and _HISTORY_START.get(key) == window.index[0]
+    )
+
+
+def _candle_params(timeframe_key, count, **extra):
+    """Paramètres InstrumentsCandles avec l'alignement OANDA configuré explicitement."""
+    return {
+        'granularity':       timeframe_key,
+        'count':             count,
+        'dailyAlignment':    OANDA_DAILY_ALIGNMENT,
+        'alignmentTimezone': OANDA_ALIGNMENT_TZ,
+        'weeklyAlignment':   OANDA_WEEKLY_ANCHOR,
+        **extra,
+    }
+
+
+def _candle_window_plan(pair, timeframe_key, count):
+    """
+    Plan de récupération d'une fenêtre de bougies, sous forme de générateur :
+    il émet les paramètres de chaque requête InstrumentsCandles, reçoit en
+    retour (DataFrame | None, nb bougies reçues), et retourne la fenêtre
+    finale (ou None). Le même plan est piloté par le backend threads
+    (_run_candle_plan) et par le backend asyncio (oanda_async.run_plan_async).
+
+    PERF [DELTA-FETCH] : la fenêtre de bougies complètes est conservée par
+    (paire, TF) dans le CandleStore du process, adossé à CANDLE_STORE_DIR.
+    Si une fenêtre existe, seules les bougies postérieures à la dernière bougie
+    complète sont demandées (`from` + includeFirst=False) puis fusionnées et
+    tronquées à CANDLE_COUNT : le payload dépend du temps écoulé, plus de la
+    taille de la fenêtre. Si la réponse différentielle remplit tout le `count`
+    (longue absence), la fenêtre ne rejoint peut-être pas le présent → fetch
+    complet. Le store conserve la plus longue fenêtre demandée, l'appelant
+    reçoit les `count` dernières bougies.
+
+    PERF [HISTORY-PAGING] : au-delà de OANDA_MAX_COUNT (source d'agrégation),
+    chaque requête est limitée à une page ; une fenêtre stockée plus courte
+    est prolongée par le delta puis complétée vers le passé (`to` = première
+    bougie stockée), page par page, jusqu'à `count` bougies ou au début de
+    l'historique OANDA. L'historique persisté dans le store n'est donc
+    récupéré qu'une fois ; un échec de page laisse une fenêtre partielle,
+    complétée au scan suivant.
+    """
+    store   = get_candle_store()
+    key     = (pair, timeframe_key)
+    last_ts = store.last_time(key)
+    page    = min(count, OANDA_MAX_COUNT)
+
+    # PERF [SCAN-PLANNER] : aucune bougie n'a pu se clôturer depuis la
+    # dernière bougie complète stockée → fenêtre servie sans appel OANDA.
+    if SCAN_PLANNER and last_ts is not None and not _cell_is_due(last_ts, timeframe_key):
+        stored = store.get(key)
+        if _history_covers(key, stored, count):
+            _count_cache('store_hits', pair, timeframe_key)
+            return stored.iloc[-count:]
+
+    window = None
+    if last_ts is not None:
+        new_candles, received = yield _candle_params(
+            timeframe_key, page, **{'from': _oanda_time(last_ts), 'includeFirst': 'false'}
+        )
+        if new_candles is None:
+            return _stale_window(key, count)
+        stored = store.get(key)
+        if received < page and (count > page or _covers(stored, count)):
+            window = store.merge(key, new_candles, max(count, len(stored)))
+            if not new_candles.empty:
+                get_candle_cache().invalidate(pair, timeframe_key)
+            _count_cache('delta_fetches', pair, timeframe_key)
+
+    if window is None:
+        full_candles, _ = yield _candle_params(timeframe_key, page)
+        if full_candles is None:
+            return _stale_window(key, count)
+        store.replace(key, full_candles)
+        get_candle_cache().invalidate(pair, timeframe_key)
+        window = full_candles
+        _count_cache('full_fetches', pair, timeframe_key)
+
+    if window is None or window.empty:
+        logger.warning("No complete candles for %s %s", pair, timeframe_key)
+        return None
+
+    while count > page and not _history_covers(key, window, count):
+        older, _ = yield _candle_params(timeframe_key, page, to=_oanda_time(window.index[0]))
+        if older is None:
+            break
+        older = older[older.index < window.index[0]]
+        if older.empty:
+            _HISTORY_START[key] = window.index[0]
+            break
+        window = store.merge(key, older, count)
+        _count_cache('history_pages', pair, timeframe_key)
+
+    return window.iloc[-count:]
+
+
+def _stale_window(key, count):
+    """
+    PERF [CIRCUIT-BREAKER] : fetch en échec alors que le disjoncteur OANDA
+    n'est pas fermé → dernière fenêtre connue du store, servie périmée plutôt
+    qu'une cellule vide. None si le disjoncteur est fermé ou le store vide.
+    """
+    if get_circuit_breaker().state == CLOSED:
+        return None
+    stored = get_candle_store().get(key)
+    if not _history_covers(key, stored, count):
+        return None
+    logger.warning("OANDA circuit not closed — serving stale window for %s %s", *key)
+    _count_cache('stale_served', *key)
+    return stored.iloc[-count:]
+
+
+def _cell_is_due(last_ts, timeframe_key, now=None):
+    return cell_is_due(
+        last_ts, timeframe_key, now or pd.Timestamp.now(tz='UTC'),
+        daily_alignment=OANDA_DAILY_ALIGNMENT,
+        weekly_anchor=OANDA_WEEKLY_ANCHOR,
+        timezone=OANDA_ALIGNMENT_TZ,
+    )
+
+
+def count_due_cells(pairs):
+    """Nombre de cellules (paire, TF) pour lesquelles une nouvelle bougie a pu se clôturer."""
+    store = get_candle_store()
+    now   = pd.Timestamp.now(tz='UTC')
+    return sum(
+        _cell_is_due(store.last_time((pair, tf_key)), tf_key, now)
+        for pair in pairs for tf_key in TIMEFRAMES_FETCH_KEYS
+    )
+
+
+def next_candle_close(now=None, pairs=None):
+    """
+    Prochaine clôture possible (epoch, s) parmi les cellules connues du store ;
+    une cellule déjà due compte pour `now`. None si le store est vide.
+    """
+    store  = get_candle_store()
+    now    = pd.Timestamp.now(tz='UTC') if now is None else pd.Timestamp(now, unit='s', tz='UTC')
+    closes = []
+    for pair in (pairs or ASSETS):
+        for tf_key in TIMEFRAMES_FETCH_KEYS:
+            last_ts = store.last_time((pair, tf_key))
+            if last_ts is not None:
+                closes.append(next_close_time(
+                    last_ts, tf_key, daily_alignment=OANDA_DAILY_ALIGNMENT,
+                    weekly_anchor=OANDA_WEEKLY_ANCHOR, timezone=OANDA_ALIGNMENT_TZ,
+                ))
+    return max(min(closes), now).timestamp() if closes else None
+
+
+def warm_candle_cache(pairs=None):
+    """
+    PERF [CACHE-WARMER] : rafraîchit dans le CandleStore toutes les cellules
+    dues (ou inconnues) — mêmes plans delta, même single-flight et même token
+    bucket que le scan. En mode agrégation, seule la source H1 longue est
+    préchauffée pour les TF dérivables. Retourne les compteurs du passage.
+    """
+    store = get_candle_store()
+    now   = pd.Timestamp.now(tz='UTC')
+    cells = []
+    for pair in (pairs or ASSETS):
+        for tf_key in TIMEFRAMES_FETCH_KEYS:
+            if AGGREGATION_MODE and tf_key in (AGGREGATION_SOURCE, *AGGREGATION_TARGETS):
+                cell = (pair, AGGREGATION_SOURCE, AGGREGATION_SOURCE_COUNT)
+            else:
+                cell = (pair, tf_key, _candle_count(pair, tf_key))
+            if cell not in cells and _cell_is_due(store.last_time(cell[:2]), cell[1], now):
+                cells.append(cell)
+
+    counts = {'cells': len(cells), 'refreshed': 0, 'errors': 0}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=WARMER_WORKERS, thread_name_prefix="warmer") as executor:
+        for window in executor.map(lambda cell: _fetch_window(*cell), cells):
+            counts['refreshed' if window is not None else 'errors'] += 1
+    return counts
+
+
+def _count_cache(event, pair='', timeframe_key=''):
+    with _CACHE_LOCK:
+        _CACHE_COUNTS[event] += 1
+    get_stage_metrics().count('candle_window', pair, timeframe_key, event)
+
+
+def cache_stats():
+    """
+    Compteurs du cache de bougies : fenêtres servies par le store sans appel
+    OANDA (planificateur), fetchs différentiels et complets, pages
+    d'historique, fenêtres périmées servies disjoncteur ouvert. Le cache des fenêtres servies au scan a ses
+    propres compteurs (get_candle_cache().stats()).
+    """
+    with _CACHE_LOCK:
+        counts = dict(_CACHE_COUNTS)
+    served = counts.get('store_hits', 0)
+    total  = served + counts.get('delta_fetches', 0) + counts.get('full_fetches', 0)
+    return {
+        'store_hits':    served,
+        'delta_fetches': counts.get('delta_fetches', 0),
+        'full_fetches':  counts.get('full_fetches', 0),
+        'history_pages': counts.get('history_pages', 0),
+        'stale_served':  counts.get('stale_served', 0),
+        'hit_rate':      served / total if total else None,
+    }
+
+
+def _run_candle_plan(plan, pair, timeframe_key):
+    """Pilote synchrone d'un _candle_window_plan via _request_candles."""
+    try:
+        params = next(plan)
+        while True:
+            params = plan.send(_request_candles(pair, timeframe_key, params))
+    except StopIteration as done:
+        return done.value
+
+
+def fetch_forex_data_oanda(pair, timeframe_key, count=None):
+    """
+    Fetch OANDA différentiel avec retry sélectif, timeout, rate-limit et gestion
+    assets restreints (voir _candle_window_plan et _request_candles).
+
+    count : taille de fenêtre explicite (source d'agrégation) ; par défaut
+    CANDLE_COUNT / CANDLE_COUNT_RESTRICTED.
+
+    PERF [CANDLE-CACHE] : la fenêtre est servie par le CandleCache du process,
+    clé (paire, TF, count), tant qu'aucune nouvelle bougie n'a pu se clôturer
+    (au plus FETCH_CACHE_TTL_S) ; un Rescan ne contourne plus le cache avec
+    une nouvelle version, il relit les fenêtres encore fraîches. Les échecs
+    (None) ne sont pas conservés.
+
+    PERF [SINGLE-FLIGHT] : le cache ne protège qu'après le retour du premier
+    appel. Les appels concurrents pour la même clé (paire, TF, count), quelle
+    que soit la session, attendent le fetch déjà en vol au lieu d'en lancer
+    un second (cache froid après un déploiement).
+    """
+    if count is None:
+        count = _candle_count(pair, timeframe_key)
+    cache   = get_candle_cache()
+    metrics = get_stage_metrics()
+    key     = (pair, timeframe_key, count)
+    window  = cache.get(key)
+    if window is not None:
+        metrics.count('candle_cache', pair, timeframe_key, 'hit')
+        return window
+    metrics.count('candle_cache', pair, timeframe_key, 'miss')
+    t0     = time.perf_counter()
+    window = _fetch_window(pair, timeframe_key, count)
+    metrics.observe('fetch_window', time.perf_counter() - t0, pair, timeframe_key,
+                    'ok' if window is not None else 'missing')
+    if window is not None and not window.empty:
+        cache.put(key, window, _window_expiry(window, timeframe_key))
+    return window
+
+
+def _window_expiry(window, timeframe_key):
+    """Fin de fraîcheur d'une fenêtre (epoch, s) : prochaine clôture possible, au plus FETCH_CACHE_TTL_S."""
+    next_close = next_close_time(
+        window.index[-1], timeframe_key, daily_alignment=OANDA_DAILY_ALIGNMENT,
+        weekly_anchor=OANDA_WEEKLY_ANCHOR, timezone=OANDA_ALIGNMENT_TZ,
+    )
+    return min(next_close.timestamp(), time.time() + FETCH_CACHE_TTL_S)
+
+
+def _fetch_window(pair, timeframe_key, count):
+    """
+    Plan de fenêtre piloté en synchrone, coalescé par (paire, TF, count).
+    Sous échéance, l'attente d'un fetch identique déjà en vol est bornée.
+    """
+    deadline = current_deadline()
+    try:
+        return get_fetch_flights().do(
+            (pair, timeframe_key, count),
+            lambda: _run_candle_plan(_candle_window_plan(pair, timeframe_key, count), pair, timeframe_key),
+            timeout=None if deadline is None else deadline.remaining(),
+        )
+    except concurrent.futures.TimeoutError:
+        logger.warning("Scan deadline reached waiting for in-flight fetch %s %s", pair, timeframe_key)
+        deadline.skip(pair)
+        return None
+
+
+def fetch_candle_history(pair, timeframe_key, start):
+    """
+    Bougies complètes de `start` (horodatage UTC) à la dernière clôturée, en
+    pages de OANDA_MAX_COUNT bougies vers l'avant (`from`), sous le même token
+    bucket et le même disjoncteur que le scan. Historique du backtest
+    (backtest.py --since).
+
+    Retourne un DataFrame, éventuellement vide, ou None si la première page
+    échoue ; un échec en cours de route tronque l'historique aux pages reçues.
+    """
+    pages  = []
+    params = _candle_params(timeframe_key, OANDA_MAX_COUNT, **{'from': _oanda_time(start)})
+    while True:
+        candles, received = _request_candles(pair, timeframe_key, params)
+        if candles is None:
+            if not pages:
+                return None
+            logger.warning(
+                "History download interrupted for %s %s after %d page(s)", pair, timeframe_key, len(pages)
+            )
+            break
+        pages.append(candles)
+        if received < OANDA_MAX_COUNT or candles.empty:
+            break
+        params = _candle_params(
+            timeframe_key, OANDA_MAX_COUNT,
+            **{'from': _oanda_time(candles.index[-1]), 'includeFirst': 'false'}
+        )
+    return pd.concat(pages) if len(pages) > 1 else pages[0]
+
+
+def derive_timeframe(source, timeframe_key):
+    """Bougies `timeframe_key` agrégées localement depuis la série source (H1)."""
+    return resample_candles(
+        source, timeframe_key,
+        source_granularity=AGGREGATION_SOURCE,
+        daily_alignment=OANDA_DAILY_ALIGNMENT,
+        weekly_anchor=OANDA_WEEKLY_ANCHOR,
+        timezone=OANDA_ALIGNMENT_TZ,
+    )
+
+
+def _covered_window(source, timeframe_key, count):
+    """Fenêtre `count` du TF tirée de la source d'agrégation, ou None si non couverte."""
+    if source is None:
+        return None
+    frame = source if timeframe_key == AGGREGATION_SOURCE else derive_timeframe(source, timeframe_key)
+    return frame.iloc[-count:] if len(frame) >= count else None
+
+
+def fetch_timeframe(pair, timeframe_key, prefetched=None):
+    """
+    Bougies d'un TF pour le scan.
+
+    PERF [AGGREGATION] : en mode agrégation, la série H1 longue
+    (AGGREGATION_SOURCE_COUNT bougies : 7 pages au premier scan à froid, puis
+    un delta par scan) alimente H1 et les TF dérivables ; un TF n'est dérivé
+    que si la source couvre sa fenêtre complète, sinon il est récupéré
+    nativement. Historique stocké complet : 1 appel par actif au lieu de 5.
+
+    prefetched : fenêtres déjà récupérées par le backend asyncio, clé
+    (paire, TF, count) — aucun appel OANDA n'est alors effectué ici.
+    """
+    def _window(tf_key, count=None):
+        if prefetched is not None:
+            return prefetched.get((pair, tf_key, count or _candle_count(pair, tf_key)))
+        return fetch_forex_data_oanda(pair, tf_key, count=count)
+
+    if AGGREGATION_MODE and timeframe_key in (AGGREGATION_SOURCE, *AGGREGATION_TARGETS):
+        window = _covered_window(
+            _window(AGGREGATION_SOURCE, AGGREGATION_SOURCE_COUNT),
+            timeframe_key, _candle_count(pair, timeframe_key)
+        )
+        if window is not None:
+            return window
+    return _window(timeframe_key)
+
+
+def prefetch_candles_async(pairs, on_progress=None):
+    """
+    PERF [ASYNC-FETCH] : backend asyncio — toutes les fenêtres (paire, TF) du
+    scan sont récupérées comme tâches indépendantes sur un client HTTP
+    keep-alive unique, sous ASYNC_MAX_CONCURRENCY requêtes en vol et le
+    token bucket partagé du process. Mêmes plans de fenêtre (delta + store) que
+    fetch_forex_data_oanda, donc mêmes DataFrames en sortie.
+
+    En mode agrégation : d'abord la source H1 de chaque paire, puis les seuls
+    TF natifs que la source ne couvre pas.
+
+    Retourne dict (paire, TF, count) → DataFrame | None, à passer à
+    process_single_asset(prefetched=...).
+    """
+    def _plans(cells):
+        return {cell: (cell[0], cell[1], _candle_window_plan(*cell)) for cell in cells}
+
+    async def _run():
+        async with AsyncOandaFetcher(
+            OANDA_ACCESS_TOKEN, OANDA_ENVIRONMENT,
+            max_concurrency=ASYNC_MAX_CONCURRENCY, rate_limiter=get_oanda_rate_limiter(),
+            timeout=API_TIMEOUT, max_retries=MAX_RETRIES, circuit_breaker=get_circuit_breaker(),
+            metrics=get_stage_metrics(),
+        ) as fetcher:
+            if not AGGREGATION_MODE:
+                cells = [(p, tf, _candle_count(p, tf)) for p in pairs for tf in TIMEFRAMES_FETCH_KEYS]
+                return await fetch_plans(fetcher, _plans(cells), on_progress)
+
+            sources = [(p, AGGREGATION_SOURCE, AGGREGATION_SOURCE_COUNT) for p in pairs]
+            fetched = await fetch_plans(fetcher, _plans(sources), on_progress)
+            natives = [
+                (p, tf, _candle_count(p, tf))
+                for p in pairs for tf in TIMEFRAMES_FETCH_KEYS
+                if tf not in (AGGREGATION_SOURCE, *AGGREGATION_TARGETS)
+                or _covered_window(fetched.get((p, AGGREGATION_SOURCE, AGGREGATION_SOURCE_COUNT)),
+                                   tf, _candle_count(p, tf)) is None
+            ]
+            fetched.update(await fetch_plans(fetcher, _plans(natives), on_progress))
+            return fetched
+
+    return asyncio.run(_run())
+
+
+def validate_aggregation(pairs=None):
+    """
+    Outil de validation du mode agrégation : pour chaque (paire, TF dérivable),
+    compare les bougies dérivées de la source H1 aux bougies natives OANDA,
+    puis le RSI et le signal de divergence calculés sur chacune (fenêtres de
+    même taille). Retourne un DataFrame, une ligne par cellule.
+    """
+    records = []
+    for pair in (pairs or ASSETS):
+        source = fetch_forex_data_oanda(pair, AGGREGATION_SOURCE, count=AGGREGATION_SOURCE_COUNT)
+        for tf_display, tf_key in TIMEFRAMES:
+            if tf_key not in AGGREGATION_TARGETS:
+                continue
+            native  = fetch_forex_data_oanda(pair, tf_key)
+            derived = derive_timeframe(source, tf_key) if source is not None else None
+            if derived is not None and native is not None:
+                derived = derived.iloc[-len(native):]
+
+            diff = compare_ohlc(native, derived)
+            rsi_native,  series_native  = calculate_rsi(native)
+            rsi_derived, series_derived = calculate_rsi(derived)
+            div_native  = detect_divergence(native,  series_native,  tf_key, pair) if series_native  is not None else "Aucune"
+            div_derived = detect_divergence(derived, series_derived, tf_key, pair) if series_derived is not None else "Aucune"
+            rsi_diff    = abs(rsi_native - rsi_derived)
+
+            records.append({
+                'Devises':       pair,
+                'TF':            tf_display,
+                'bars_native':   0 if native  is None else len(native),
+                'bars_derived':  0 if derived is None else len(derived),
+                **diff,
+                'rsi_native':    rsi_native,
+                'rsi_derived':   rsi_derived,
+                'rsi_diff':      rsi_diff,
+                'div_native':    div_native,
+                'div_derived':   div_derived,
+                'match': bool(
+                    diff['ohlc_mismatch'] == 0
+                    and div_native == div_derived
+                    and pd.notna(rsi_diff) and rsi_diff <= 0.01
+                ),
+            })
+    return pd.DataFrame(records)
+
+
+# =============================================================================
+# STATISTIQUES CENTRALISÉES
+# =============================================================================
+
+def compute_statistics(result):
+    """
+    Calcul centralisé des statistiques — après le scan, et sur chaque
+    instantané partiel en rendu progressif (lignes en attente : NaN, hors buckets).
+    Buckets RSI mutuellement exclusifs, réductions vectorisées sur les
+    matrices du ScanResult (une colonne par TF).
+    """
+    counts      = result.rsi_buckets(RSI_OVERSOLD, RSI_OVERBOUGHT)
+    stats_by_tf = {
+        tf: {name: int(values[j]) for name, values in counts.items()}
+        for j, tf in enumerate(TIMEFRAMES_DISPLAY)
+    }
+
+    avg_global_rsi = result.mean_rsi()
+    total_bull_div = sum(s['bull_div'] for s in stats_by_tf.values())
+    total_bear_div = sum(s['bear_div'] for s in stats_by_tf.values())
+    extreme_count  = sum(
+        s['extreme_oversold'] + s['extreme_overbought']
+        for s in stats_by_tf.values()
+    )
+
+    if avg_global_rsi < 45:
+        market_bias = "BEARISH (Pression Vendeuse)"
+        bias_color  = (220, 20, 60)
+    elif avg_global_rsi > 55:
+        market_bias = "BULLISH (Pression Acheteuse)"
+        bias_color  = (0, 180, 80)
+    else:
+        market_bias = "NEUTRE / INCERTAIN"
+        bias_color  = (100, 100, 100)
+
+    return {
+        'by_tf':          stats_by_tf,
+        'avg_rsi':        avg_global_rsi,
+        'total_bull_div': total_bull_div,
+        'total_bear_div': total_bear_div,
+        'extreme_count':  extreme_count,
+        'market_bias':    market_bias,
+        'bias_color':     bias_color,
+    }
+
+
+# =============================================================================
+# TRAITEMENT D'UN ASSET
+# =============================================================================
+
+def process_single_asset(pair_name, prefetched=None):
+    """
+    Retourne (valeurs RSI, entrées de divergence, statut) d'un actif, une
+    valeur par TF dans l'ordre de TIMEFRAMES — une ligne du ScanResult. Les
+    divergences sont détectées ensuite en lot par TF (detect_divergence_codes),
+    ou ligne par ligne en rendu progressif (detect_row_divergence_codes).
+
+    FIX [ERROR-CONSISTENCY] : en cas d'exception, TOUS les timeframes sont
+    écrasés avec NaN — y compris ceux déjà calculés avant le crash. Un asset
+    en erreur ne doit jamais afficher de données partielles valides : l'utilisateur
+    ne peut pas distinguer un RSI H1 fiable d'un placeholder si le badge ⚠ERR
+    n'est pas immédiatement visible.
+    """
+    rsi_values = [np.nan] * len(TIMEFRAMES)
+    div_inputs = [None] * len(TIMEFRAMES)
+    status     = STATUS_OK
+    metrics    = get_stage_metrics()
+    try:
+        for j, (_, tf_key) in enumerate(TIMEFRAMES):
+            data_ohlc = fetch_timeframe(pair_name, tf_key, prefetched)
+
+            if data_ohlc is None:
+                status = max(status, _missing_status(pair_name))
+                continue
+
+            with metrics.timer('rsi', pair_name, tf_key):
+                rsi_value, rsi_series = calculate_rsi(data_ohlc, state_key=(pair_name, tf_key))
+            rsi_values[j] = rsi_value
+            div_inputs[j] = _divergence_inputs(data_ohlc, rsi_series, tf_key)
+
+    except Exception as e:
+        logger.exception("Crash in process_single_asset for %s: %s", pair_name, e)
+        # FIX [ERROR-CONSISTENCY] : écrasement de TOUS les TF (pas seulement
+        # les manquants) — cohérence garantie, aucune donnée partielle exposée.
+        return [np.nan] * len(TIMEFRAMES), [None] * len(TIMEFRAMES), STATUS_ERROR
+
+    return rsi_values, div_inputs, status
+
+
+def fetch_asset_windows(pair_name, prefetched=None):
+    """
+    Étage I/O du pipeline : fenêtres de bougies d'un actif (une par TF, None
+    si indisponible) et statut. En erreur, aucune fenêtre n'est conservée
+    (même règle FIX [ERROR-CONSISTENCY] que process_single_asset).
+    """
+    try:
+        windows = [fetch_timeframe(pair_name, tf_key, prefetched) for _, tf_key in TIMEFRAMES]
+    except Exception as e:
+        logger.exception("Crash in fetch_asset_windows for %s: %s", pair_name, e)
+        return None, STATUS_ERROR
+    return windows, (_missing_status(pair_name) if any(w is None for w in windows) else STATUS_OK)
+
+
+def _missing_status(pair_name):
+    """Cellule manquante : TIMEOUT si abandonnée pour l'échéance du scan, PARTIAL sinon."""
+    deadline = current_deadline()
+    if deadline is not None and (deadline.expired or deadline.skipped(pair_name)):
+        return STATUS_TIMEOUT
+    return STATUS_PARTIAL
+
+
+def compute_indicators_staged(result, windows):
+    """
+    PERF [CPU-STAGE] : étage CPU du pipeline — un bloc de clôtures par TF
+    (une ligne par actif, alignée à droite), RSI Wilder 2D + divergences en
+    lot via cpu_stage.run_indicator_stage, en mode CPU_STAGE. En mode
+    'processes', les blocs sont remplis directement en mémoire partagée :
+    aucun DataFrame n'est picklé vers les workers.
+    """
+    blocks = []
+    try:
+        tasks = []
+        for j, (_, tf_key) in enumerate(TIMEFRAMES):
+            closes = [
+                row[j]['Close'].to_numpy(dtype=np.float64) if row is not None and row[j] is not None else None
+                for row in windows
+            ]
+            width = max((len(c) for c in closes if c is not None), default=0)
+            block = SharedBlock((len(closes), width), shared=(CPU_STAGE == 'processes'))
+            blocks.append(block)
+            fill_block(block.array, closes)
+            tasks.append((
+                block,
+                DIVERGENCE_LOOKBACK.get(tf_key, 30),
+                DIVERGENCE_PEAK_DISTANCE.get(tf_key, 5),
+                [price_delta(pair) for pair in result.pairs],
+            ))
+        with get_stage_metrics().timer('indicators', outcome=CPU_STAGE):
+            for j, (rsi_last, codes) in enumerate(run_indicator_stage(tasks, CPU_STAGE, get_cpu_executor())):
+                result.rsi[:, j]        = rsi_last
+                result.divergence[:, j] = codes
+    finally:
+        for block in blocks:
+            block.close()
+
+
+def _publish_partial(job, result, done):
+    """PERF [STREAMING] : instantané des lignes terminées et statistiques courantes (NaN hors buckets)."""
+    snapshot = result.copy()
+    job.publish({'results': snapshot, 'done': done.copy(), 'stats': compute_statistics(snapshot)})
+
+
+def run_scan(job):
+    """
+    Corps d'un scan partagé, exécuté par le ScanCoordinator hors du thread
+    appelant : la progression passe par job.report() et les avertissements
+    par job.warn(). Retourne le résultat à publier (ScanResult, statistiques),
+    clés de l'état de session de l'app ; exports à la demande (export_bytes).
+
+    PERF [METRICS] : tout le scan tourne sous un ScanSummary (workers et
+    tâches asyncio compris) ; son résumé par étape est publié sous 'metrics'.
+    """
+    summary = ScanSummary()
+    t0      = time.perf_counter()
+    with scan_metrics_scope(summary):
+        out    = _scan_assets(job)
+        result = out['results']
+        get_stage_metrics().observe(
+            'scan', time.perf_counter() - t0,
+            outcome='ok' if result.count_status(STATUS_OK) == len(result) else 'degraded',
+        )
+    out['metrics'] = summary.as_dict()
+    if EXPORT_PRERENDER:
+        for extension in EXPORT_FORMATS:
+            get_export_cache().prerender((job.scan_id, extension), _render_export, out, extension)
+    return out
+
+
+def _scan_assets(job):
+    """Fetchs, RSI et divergences de ASSETS sous l'échéance du scan ; résultat sans exports."""
+    result     = ScanResult(ASSETS, TIMEFRAMES_DISPLAY)
+    scanned    = np.zeros(len(ASSETS), dtype=bool)
+    staged     = CPU_STAGE != 'fused'
+    streaming  = STREAM_RESULTS and not staged
+    windows    = [None] * len(ASSETS)
+    div_inputs = [[None] * len(TIMEFRAMES) for _ in ASSETS]
+    deadline   = Deadline(SCAN_DEADLINE_S)
+    rejected0  = get_circuit_breaker().stats()['rejected']
+    stale0     = cache_stats()['stale_served']
+
+    if SCAN_PLANNER:
+        due = count_due_cells(ASSETS)
+        job.report(0, len(ASSETS), (
+            f"Planification : {due}/{len(ASSETS) * len(TIMEFRAMES)} cellules avec une nouvelle bougie possible..."
+        ))
+
+    prefetched = None
+    if FETCH_BACKEND == 'asyncio':
+        def _on_fetch(key, _window, done, total):
+            job.report(0, len(ASSETS), f"Fetch asyncio : {key[0]} {key[1]} ({done}/{total})")
+        with deadline_scope(deadline):
+            prefetched = prefetch_candles_async(ASSETS, _on_fetch)
+
+    # FIX [DEADLINE] : plus de `with ThreadPoolExecutor` — sa sortie attendait
+    # tous les futures, si bien qu'un scan lent retenait l'utilisateur bien
+    # au-delà du timeout. Les workers tournent sous l'échéance du scan (fetchs,
+    # retries et backoffs s'y plient) ; à l'échéance, les actifs non démarrés
+    # sont annulés, ceux en cours abandonnés sans attente, et le résultat
+    # partiel est publié à temps avec les lignes inachevées en TIMEOUT.
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=6)
+    worker   = fetch_asset_windows if staged else process_single_asset
+    with deadline_scope(deadline):
+        future_to_asset = {
+            executor.submit(contextvars.copy_context().run, worker, asset, prefetched): (i, asset)
+            for i, asset in enumerate(ASSETS)
+        }
+    completed = 0
+    total     = len(ASSETS)
+
+    try:
+        for future in concurrent.futures.as_completed(future_to_asset, timeout=deadline.remaining()):
+            i, asset_name = future_to_asset[future]
+            try:
+                if staged:
+                    windows[i], status = future.result()
+                    result.status[i]   = status
+                else:
+                    rsi_values, div_inputs[i], status = future.result()
+                    result.set_row(i, rsi_values, DIV_NONE, status)
+                    if streaming:
+                        result.divergence[i] = detect_row_divergence_codes(div_inputs[i], asset_name)
+                if status != STATUS_OK:
+                    logger.warning("Asset %s: status=%s", asset_name, result.status_labels()[i])
+            except Exception as e:
+                logger.error("Future failed for %s: %s", asset_name, e)
+                result.mark_error(i)
+            scanned[i] = True
+            completed += 1
+            if streaming:
+                _publish_partial(job, result, scanned)
+            job.report(completed, total, f"Scan terminé : {asset_name} ({completed}/{total})")
+
+    except concurrent.futures.TimeoutError:
+        deadline.cancel()
+        logger.error("Scan deadline after %ss — %d/%d assets completed", SCAN_DEADLINE_S, completed, total)
+        job.warn(
+            f"⏱ Échéance du scan atteinte après {SCAN_DEADLINE_S}s — {completed}/{total} actifs traités, "
+            "actifs inachevés marqués TIMEOUT."
+        )
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    for i in np.flatnonzero(~scanned):
+        result.mark_timeout(i)
+
+    rejected = get_circuit_breaker().stats()['rejected'] - rejected0
+    stale    = cache_stats()['stale_served'] - stale0
+    if rejected or stale:
+        job.warn(
+            f"⚡ Disjoncteur OANDA ouvert pendant le scan : {rejected} requêtes refusées, "
+            f"{stale} fenêtres servies depuis le cache (bougies possiblement en retard)."
+        )
+
+    if staged:
+        job.report(completed, total, f"Étage CPU ({CPU_STAGE}) : RSI et divergences...")
+        compute_indicators_staged(result, windows)
+    elif not streaming:
+        for j, (_, tf_key) in enumerate(TIMEFRAMES):
+            result.divergence[:, j] = detect_divergence_codes(
+                [row[j] for row in div_inputs], tf_key, ASSETS
+            )
+
+    # PERF [LAZY-EXPORT] : plus de PDF / JSON / CSV rendus ici — voir export_bytes.
+    return {
+        'results':        result,
+        'last_scan_time': datetime.now(),
+        'scan_done':      True,
+        'scan_id':        job.scan_id,
+        'stats':          compute_statistics(result),
+    }
+
+
+# =============================================================================
+# EXPORTS
+# =============================================================================
+
+def _rsi_out(value):
+    """RSI arrondi pour les exports, None si indisponible."""
+    return None if value != value else round(value, 2)
+
+
+def _flatten_results(result):
+    """Structure plate pour l'export CSV uniquement."""
+    rsi_rows = result.rsi.tolist()
+    div_rows = result.divergence.tolist()
+    records  = []
+    for pair, status, rsi_row, div_row in zip(result.pairs, result.status_labels(), rsi_rows, div_rows):
+        record = {"Devises": pair, "Status": status}
+        for tf, rsi, div in zip(TIMEFRAMES_DISPLAY, rsi_row, div_row):
+            record[f"RSI_{tf}"] = _rsi_out(rsi)
+            record[f"DIV_{tf}"] = DIV_LABELS[div]
+        records.append(record)
+    return records
+
+
+# Code de divergence → enum neutre pour le JSON LLM
+_DIV_ENUM = {DIV_BULL: "BULL", DIV_BEAR: "BEAR", DIV_NONE: "NONE"}
+
+# Clé fetch OANDA → label display pour les timeframes dans le JSON
+_TF_KEY_MAP = {display: fetch for display, fetch in TIMEFRAMES}
+
+
+def _market_status(scan_ts):
+    """
+    Statut simplifié basé sur le jour de la semaine (UTC).
+    Samedi (5) et dimanche (6) → fermé pour le Forex.
+    Suffisant pour contextualiser le JSON sans appel API supplémentaire.
+    """
+    weekday = scan_ts.weekday()
+    if weekday == 5:
+        return "closed_saturday"
+    elif weekday == 6:
+        return "closed_sunday"
+    return "open"
+
+
+def create_json_export(result, stats, scan_ts, stage_metrics=None):
+    """
+    Export JSON enrichi, optimisé pour exploitation par un LLM.
+
+    Structure :
+    - meta     : paramètres du scan (timestamp ISO, période RSI, seuils, statut marché)
+    - summary  : agrégats pré-calculés (biais, RSI moyen, divergences, extrêmes par TF)
+    - instruments : données imbriquées par timeframe avec enums neutres (BULL/BEAR/NONE)
+
+    Les valeurs de divergence sont normalisées en enum anglais invariant pour
+    éviter toute dépendance linguistique lors du chaînage de prompts.
+    Les agrégats du bloc summary sont directement issus de compute_statistics()
+    — aucun recalcul nécessaire côté LLM.
+
+    stage_metrics : résumé par étape du scan (ScanSummary.as_dict), ajouté
+    au bloc meta sous "stage_metrics".
+    """
+    # --- Bloc meta ---
+    meta = {
+        "scan_ts":       scan_ts.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "rsi_period":    RSI_PERIOD,
+        "thresholds": {
+            "oversold":    RSI_OVERSOLD,
+            "overbought":  RSI_OVERBOUGHT,
+            "extreme_low": 20,
+            "extreme_high": 80,
+        },
+        "market_status": _market_status(scan_ts),
+        "instruments_count": len(result),
+        "timeframes": TIMEFRAMES_FETCH_KEYS,
+    }
+    if stage_metrics is not None:
+        meta["stage_metrics"] = stage_metrics
+
+    # --- Bloc summary (depuis stats pré-calculées) ---
+    by_tf_summary = {}
+    for tf in TIMEFRAMES_DISPLAY:
+        s = stats["by_tf"][tf]
+        fetch_key = _TF_KEY_MAP[tf]
+        by_tf_summary[fetch_key] = {
+            "extreme_oversold":   s["extreme_oversold"],
+            "oversold":           s["oversold"],
+            "overbought":         s["overbought"],
+            "extreme_overbought": s["extreme_overbought"],
+            "div_bull":           s["bull_div"],
+            "div_bear":           s["bear_div"],
+            "valid_count":        s["valid_count"],
+        }
+
+    # Biais : extraire le mot-clé court (BEARISH / BULLISH / NEUTRAL)
+    raw_bias = stats["market_bias"]
+    if "BEARISH" in raw_bias:
+        bias_key = "BEARISH"
+    elif "BULLISH" in raw_bias:
+        bias_key = "BULLISH"
+    else:
+        bias_key = "NEUTRAL"
+
+    summary = {
+        "market_bias":   bias_key,
+        "avg_rsi":       round(stats["avg_rsi"], 2),
+        "total_div_bull": stats["total_bull_div"],
+        "total_div_bear": stats["total_bear_div"],
+        "total_extremes": stats["extreme_count"],
+        "by_timeframe":  by_tf_summary,
+    }
+
+    # --- Bloc instruments (structure imbriquée) ---
+    instruments_out = []
+    rsi_rows = result.rsi.tolist()
+    div_rows = result.divergence.tolist()
+    for pair, status, rsi_row, div_row in zip(result.pairs, result.status_labels(), rsi_rows, div_rows):
+        tf_data = {
+            tf_fetch: {"rsi": _rsi_out(rsi), "div": _DIV_ENUM[div]}
+            for tf_fetch, rsi, div in zip(TIMEFRAMES_FETCH_KEYS, rsi_row, div_row)
+        }
+        instruments_out.append({
+            "pair":       pair,
+            "status":     status,
+            "timeframes": tf_data,
+        })
+
+    payload = {
+        "meta":        meta,
+        "summary":     summary,
+        "instruments": instruments_out,
+    }
+
+    return json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def create_csv_export(result):
+    df = pd.DataFrame(_flatten_results(result))
+    return df.to_csv(index=False).encode("utf-8-sig")
+
+
+def _render_export(scan_out, extension):
+    result, stats, scan_ts = scan_out['results'], scan_out['stats'], scan_out['last_scan_time']
+    with get_stage_metrics().timer(f'export_{extension}'):
+        if extension == 'pdf':
+            return create_pdf_report(result, stats, scan_ts.strftime("%d/%m/%Y %H:%M:%S"))
+        if extension == 'json':
+            return create_json_export(result, stats, scan_ts, scan_out.get('metrics'))
+        return create_csv_export(result)
+
+
+def export_bytes(scan_out, extension):
+    """
+    PERF [LAZY-EXPORT] : export `extension` d'un résultat de scan (clés
+    'scan_id', 'results', 'stats', 'last_scan_time', 'metrics' de run_scan), rendu au
+    premier appel puis servi par le cache du process à toutes les sessions.
+    Avant, chaque scan rendait les trois exports (FPDF compris) avant même
+    d'afficher le tableau, et chaque session en gardait une copie.
+    """
+    if extension not in EXPORT_FORMATS:
+        raise ValueError(f"format d'export inconnu : {extension!r} (attendu : {', '.join(EXPORT_FORMATS)})")
+    return get_export_cache().get((scan_out['scan_id'], extension), _render_export, scan_out, extension)
+
+
+# =============================================================================
+# API & CLI
+# =============================================================================
+
+def scan(on_progress=None, poll_s=0.25, on_partial=None):
+    """
+    Scan complet bloquant de ASSETS via le coordinateur du process : un scan
+    déjà en cours est rejoint, un résultat de moins de SCAN_FRESHNESS_S
+    secondes est réutilisé. on_progress(terminés, total, message) est appelé
+    dans le thread appelant toutes les poll_s secondes, on_partial(instantané)
+    à chaque nouvel instantané publié (STREAM_RESULTS : dict 'results',
+    'done', 'stats'). Retourne le ScanJob terminé (job.result, job.error,
+    job.warnings).
+    """
+    job  = get_scan_coordinator().request(tuple(ASSETS), run_scan)
+    seen = 0
+    while not job.wait(timeout=poll_s):
+        if on_progress is not None:
+            on_progress(*job.progress())
+        if on_partial is not None:
+            version, snapshot = job.partial()
+            if version != seen:
+                seen = version
+                on_partial(snapshot)
+    return job
+
+
+def export_file_name(last_scan_time, extension):
+    return f"RSI_Report_{last_scan_time.strftime('%Y%m%d_%H%M')}.{extension}"
+
+
+def write_exports(result, out_dir, formats=EXPORT_FORMATS):
+    """Écrit les exports d'un résultat de scan dans out_dir ; retourne les chemins."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for extension in formats:
+        path = os.path.join(out_dir, export_file_name(result['last_scan_time'], extension))
+        with open(path, 'wb') as f:
+            f.write(export_bytes(result, extension))
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Scan RSI / divergences OANDA headless, exports JSON / CSV / PDF sur disque"
+    )
+    parser.add_argument("--out", default=".", help="répertoire de sortie des exports")
+    parser.add_argument("--formats", nargs="+", choices=EXPORT_FORMATS, default=list(EXPORT_FORMATS))
+    parser.add_argument("--quiet", action="store_true", help="sans progression sur stderr")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.WARNING,
+        format='%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+    )
+    logging.captureWarnings(True)
+    if not OANDA_ACCESS_TOKEN:
+        parser.error("OANDA_ACCESS_TOKEN absent de l'environnement")
+    try:
+        configure(OANDA_ACCESS_TOKEN, OANDA_ENVIRONMENT, OANDA_ACCOUNT_ID)
+    except ValueError as e:
+        parser.error(str(e))
+
+    last_message = [None]
+
+    def _on_progress(completed, total, message):
+        if not args.quiet and message != last_message[0]:
+            last_message[0] = message
+            print(message, file=sys.stderr)
+
+    t0  = time.perf_counter()
+    job = scan(_on_progress)
+    t1  = time.perf_counter()
+    if job.error is not None:
+        print(f"Échec du scan : {job.error}", file=sys.stderr)
+        return 1
+    for message in job.warnings:
+        print(message, file=sys.stderr)
+    paths = write_exports(job.result, args.out, args.formats)
+    t2    = time.perf_counter()
+
+    result = job.result['results']
+    print(
+        f"{len(result)} actifs ({result.count_status(STATUS_OK)} OK, "
+        f"{result.count_status(STATUS_PARTIAL)} partiels, {result.count_status(STATUS_ERROR)} en erreur, "
+        f"{result.count_status(STATUS_TIMEOUT)} hors délai) "
+        f"→ {', '.join(paths)}"
+    )
+    first_row = (
+        f"premier actif {job.first_partial_at - job.started_at:.2f} s | "
+        if job.first_partial_at is not None else ""
+    )
+    print(
+        f"Démarrage à froid : imports {_IMPORT_S:.2f} s | {first_row}scan {t1 - t0:.2f} s | "
+        f"exports {t2 - t1:.3f} s | total {_IMPORT_S + t2 - t0:.2f} s"
+    )
+    stages = sorted(job.result['metrics']['stages'].items(), key=lambda item: -item[1]['total_s'])
+    print("Étapes (temps cumulé) : " + " | ".join(
+        f"{stage} {s['calls']}× {s['total_s']:.2f} s (max {s['max_s']:.2f} s)" for stage, s in stages
+    ))
+    return 0
+
+
+_IMPORT_S = time.perf_counter() - _IMPORT_T0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Planificateur de scan : une cellule (paire, TF) n'est re-demandée à OANDA
+que si une nouvelle bougie complète a pu se former depuis la dernière
+bougie complète connue.
+
+Seules des bougies complètes sont conservées : entre deux clôtures, les
+résultats Monthly / Weekly / Daily ne peuvent pas changer. La prochaine
+clôture possible est calculée avec l'alignement OANDA (resample.bucket_bounds)
+et la fermeture hebdomadaire du Forex (vendredi → dimanche, heure de
+daily alignment, fuseau d'alignement). En cas de doute (jours fériés,
+horaires réduits des indices), le planificateur demande la cellule : il ne
+doit jamais masquer une bougie réellement close.
+"""
+import pandas as pd
+
+from resample import bucket_bounds
+
+_FIXED_DURATION = {'H1': pd.Timedelta(hours=1)}
+
+_FRIDAY, _SATURDAY, _SUNDAY = 4, 5, 6
+
+
+def market_closed(ts, daily_alignment=17, timezone='America/New_York'):
+    """Vrai pendant la fermeture hebdomadaire (vendredi → dimanche à `daily_alignment`)."""
+    local = pd.Timestamp(ts).tz_convert(timezone)
+    wd, hour = local.dayofweek, local.hour
+    return (
+        (wd == _FRIDAY and hour >= daily_alignment)
+        or wd == _SATURDAY
+        or (wd == _SUNDAY and hour < daily_alignment)
+    )
+
+
+def next_reopen(ts, daily_alignment=17, timezone='America/New_York'):
+    """Réouverture suivant `ts` : dimanche à `daily_alignment`, heure locale."""
+    local  = pd.Timestamp(ts).tz_convert(timezone)
+    days   = (_SUNDAY - local.dayofweek) % 7
+    reopen = (local.normalize() + pd.Timedelta(days=days)).tz_localize(None) + pd.Timedelta(hours=daily_alignment)
+    return reopen.tz_localize(timezone).tz_convert('UTC')
+
+
+def candle_end(start, granularity, daily_alignment=17, weekly_anchor='Friday',
+               timezone='America/New_York'):
+    """Fin (UTC) de la bougie `granularity` contenant l'instant `start`."""
+    start = pd.Timestamp(start)
+    if granularity in _FIXED_DURATION:
+        return start + _FIXED_DURATION[granularity]
+    _, end = bucket_bounds(
+        pd.DatetimeIndex([start]), granularity, daily_alignment, weekly_anchor, timezone
+    )
+    return end[0]
+
+
+def next_close_time(last_start, granularity, daily_alignment=17, weekly_anchor='Friday',
+                    timezone='America/New_York'):
+    """
+    Instant le plus proche auquel la bougie suivant `last_start` (début de la
+    dernière bougie complète connue) peut être complète.
+    """
+    alignment = dict(daily_alignment=daily_alignment, weekly_anchor=weekly_anchor, timezone=timezone)
+    next_start = candle_end(last_start, granularity, **alignment)
+    if market_closed(next_start, daily_alignment, timezone):
+        next_start = next_reopen(next_start, daily_alignment, timezone)
+    return candle_end(next_start, granularity, **alignment)
+
+
+def cell_is_due(last_start, granularity, now, **alignment):
+    """Vrai si une nouvelle bougie complète peut exister à `now` (ou si rien n'est connu)."""
+    if last_start is None:
+        return True
+    return pd.Timestamp(now) >= next_close_time(last_start, granularity, **alignment)
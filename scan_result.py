@@ -0,0 +1,91 @@
+"""
+Résultat de scan dense : une ligne par actif, une colonne par timeframe.
+
+- rsi        : float64 (actifs × TF), NaN si indisponible ;
+- divergence : int8 (actifs × TF), codes DIV_NONE / DIV_BULL / DIV_BEAR ;
+- status     : int8 (actifs), codes STATUS_OK / STATUS_PARTIAL / STATUS_ERROR /
+               STATUS_TIMEOUT (échéance du scan atteinte avant la fin de l'actif).
+
+Les statistiques sont des réductions NumPy sur ces matrices ; exports et
+rendus lisent les mêmes tableaux (un seul .tolist() par matrice) au lieu de
+reparcourir des dicts imbriqués. Les libellés français ne servent plus qu'à
+l'affichage.
+"""
+import numpy as np
+
+DIV_NONE, DIV_BULL, DIV_BEAR = 0, 1, -1
+DIV_LABELS = {DIV_NONE: 'Aucune', DIV_BULL: 'Haussière', DIV_BEAR: 'Baissière'}
+DIV_CODES  = {label: code for code, label in DIV_LABELS.items()}
+
+STATUS_OK, STATUS_PARTIAL, STATUS_ERROR, STATUS_TIMEOUT = 0, 1, 2, 3
+STATUS_LABELS = ('OK', 'PARTIAL', 'ERROR', 'TIMEOUT')
+
+
+class ScanResult:
+    """Matrices RSI / divergence et vecteur de statut d'un scan."""
+
+    __slots__ = ('pairs', 'timeframes', 'rsi', 'divergence', 'status')
+
+    def __init__(self, pairs, timeframes, rsi=None, divergence=None, status=None):
+        shape           = (len(pairs), len(timeframes))
+        self.pairs      = list(pairs)
+        self.timeframes = list(timeframes)
+        self.rsi        = np.full(shape, np.nan) if rsi is None else rsi
+        self.divergence = np.zeros(shape, dtype=np.int8) if divergence is None else divergence
+        self.status     = np.zeros(shape[0], dtype=np.int8) if status is None else status
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def set_row(self, i, rsi_values, divergence_codes, status):
+        self.rsi[i]        = rsi_values
+        self.divergence[i] = divergence_codes
+        self.status[i]     = status
+
+    def mark_error(self, i):
+        """Actif en erreur : tous les TF effacés, aucune donnée partielle exposée."""
+        self.set_row(i, np.nan, DIV_NONE, STATUS_ERROR)
+
+    def mark_timeout(self, i):
+        """Actif inachevé à l'échéance du scan : cellules vides, statut TIMEOUT."""
+        self.set_row(i, np.nan, DIV_NONE, STATUS_TIMEOUT)
+
+    def copy(self):
+        return ScanResult(self.pairs, self.timeframes, self.rsi.copy(), self.divergence.copy(), self.status.copy())
+
+    def take(self, mask):
+        """Sous-ensemble des lignes sélectionnées par `mask` (booléens)."""
+        mask = np.asarray(mask, dtype=bool)
+        return ScanResult(
+            [p for p, keep in zip(self.pairs, mask) if keep], self.timeframes,
+            self.rsi[mask], self.divergence[mask], self.status[mask],
+        )
+
+    def status_labels(self):
+        return [STATUS_LABELS[code] for code in self.status.tolist()]
+
+    def count_status(self, status):
+        return int(np.count_nonzero(self.status == status))
+
+    def rsi_buckets(self, oversold, overbought, extreme_low=20, extreme_high=80):
+        """
+        Comptes par TF (vecteurs de longueur nb TF) des buckets RSI mutuellement
+        exclusifs et des divergences. Les NaN ne tombent dans aucun bucket.
+        """
+        rsi = self.rsi
+        with np.errstate(invalid='ignore'):
+            return {
+                'extreme_oversold':   np.count_nonzero(rsi <= extreme_low, axis=0),
+                'oversold':           np.count_nonzero((rsi > extreme_low) & (rsi <= oversold), axis=0),
+                'extreme_overbought': np.count_nonzero(rsi >= extreme_high, axis=0),
+                'overbought':         np.count_nonzero((rsi >= overbought) & (rsi < extreme_high), axis=0),
+                'bull_div':           np.count_nonzero(self.divergence == DIV_BULL, axis=0),
+                'bear_div':           np.count_nonzero(self.divergence == DIV_BEAR, axis=0),
+                'valid_count':        np.count_nonzero(~np.isnan(rsi), axis=0),
+            }
+
+    def mean_rsi(self, default=50.0):
+        """RSI moyen sur toutes les cellules valides."""
+        by_tf = self.rsi.T   # ordre TF par TF, comme l'agrégation historique
+        valid = by_tf[~np.isnan(by_tf)]
+        return float(valid.mean()) if valid.size else default
@@ -0,0 +1,63 @@
+"""
+Coalescence des appels identiques en vol (single-flight).
+
+Tant qu'un appel est en cours pour une clé, les autres appelants de la même
+clé attendent son résultat (Future partagé) au lieu de le refaire. Rien n'est
+conservé après la fin de l'appel : le cache reste l'affaire du cache de fetch (scan_engine)
+et du CandleStore, ce module ne couvre que la fenêtre « cache froid » où
+plusieurs threads / sessions manquent le cache au même instant.
+"""
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Registre thread-safe des appels en vol, avec compteurs de déduplication."""
+
+    def __init__(self):
+        self._lock         = threading.Lock()
+        self._inflight     = {}
+        self.calls         = 0
+        self.executed      = 0
+        self.deduplicated  = 0
+
+    def do(self, key, fn, *args, timeout=None, **kwargs):
+        """
+        Exécute fn(*args, **kwargs) pour `key`, ou attend l'appel identique déjà
+        en vol. Une exception du meneur est propagée à tous les appelants.
+        timeout : attente maximale d'un suiveur (TimeoutError au-delà) ; le
+        meneur, lui, va au bout de son appel.
+        """
+        with self._lock:
+            self.calls += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self.executed += 1
+            else:
+                self.deduplicated += 1
+
+        if not leader:
+            return future.result(timeout=timeout)
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_result(result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls':        self.calls,
+                'executed':     self.executed,
+                'deduplicated': self.deduplicated,
+                'inflight':     len(self._inflight),
+            }
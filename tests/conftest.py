@@ -0,0 +1,36 @@
+"""Fixtures partagées : serveur OANDA factice branché sur le client du scan."""
+import oandapyV20.oandapyV20 as v20
+import pandas as pd
+import pytest
+
+import scan_engine
+from oanda_stub import serve_in_thread
+
+STUB_NOW = pd.Timestamp('2024-06-05 12:30', tz='UTC')
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    """
+    Fabrique de stubs OANDA (horloge figée à STUB_NOW par défaut) : le client
+    oandapyV20 de scan_engine pointe sur le dernier démarré. Disjoncteur, token
+    bucket et client du process sont recréés à la fin du test.
+    """
+    servers = []
+
+    def start(**kwargs):
+        kwargs.setdefault('now', STUB_NOW)
+        server = serve_in_thread(**kwargs)
+        monkeypatch.setitem(v20.TRADING_ENVIRONMENTS, 'practice', {'api': server.base_url, 'stream': server.base_url})
+        monkeypatch.setattr(scan_engine, 'OANDA_ACCESS_TOKEN', None)
+        scan_engine.get_oanda_client.cache_clear()
+        scan_engine.configure('stub', 'practice')
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+    for singleton in (scan_engine.get_oanda_client, scan_engine.get_oanda_rate_limiter,
+                      scan_engine.get_circuit_breaker):
+        singleton.cache_clear()
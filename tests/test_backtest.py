@@ -0,0 +1,50 @@
+"""Backtest : téléchargement de l'historique (--since) et cas limites du rejeu."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import load_history, run_backtest
+from candle_store import load_window, save_window
+from conftest import STUB_NOW as NOW
+
+
+@pytest.fixture
+def stub(stub_server):
+    return stub_server()
+
+
+def test_history_is_paged_then_resumed(stub, tmp_path):
+    sizes = load_history(str(tmp_path), '2023-06-01', ('H1', 'H4'), pairs=['EUR/USD'])
+    h1    = load_window(str(tmp_path / 'EUR_USD_H1.npz'))
+    assert h1.index[0] == pd.Timestamp('2023-06-01', tz='UTC')
+    assert h1.index[-1] == NOW.floor('h') - pd.Timedelta(hours=1)
+    assert (np.diff(h1.index.asi8) == pd.Timedelta(hours=1).value).all()
+    assert sizes[('EUR/USD', 'H1')] == len(h1) > 5000
+    assert stub.request_count == 3
+
+    stub._now = NOW + pd.Timedelta(hours=3)
+    sizes = load_history(str(tmp_path), '2023-06-01', ('H1',), pairs=['EUR/USD'])
+    assert sizes[('EUR/USD', 'H1')] == len(h1) + 3
+    assert stub.request_count == 4
+
+
+def test_backtest_runs_on_downloaded_history(stub, tmp_path):
+    load_history(str(tmp_path), '2024-01-01', ('H1', 'H4'), pairs=['EUR/USD', 'USD/JPY'])
+    summary = run_backtest(str(tmp_path), ('H1', 'H4'), str(tmp_path / 'out.npz'), workers=2)
+    assert sorted(zip(summary['pair'], summary['tf'])) == [
+        ('EUR/USD', 'H1'), ('EUR/USD', 'H4'), ('USD/JPY', 'H1'), ('USD/JPY', 'H4'),
+    ]
+    with np.load(tmp_path / 'out.npz') as out:
+        assert len(out['signal']) == summary['bars'].sum()
+
+
+def test_missing_or_empty_store_is_reported(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        run_backtest(str(tmp_path), ('H1',), str(tmp_path / 'out.npz'))
+    empty = pd.DataFrame(
+        {col: np.empty(0) for col in ('Open', 'High', 'Low', 'Close', 'Volume')},
+        index=pd.DatetimeIndex([], tz='UTC', name='Time'),
+    )
+    save_window(str(tmp_path / 'EUR_USD_H1.npz'), empty)
+    with pytest.raises(ValueError, match="vides"):
+        run_backtest(str(tmp_path), ('H1',), str(tmp_path / 'out.npz'))
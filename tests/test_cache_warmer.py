@@ -0,0 +1,133 @@
+"""CacheWarmer : réveils calés sur les clôtures, arrêt sur inactivité et redémarrage par touch()."""
+import threading
+
+import pytest
+
+from cache_warmer import CacheWarmer
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeWarm:
+    """warm() factice : compte les passages et signale chacun à l'appelant."""
+
+    def __init__(self, counts=None, error=None):
+        self.calls  = 0
+        self.counts = counts or {'cells': 4, 'refreshed': 2, 'errors': 0}
+        self.error  = error
+        self.ran    = threading.Semaphore(0)
+
+    def __call__(self):
+        self.calls += 1
+        self.ran.release()
+        if self.error is not None:
+            raise self.error
+        return self.counts
+
+
+def _warmer(clock, warm=None, close=None, **kwargs):
+    kwargs = {'delay_s': 10.0, 'idle_s': 600.0, 'min_interval_s': 300.0, **kwargs}
+    return CacheWarmer(warm or FakeWarm(), lambda now: close, clock=clock, **kwargs)
+
+
+def _stop_and_join(warmer):
+    thread = warmer._thread
+    warmer.stop()
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+@pytest.mark.parametrize('close, last_run, expected', [
+    (None,   None,   1000 + 300),    # aucune clôture connue : repasse après min_interval_s
+    (1500.0, None,   1500 + 10),     # clôture + delay_s
+    (1005.0, 900.0,  900 + 300),     # jamais moins de min_interval_s après le passage précédent
+    (1500.0, 900.0,  1500 + 10),
+])
+def test_schedule(close, last_run, expected):
+    warmer = _warmer(FakeClock(), close=close)
+    warmer._last_run = last_run
+    assert warmer._schedule(1000.0) == expected
+
+
+def test_idle_after_idle_s_without_touch():
+    clock  = FakeClock()
+    warmer = _warmer(clock)
+    assert warmer._idle_locked(clock.now)             # jamais touché
+    warmer._last_seen = clock.now
+    assert not warmer._idle_locked(clock.now + 600)
+    assert warmer._idle_locked(clock.now + 600.1)
+
+
+def test_warms_when_due_then_reschedules():
+    """Clôture passée : un passage immédiat, compteurs cumulés, prochain réveil après min_interval_s."""
+    clock  = FakeClock()
+    warm   = FakeWarm()
+    warmer = _warmer(clock, warm, close=clock.now - 60)
+    warmer.touch()
+    assert warm.ran.acquire(timeout=5)
+    _stop_and_join(warmer)
+    assert warm.calls == 1
+    assert warmer.stats() == {
+        'running':       False,
+        'runs':          1,
+        'refreshed':     2,
+        'errors':        0,
+        'last_run':      1000.0,
+        'last_duration': warmer.last_duration,
+        'next_wake':     None,
+        'last_error':    None,
+    }
+
+
+def test_warm_failure_is_counted_and_loop_survives():
+    clock  = FakeClock()
+    warm   = FakeWarm(error=RuntimeError('OANDA down'))
+    warmer = _warmer(clock, warm, close=clock.now - 60)
+    warmer.touch()
+    assert warm.ran.acquire(timeout=5)
+    _stop_and_join(warmer)
+    assert warmer.runs == 1 and warmer.errors == 1
+    assert warmer.last_error == 'OANDA down'
+
+
+def test_stops_when_idle_and_touch_restarts():
+    """Sans touch() depuis idle_s : le thread s'arrête et libère sa place ; le touch() suivant relance."""
+    clock  = FakeClock()
+    warm   = FakeWarm()
+    warmer = _warmer(clock, warm, close=clock.now + 3600)   # clôture lointaine : attente
+    warmer.touch()
+    thread = warmer._thread
+    assert warmer.running and warmer.next_wake is not None
+
+    clock.now += 601
+    warmer._wakeup.set()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert warmer._thread is None and not warmer.running
+    assert warmer.next_wake is None and warm.calls == 0
+
+    warmer.touch()
+    assert warmer._thread is not thread and warmer.running
+    _stop_and_join(warmer)
+
+
+def test_touch_while_running_keeps_single_thread():
+    clock  = FakeClock()
+    warmer = _warmer(clock, close=clock.now + 3600)
+    warmer.touch()
+    thread = warmer._thread
+    clock.now += 500
+    warmer.touch()
+    warmer._wakeup.set()
+    assert warmer._thread is thread
+    clock.now += 500                                        # 500 s après le dernier touch : actif
+    warmer._wakeup.set()
+    thread.join(0.2)
+    assert thread.is_alive() and warmer.running
+    _stop_and_join(warmer)
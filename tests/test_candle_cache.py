@@ -0,0 +1,95 @@
+"""CandleCache : éviction LRU bornée en octets, échéance de fraîcheur, invalidation et compteurs."""
+import numpy as np
+import pandas as pd
+
+from candle_cache import CandleCache, frame_nbytes
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _window(n=100):
+    index = pd.date_range('2024-06-03', periods=n, freq='h', tz='UTC')
+    return pd.DataFrame({col: np.arange(n, dtype=np.float64) for col in ('Open', 'High', 'Low', 'Close')}, index=index)
+
+
+WINDOW_BYTES = frame_nbytes(_window())
+
+
+def test_frame_nbytes_counts_columns_and_index():
+    assert WINDOW_BYTES == 100 * 8 * 4 + 100 * 8
+
+
+def test_lru_eviction_keeps_bytes_under_budget():
+    """Budget de 3 fenêtres : la 4e évince la moins récemment servie, pas la plus ancienne insérée."""
+    cache = CandleCache(max_bytes=3 * WINDOW_BYTES, clock=FakeClock())
+    for pair in ('EUR_USD', 'USD_JPY', 'GBP_USD'):
+        cache.put((pair, 'H1', 100), _window(), expires_at=2000)
+    assert cache.get(('EUR_USD', 'H1', 100)) is not None     # EUR_USD redevient la plus récente
+
+    cache.put(('AUD_USD', 'H1', 100), _window(), expires_at=2000)
+    stats = cache.stats()
+    assert stats['entries'] == 3 and stats['evictions'] == 1
+    assert stats['bytes'] == 3 * WINDOW_BYTES <= stats['max_bytes']
+    assert cache.get(('USD_JPY', 'H1', 100)) is None
+    for pair in ('EUR_USD', 'GBP_USD', 'AUD_USD'):
+        assert cache.get((pair, 'H1', 100)) is not None
+
+    cache.put(('NZD_USD', 'H1', 300), _window(300), expires_at=2000)   # 3 fenêtres d'un coup
+    stats = cache.stats()
+    assert stats['entries'] == 1 and stats['evictions'] == 4
+    assert stats['bytes'] == frame_nbytes(_window(300))
+
+
+def test_oversized_or_expired_window_is_not_kept():
+    cache = CandleCache(max_bytes=WINDOW_BYTES - 1, clock=FakeClock())
+    cache.put(('EUR_USD', 'H1', 100), _window(), expires_at=2000)
+    assert cache.stats()['entries'] == 0 and cache.stats()['bytes'] == 0
+
+    cache = CandleCache(max_bytes=10 * WINDOW_BYTES, clock=FakeClock())
+    cache.put(('EUR_USD', 'H1', 100), _window(), expires_at=1000)
+    assert cache.stats()['entries'] == 0
+
+
+def test_replacing_a_key_recounts_its_bytes():
+    cache = CandleCache(max_bytes=10 * WINDOW_BYTES, clock=FakeClock())
+    cache.put(('EUR_USD', 'H1', 100), _window(), expires_at=2000)
+    cache.put(('EUR_USD', 'H1', 100), _window(50), expires_at=2000)
+    assert cache.stats()['entries'] == 1
+    assert cache.stats()['bytes'] == frame_nbytes(_window(50))
+
+
+def test_entry_expires_at_given_instant():
+    clock  = FakeClock()
+    cache  = CandleCache(clock=clock)
+    window = _window()
+    cache.put(('EUR_USD', 'D', 100), window, expires_at=1500)
+    clock.now = 1499.9
+    assert cache.get(('EUR_USD', 'D', 100)) is window
+    clock.now = 1500
+    assert cache.get(('EUR_USD', 'D', 100)) is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expired']) == (1, 1, 1)
+    assert stats['entries'] == 0 and stats['bytes'] == 0
+
+
+def test_invalidate_by_instrument_granularity_or_all():
+    cache = CandleCache(clock=FakeClock())
+    for key in (('EUR_USD', 'H1', 200), ('EUR_USD', 'D', 150), ('USD_JPY', 'H1', 200), ('USD_JPY', 'H1', 50)):
+        cache.put(key, _window(), expires_at=2000)
+
+    assert cache.invalidate('USD_JPY', 'H1') == 2
+    assert cache.get(('USD_JPY', 'H1', 200)) is None
+    assert cache.get(('EUR_USD', 'H1', 200)) is not None
+    assert cache.invalidate(granularity='D') == 1
+    assert cache.invalidate('GBP_USD') == 0
+    cache.clear()
+    stats = cache.stats()
+    assert stats['entries'] == 0 and stats['bytes'] == 0
+    assert stats['invalidations'] == 4
+    assert stats['evictions'] == 0
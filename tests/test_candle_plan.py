@@ -0,0 +1,79 @@
+"""Plan de fenêtre de scan_engine : pagination de l'historique au-delà d'une requête OANDA."""
+import pandas as pd
+import pytest
+
+import scan_engine
+from candle_store import CandleStore, parse_candles
+from oanda_stub import _EPOCH, synthetic_candles
+
+HOUR = pd.Timedelta(hours=1)
+
+
+def _responder(now_bar, first_bar=0):
+    """Réponses OANDA H1 (from / to / count) sur un historique [first_bar, now_bar]."""
+    requests = []
+
+    def respond(params):
+        requests.append(params)
+        count = params['count']
+        if 'from' in params:
+            first = int((pd.Timestamp(params['from']) - _EPOCH) / HOUR) + 1
+            bars  = range(first, min(first + count, now_bar + 1))
+        elif 'to' in params:
+            last = int((pd.Timestamp(params['to']) - _EPOCH) / HOUR) - 1
+            bars = range(max(last - count + 1, first_bar), last + 1)
+        else:
+            bars = range(now_bar - count + 1, now_bar + 1)
+        candles = synthetic_candles('EUR_USD', 'H1', list(bars), now_bar)
+        return parse_candles(candles), len(candles)
+
+    return respond, requests
+
+
+def _run(respond, count):
+    plan = scan_engine._candle_window_plan('EUR/USD', 'H1', count)
+    try:
+        params = next(plan)
+        while True:
+            params = plan.send(respond(params))
+    except StopIteration as done:
+        return done.value
+
+
+@pytest.fixture(autouse=True)
+def memory_store(monkeypatch):
+    store = CandleStore()
+    monkeypatch.setattr(scan_engine, 'get_candle_store', lambda: store)
+    monkeypatch.setattr(scan_engine, '_HISTORY_START', {})
+    return store
+
+
+def test_history_is_paged_backwards_then_extended_by_delta(memory_store):
+    respond, requests = _responder(now_bar=40000)
+    window = _run(respond, 12000)
+    assert len(window) == 12000 and window.index.is_unique
+    assert window.index[-1] == _EPOCH + 39999 * HOUR
+    assert [('to' in p, p['count']) for p in requests] == [(False, 5000), (True, 5000), (True, 5000)]
+
+    respond, requests = _responder(now_bar=40003)
+    window = _run(respond, 12000)
+    assert [('from' in p) for p in requests] == [True]
+    assert len(memory_store.get(('EUR/USD', 'H1'))) == 12000
+    assert window.index[-1] == _EPOCH + 40002 * HOUR
+
+
+def test_paging_stops_at_start_of_history(memory_store):
+    respond, requests = _responder(now_bar=7000)
+    window = _run(respond, 12000)
+    assert len(window) == 7000 and window.index[0] == _EPOCH
+    assert len(requests) == 3
+
+    respond, requests = _responder(now_bar=7001)
+    assert len(_run(respond, 12000)) == 7001
+    assert len(requests) == 1
+
+
+def test_window_within_one_request_is_not_paged():
+    respond, requests = _responder(now_bar=40000)
+    assert len(_run(respond, 200)) == 199
+    assert len(requests) == 1 and 'to' not in requests[0]
@@ -0,0 +1,31 @@
+"""Parsing colonnaire des réponses OANDA (candle_store.py) contre l'ancien parseur."""
+import pandas as pd
+import pytest
+
+from candle_store import CANDLE_COLUMNS, _parse_candles_reference, parse_candles
+from oanda_stub import synthetic_candles
+
+
+def _candles(n):
+    return synthetic_candles('EUR_USD', 'H1', list(range(100000, 100000 + n)), 100000 + n - 1)
+
+
+@pytest.mark.parametrize("n", (2, 200, 5000))
+def test_parse_matches_reference(n):
+    candles = _candles(n)
+    pd.testing.assert_frame_equal(parse_candles(candles), _parse_candles_reference(candles), check_dtype=False)
+
+
+def test_malformed_rows_are_dropped():
+    candles = _candles(50)
+    candles[3]['mid']['c'] = 'n/a'
+    candles[7]['volume']   = 'abc'
+    del candles[11]['mid']
+    del candles[13]['time']
+    pd.testing.assert_frame_equal(parse_candles(candles), _parse_candles_reference(candles), check_dtype=False)
+    assert len(parse_candles(candles)) == 49 - 4
+
+
+def test_no_complete_candle_gives_empty_frame():
+    df = parse_candles(_candles(1))
+    assert df.empty and list(df.columns) == list(CANDLE_COLUMNS)
@@ -0,0 +1,144 @@
+"""Disjoncteur OANDA : transitions fermé → ouvert → semi-ouvert → fermé sur horloge injectée."""
+import threading
+
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _breaker(clock, **kwargs):
+    kwargs = {'failure_rate': 0.5, 'window': 10, 'min_calls': 4, 'open_s': 30.0, **kwargs}
+    return CircuitBreaker(clock=clock, **kwargs)
+
+
+def _open(breaker):
+    for _ in range(breaker.min_calls):
+        breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def test_closed_needs_min_calls_and_failure_rate():
+    """Fermé : pas d'ouverture sous `min_calls` issues ni sous le taux d'échec."""
+    breaker = _breaker(FakeClock())
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CLOSED            # 3 issues < min_calls
+    for _ in range(4):
+        breaker.record_success()
+    assert breaker.state == CLOSED            # 3 / 7 < 50 %
+    breaker.record_failure()
+    assert breaker.state == OPEN              # 4 / 8 ≥ 50 %
+    assert breaker.stats()['opened'] == 1
+
+
+def test_open_rejects_until_open_s_elapsed():
+    """Ouvert : refus immédiats comptés, passage en semi-ouvert après `open_s`."""
+    clock   = FakeClock()
+    breaker = _breaker(clock)
+    _open(breaker)
+    assert breaker.fail_fast() and not breaker.allow()
+    assert breaker.stats()['rejected'] == 2
+    assert breaker.stats()['retry_in_s'] == 30.0
+
+    clock.now += 29.9
+    assert breaker.state == OPEN and breaker.stats()['retry_in_s'] == pytest.approx(0.1)
+    clock.now += 0.1
+    assert breaker.state == HALF_OPEN
+    assert not breaker.fail_fast()            # la sonde passe par allow()
+
+
+def test_half_open_success_closes_and_resets_window():
+    """Sonde réussie : fermé, fenêtre d'issues vidée (les échecs d'avant ne comptent plus)."""
+    clock   = FakeClock()
+    breaker = _breaker(clock)
+    _open(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.stats()['failure_rate'] == 0.0
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert [(old, new) for _, old, new in breaker.transitions] == [
+        (CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED),
+    ]
+
+
+def test_half_open_failure_reopens_for_open_s():
+    """Sonde en échec : rouvert pour un nouveau `open_s` compté depuis l'échec."""
+    clock   = FakeClock()
+    breaker = _breaker(clock)
+    _open(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    clock.now += 5
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.stats()['retry_in_s'] == 30.0
+    assert breaker.stats()['opened'] == 2
+
+
+def test_single_probe_in_half_open():
+    """Semi-ouvert : une seule sonde à la fois, même sous appels concurrents."""
+    clock   = FakeClock()
+    breaker = _breaker(clock)
+    _open(breaker)
+    clock.now += 30
+
+    allowed = []
+    barrier = threading.Barrier(16)
+
+    def _call():
+        barrier.wait()
+        allowed.append(breaker.allow())
+
+    threads = [threading.Thread(target=_call) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert allowed.count(True) == 1
+    assert breaker.stats()['rejected'] == 15
+    assert breaker.state == HALF_OPEN
+
+
+def test_stuck_probe_reopens_after_open_s():
+    """Sonde sans issue après `open_s` : comptée en échec, rouvert, puis une nouvelle sonde."""
+    clock   = FakeClock()
+    breaker = _breaker(clock)
+    _open(breaker)
+    clock.now += 30
+    assert breaker.allow()                    # sonde partie, jamais d'issue
+
+    clock.now += 29
+    assert breaker.state == HALF_OPEN and not breaker.allow()
+    clock.now += 1
+    assert breaker.state == OPEN
+    assert breaker.fail_fast()
+
+    clock.now += 30
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_late_outcome_of_stuck_probe_is_ignored():
+    """L'issue tardive d'une sonde expirée ne change pas l'état rouvert."""
+    clock   = FakeClock()
+    breaker = _breaker(clock)
+    _open(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    clock.now += 30
+    assert breaker.state == OPEN
+    breaker.record_success()
+    assert breaker.state == OPEN
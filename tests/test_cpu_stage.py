@@ -0,0 +1,54 @@
+"""Étage CPU (cpu_stage.py) : mêmes sorties en inline, threads et processes."""
+import numpy as np
+import pytest
+
+from cpu_stage import SharedBlock, fill_block, make_executor, run_indicator_stage
+
+WIDTHS = {'H1': 500, 'D': 150, 'M': 60}
+PARAMS = {'H1': (40, 3), 'D': (30, 4), 'M': (15, 2)}
+
+
+@pytest.fixture(scope="module")
+def universe(n_instruments=100):
+    rng    = np.random.default_rng(11)
+    deltas = rng.choice([0.0003, 0.001, 0.002], n_instruments)
+    series = {
+        tf: [
+            # Longueurs variées, y compris sous le minimum du RSI et des divergences.
+            1.10 * np.exp(np.cumsum(rng.normal(0, 2e-3, int(rng.integers(0, width + 1)))))
+            for _ in range(n_instruments)
+        ]
+        for tf, width in WIDTHS.items()
+    }
+    return series, deltas
+
+
+def _run(universe, mode, executor=None):
+    series, deltas = universe
+    blocks = [SharedBlock((len(deltas), WIDTHS[tf]), shared=(mode == 'processes')) for tf in WIDTHS]
+    try:
+        for block, tf in zip(blocks, WIDTHS):
+            fill_block(block.array, series[tf])
+        tasks = [(block, *PARAMS[tf], deltas) for block, tf in zip(blocks, WIDTHS)]
+        return run_indicator_stage(tasks, mode, executor, chunk_rows=16)
+    finally:
+        for block in blocks:
+            block.close()
+
+
+@pytest.mark.parametrize("mode", ('threads', 'processes'))
+def test_modes_match_inline(universe, mode):
+    expected = _run(universe, 'inline')
+    executor = make_executor(mode, workers=2)
+    try:
+        got = _run(universe, mode, executor)
+    finally:
+        executor.shutdown()
+    for (rsi_a, codes_a), (rsi_b, codes_b) in zip(expected, got):
+        np.testing.assert_array_equal(rsi_a, rsi_b)
+        np.testing.assert_array_equal(codes_a, codes_b)
+
+
+def test_unknown_mode_is_rejected(universe):
+    with pytest.raises(ValueError):
+        _run(universe, 'gpu')
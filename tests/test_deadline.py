@@ -0,0 +1,131 @@
+"""Échéance du scan : Deadline, propagation par ContextVar, cellules TIMEOUT à l'échéance."""
+import contextvars
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import scan_engine
+from deadline import Deadline, current_deadline, deadline_scope, sleep as deadline_sleep
+from scan_coordinator import ScanJob
+from scan_result import STATUS_OK, STATUS_TIMEOUT
+
+
+class FakeClock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_remaining_allows_and_expiry():
+    """Budget restant décompté sur l'horloge ; une attente doit finir strictement avant l'échéance."""
+    clock    = FakeClock()
+    deadline = Deadline(10, clock=clock)
+    assert deadline.remaining() == 10
+    assert deadline.allows(9.9) and not deadline.allows(10)
+    assert deadline.timeout(30) == 10 and deadline.timeout(2) == 2
+
+    clock.now += 7
+    assert deadline.remaining() == 3
+    assert deadline.allows(2.5) and not deadline.allows(3)
+    assert not deadline.expired
+
+    clock.now += 5
+    assert deadline.remaining() == 0.0
+    assert deadline.expired and not deadline.allows(0)
+
+
+def test_cancel_exhausts_budget():
+    """cancel() : plus aucun budget, même loin de l'échéance."""
+    deadline = Deadline(60, clock=FakeClock())
+    deadline.cancel()
+    assert deadline.cancelled and deadline.expired
+    assert deadline.remaining() == 0.0 and not deadline.allows(0.01)
+
+
+def test_sleep_refused_without_waiting():
+    """Une attente qui dépasserait l'échéance est refusée tout de suite ; None : attente normale."""
+    deadline = Deadline(0.5)
+    t0 = time.monotonic()
+    assert deadline_sleep(5, deadline) is False
+    assert time.monotonic() - t0 < 0.1
+    assert deadline_sleep(0.01, deadline) is True
+    assert deadline_sleep(0, None) is True
+
+
+def test_sleep_interrupted_by_cancel():
+    """cancel() réveille une attente en cours, qui rend False."""
+    deadline = Deadline(30)
+    threading.Timer(0.05, deadline.cancel).start()
+    t0 = time.monotonic()
+    assert deadline.sleep(10) is False
+    assert time.monotonic() - t0 < 2
+
+
+def test_skip_records_abandoned_keys():
+    deadline = Deadline(10, clock=FakeClock())
+    deadline.skip('EUR/USD')
+    assert deadline.skipped('EUR/USD') and not deadline.skipped('USD/JPY')
+
+
+def test_scope_is_visible_to_copied_contexts_and_reset():
+    """Le scope se propage aux threads lancés par copy_context().run, puis est retiré à la sortie."""
+    outer, inner = Deadline(10), Deadline(5)
+    assert current_deadline() is None
+    with deadline_scope(outer):
+        with deadline_scope(inner):
+            ctx = contextvars.copy_context()
+            assert current_deadline() is inner
+        assert current_deadline() is outer
+    assert current_deadline() is None
+
+    seen = []
+    thread = threading.Thread(target=ctx.run, args=(lambda: seen.append(current_deadline()),))
+    thread.start()
+    thread.join()
+    assert seen == [inner]
+
+
+@pytest.fixture
+def slow_scan(stub_server, monkeypatch):
+    """Scan de 8 actifs contre un stub lent (0,2s par requête), état du process isolé."""
+    monkeypatch.setattr(scan_engine, 'ASSETS', scan_engine.ASSETS[:8])
+    monkeypatch.setattr(scan_engine, 'CANDLE_STORE_DIR', '')
+    monkeypatch.setattr(scan_engine, 'OANDA_RATE_PER_SEC', 1000.0)
+    monkeypatch.setattr(scan_engine, 'CPU_STAGE', 'fused')
+    monkeypatch.setattr(scan_engine, 'FETCH_BACKEND', 'threads')
+    singletons = (scan_engine.get_oanda_rate_limiter, scan_engine.get_candle_store,
+                  scan_engine.get_candle_cache, scan_engine.get_rsi_state_store,
+                  scan_engine.get_fetch_flights)
+    for singleton in singletons:
+        singleton.cache_clear()
+    yield stub_server(latency=0.2)
+    for singleton in singletons:
+        singleton.cache_clear()
+
+
+def test_scan_publishes_partial_result_at_deadline(slow_scan, monkeypatch):
+    """
+    6 workers × 5 TF à 0,2s : la première vague (~1s) tient dans l'échéance
+    de 1,6s, la seconde non. Le scan rend la main à l'échéance avec les
+    actifs inachevés en TIMEOUT, sans attendre les workers en cours.
+    """
+    monkeypatch.setattr(scan_engine, 'SCAN_DEADLINE_S', 1.6)
+    job = ScanJob('deadline', scan_engine.ASSETS)
+
+    t0      = time.monotonic()
+    out     = scan_engine._scan_assets(job)
+    elapsed = time.monotonic() - t0
+
+    result = out['results']
+    assert elapsed < scan_engine.SCAN_DEADLINE_S + 1.0
+    assert result.count_status(STATUS_OK) == 6
+    assert result.count_status(STATUS_TIMEOUT) == 2
+    timed_out = result.status == STATUS_TIMEOUT
+    assert np.isnan(result.rsi[timed_out]).all()
+    assert not np.isnan(result.rsi[~timed_out]).any()
+    assert out['stats']['by_tf']['H1']['valid_count'] == 6
+    assert any('Échéance du scan' in warning for warning in job.warnings)
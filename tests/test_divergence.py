@@ -0,0 +1,58 @@
+"""Égalité des détections en lot et glissante (divergence.py) avec l'implémentation par paire."""
+import numpy as np
+import pytest
+
+from divergence import (
+    DIVERGENCE_LOOKBACK, DIVERGENCE_PEAK_DISTANCE, _detect_divergence_reference, detect_divergence_batch,
+    divergence_inputs, rolling_divergence, stack_inputs,
+)
+from indicators import wilder_rsi
+
+
+@pytest.fixture(scope="module")
+def random_inputs(n_instruments=300, n_bars=200):
+    rng     = np.random.default_rng(7)
+    lengths = rng.integers(5, n_bars, n_instruments)
+    lengths[: n_instruments // 2] = n_bars
+    # Marche aléatoire + oscillation : pics et creux fréquents, divergences variées.
+    series  = [
+        1.10 * np.exp(np.cumsum(rng.normal(0, 2e-3, n)) + 0.01 * np.sin(np.arange(n) / rng.uniform(1.5, 4)))
+        for n in lengths
+    ]
+    rsis    = [wilder_rsi(s) for s in series]
+    deltas  = rng.choice([0.0003, 0.001, 0.002], n_instruments)
+    return series, rsis, deltas
+
+
+@pytest.mark.parametrize("distance", (2, 3, 4, 5))
+@pytest.mark.parametrize("lookback", (15, 20, 30, 35, 40))
+def test_batch_matches_per_pair(random_inputs, lookback, distance):
+    series, rsis, deltas = random_inputs
+    reference = np.array([
+        _detect_divergence_reference(s, r, lookback, distance, d)
+        for s, r, d in zip(series, rsis, deltas)
+    ])
+    closes, rsi, valid = stack_inputs(
+        [divergence_inputs(s, r, lookback) for s, r in zip(series, rsis)], lookback
+    )
+    batch = detect_divergence_batch(closes, rsi, valid, deltas, distance)
+    assert np.array_equal(reference, batch), np.flatnonzero(reference != batch)
+
+
+@pytest.mark.parametrize("rounded", (False, True))
+@pytest.mark.parametrize("seed", (3, 4, 5))
+def test_rolling_matches_per_bar_replay(seed, rounded, n_bars=600):
+    # Prix arrondis : pics ex aequo.
+    rng    = np.random.default_rng(seed)
+    closes = 1.10 * np.exp(np.cumsum(rng.normal(0, 2e-3, n_bars)) + 0.01 * np.sin(np.arange(n_bars) / 2.5))
+    if rounded:
+        closes = np.round(closes, 4)
+    rsi    = wilder_rsi(closes)
+    for tf, lookback in DIVERGENCE_LOOKBACK.items():
+        distance  = DIVERGENCE_PEAK_DISTANCE[tf]
+        rolling   = rolling_divergence(closes, rsi, lookback, distance, 0.001)
+        reference = np.array([
+            _detect_divergence_reference(closes[:t + 1], rsi[:t + 1], lookback, distance, 0.001)
+            for t in range(n_bars)
+        ])
+        assert np.array_equal(rolling, reference), (tf, np.flatnonzero(rolling != reference))
@@ -0,0 +1,40 @@
+"""Équivalence du RSI Wilder vectorisé (indicators.py) avec la boucle historique."""
+import numpy as np
+import pandas as pd
+
+from indicators import RSI_PERIOD, RsiState, _wilder_rsi_reference, wilder_rsi, wilder_rsi_matrix
+
+
+def _random_closes(n_instruments=33, n_bars=200, seed=42):
+    rng = np.random.default_rng(seed)
+    return 1.10 * np.exp(np.cumsum(rng.normal(0, 1e-3, (n_instruments, n_bars)), axis=1))
+
+
+def test_edge_cases():
+    assert wilder_rsi(np.full(30, 1.5))[-1] == 50.0
+    assert wilder_rsi(np.linspace(1.0, 2.0, 30))[-1] == 100.0
+    assert wilder_rsi(np.linspace(2.0, 1.0, 30))[-1] == 0.0
+    assert np.isnan(wilder_rsi(np.linspace(1.0, 2.0, RSI_PERIOD))).all()
+
+
+def test_matrix_matches_reference_on_ragged_rows():
+    ragged = _random_closes()
+    ragged[1, :150] = np.nan
+    ragged[2, :190] = np.nan
+    for row_in, row_out in zip(ragged, wilder_rsi_matrix(ragged)):
+        valid_from = int(np.argmax(~np.isnan(row_in)))
+        ref = _wilder_rsi_reference(row_in[valid_from:])
+        got = row_out[valid_from:]
+        assert np.array_equal(np.isnan(ref), np.isnan(got))
+        mask = ~np.isnan(ref)
+        np.testing.assert_allclose(got[mask], ref[mask], rtol=0, atol=1e-9)
+
+
+def test_incremental_state_matches_full_recompute():
+    closes = _random_closes(n_instruments=1)[0]
+    full   = pd.Series(closes, index=pd.date_range("2024-01-01", periods=len(closes), freq="h"))
+    state  = RsiState.from_closes(full.iloc[:-5])
+    assert state.is_contiguous_with(full)
+    state  = state.advance(full.iloc[-5:])
+    np.testing.assert_allclose(state.rsi_series.to_numpy(), wilder_rsi(closes), equal_nan=True)
+    assert not state.is_contiguous_with(full.drop(full.index[-1]).iloc[-50:])
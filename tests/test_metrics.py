@@ -0,0 +1,151 @@
+"""Métriques du scan : exposition Prometheus cohérente, échappement des étiquettes, JSON et endpoint HTTP."""
+import json
+import re
+import urllib.error
+import urllib.request
+
+import pytest
+
+from metrics import ScanSummary, StageMetrics, _escape, http_outcome, scan_metrics_scope, serve_metrics
+
+_SAMPLE = re.compile(r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)\{(?P<labels>.*)\} (?P<value>\S+)$')
+_LABEL  = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def _unescape(value):
+    return re.sub(r'\\(.)', lambda m: '\n' if m.group(1) == 'n' else m.group(1), value)
+
+
+def parse_exposition(text):
+    """Échantillons (nom, étiquettes, valeur) du format texte Prometheus 0.0.4 ; vérifie # TYPE."""
+    samples, types = [], {}
+    for line in text.splitlines():
+        if line.startswith('# TYPE '):
+            _, _, name, kind = line.split(' ')
+            types[name] = kind
+            continue
+        if line.startswith('#') or not line:
+            continue
+        m = _SAMPLE.match(line)
+        assert m, line
+        labels = {k: _unescape(v) for k, v in _LABEL.findall(m['labels'])}
+        samples.append((m['name'], labels, float(m['value'])))
+    return samples, types
+
+
+def _registry():
+    registry = StageMetrics(buckets=(0.1, 0.5, 1.0))
+    for seconds in (0.05, 0.1, 0.3, 0.7, 2.0):
+        registry.observe('http', seconds, 'EUR_USD', 'H1')
+    registry.observe('http', 0.2, 'EUR_USD', 'H1', outcome='server_error')
+    registry.observe('parse', 0.01)
+    registry.count('retry', 'EUR_USD', 'H1', 'server_error')
+    registry.count('retry', 'EUR_USD', 'H1', 'server_error', n=2)
+    return registry
+
+
+def test_histogram_buckets_sum_and_count_are_consistent():
+    samples, types = parse_exposition(_registry().to_prometheus())
+    assert types == {'rsi_screener_stage_seconds': 'histogram', 'rsi_screener_events_total': 'counter'}
+
+    series = {}
+    for name, labels, value in samples:
+        if not name.startswith('rsi_screener_stage_seconds'):
+            continue
+        key   = tuple(sorted((k, v) for k, v in labels.items() if k != 'le'))
+        entry = series.setdefault(key, {'buckets': []})
+        if name.endswith('_bucket'):
+            entry['buckets'].append((labels['le'], value))
+        else:
+            entry[name.rsplit('_', 1)[1]] = value
+    assert len(series) == 3
+
+    for entry in series.values():
+        les    = [le for le, _ in entry['buckets']]
+        counts = [c for _, c in entry['buckets']]
+        assert les == ['0.1', '0.5', '1.0', '+Inf']
+        assert counts == sorted(counts)                  # cumulatifs
+        assert counts[-1] == entry['count']
+
+    ok = series[(('granularity', 'H1'), ('instrument', 'EUR_USD'), ('outcome', 'ok'), ('stage', 'http'))]
+    assert [c for _, c in ok['buckets']] == [2, 3, 4, 5]   # 0.1 tombe dans le bucket le="0.1"
+    assert ok['count'] == 5
+    assert ok['sum'] == pytest.approx(0.05 + 0.1 + 0.3 + 0.7 + 2.0)
+
+    counters = [(labels, value) for name, labels, value in samples if name == 'rsi_screener_events_total']
+    assert counters == [({'event': 'retry', 'instrument': 'EUR_USD', 'granularity': 'H1',
+                          'outcome': 'server_error'}, 3.0)]
+
+
+@pytest.mark.parametrize('raw, escaped', [
+    ('EUR_USD', 'EUR_USD'),
+    ('a"b', 'a\\"b'),
+    ('a\\b', 'a\\\\b'),
+    ('a\nb', 'a\\nb'),
+    ('\\"\n', '\\\\\\"\\n'),
+])
+def test_label_escaping(raw, escaped):
+    assert _escape(raw) == escaped
+    assert _unescape(escaped) == raw
+
+
+def test_escaped_labels_survive_the_exposition():
+    registry = StageMetrics()
+    registry.observe('http', 0.2, 'weird "pair"\\', 'H\n1')
+    samples, _ = parse_exposition(registry.to_prometheus())
+    assert {labels['instrument'] for _, labels, _ in samples} == {'weird "pair"\\'}
+    assert {labels['granularity'] for _, labels, _ in samples} == {'H\n1'}
+
+
+def test_json_snapshot_matches_prometheus():
+    registry = _registry()
+    payload  = json.loads(registry.to_json())
+    assert payload['buckets'] == [0.1, 0.5, 1.0]
+    http_ok = next(h for h in payload['histograms'] if h['stage'] == 'http' and h['outcome'] == 'ok')
+    assert http_ok['cumulative'] == [2, 3, 4, 5] and http_ok['count'] == 5
+    assert payload['counters'] == [{'event': 'retry', 'instrument': 'EUR_USD', 'granularity': 'H1',
+                                    'outcome': 'server_error', 'value': 3}]
+
+
+def test_scan_summary_collects_observations_in_scope():
+    registry, summary = StageMetrics(), ScanSummary()
+    registry.observe('http', 1.0)
+    with scan_metrics_scope(summary):
+        registry.observe('http', 0.5)
+        registry.observe('http', 1.5, outcome='server_error')
+        registry.count('retry', outcome='server_error')
+        with pytest.raises(ValueError):
+            with registry.timer('parse'):
+                raise ValueError
+    registry.observe('http', 2.0)
+    stages = summary.as_dict()['stages']
+    assert stages['http'] == {'calls': 2, 'total_s': 2.0, 'max_s': 1.5,
+                              'outcomes': {'ok': 1, 'server_error': 1}}
+    assert stages['parse']['outcomes'] == {'error': 1}
+    assert summary.as_dict()['events'] == {'retry': {'server_error': 1}}
+
+
+@pytest.mark.parametrize('status, outcome', [
+    (200, 'ok'), (429, 'throttled'), (404, 'client_error'), (503, 'server_error'), (None, 'error'),
+])
+def test_http_outcome(status, outcome):
+    assert http_outcome(status) == outcome
+
+
+def test_serve_metrics_on_ephemeral_port():
+    registry = _registry()
+    server   = serve_metrics(registry, 0)
+    try:
+        base = 'http://%s:%d' % server.server_address[:2]
+        with urllib.request.urlopen(base + '/metrics', timeout=5) as resp:
+            assert resp.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            assert resp.read().decode('utf-8') == registry.to_prometheus()
+        with urllib.request.urlopen(base + '/metrics.json?x=1', timeout=5) as resp:
+            assert resp.headers['Content-Type'] == 'application/json'
+            assert json.loads(resp.read()) == registry.snapshot()
+        with pytest.raises(urllib.error.HTTPError) as err:
+            urllib.request.urlopen(base + '/other', timeout=5)
+        assert err.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
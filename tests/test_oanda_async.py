@@ -0,0 +1,54 @@
+"""Backend asyncio (oanda_async.py) : mêmes fenêtres que le chemin oandapyV20, retries 5xx / 429."""
+import asyncio
+import itertools
+import types
+
+import pandas as pd
+import pytest
+
+import oanda_stub
+import scan_engine
+from oanda_async import AsyncOandaFetcher, _full_plan, fetch_plans
+
+COUNTS = {'H1': 200, 'D': 150, 'M': 60}
+PAIRS  = ('EUR/USD', 'USD/JPY', 'XAU/USD')
+
+
+def _fetch_async(server, cells, **kwargs):
+    async def _run():
+        async with AsyncOandaFetcher("stub", base_url=server.base_url, rate_per_sec=0, **kwargs) as fetcher:
+            plans = {(p, tf): (p, tf, _full_plan(tf, COUNTS[tf])) for p, tf in cells}
+            return await fetch_plans(fetcher, plans), fetcher
+    return asyncio.run(_run())
+
+
+def _scripted_draws(monkeypatch, *draws):
+    """Tirages du stub : les premiers imposés, puis jamais d'erreur."""
+    values = itertools.chain(draws, itertools.repeat(1.0))
+    monkeypatch.setattr(oanda_stub, 'random', types.SimpleNamespace(random=lambda: next(values)))
+
+
+def test_async_frames_match_sync_path(stub_server):
+    server = stub_server()
+    cells  = [(pair, tf) for pair in PAIRS for tf in COUNTS]
+    sync   = {
+        (pair, tf): scan_engine._request_candles(pair, tf, {'granularity': tf, 'count': COUNTS[tf]})[0]
+        for pair, tf in cells
+    }
+    fetched, fetcher = _fetch_async(server, cells)
+    assert fetcher.requests == len(cells) and fetcher.retries == 0
+    for cell in cells:
+        assert len(sync[cell]) == COUNTS[cell[1]] - 1
+        pd.testing.assert_frame_equal(fetched[cell], sync[cell])
+
+
+@pytest.mark.parametrize("failure", ({'error_rate': 1.0}, {'throttle_rate': 1.0, 'retry_after': 0}))
+def test_transient_error_is_retried(stub_server, monkeypatch, failure):
+    stub_server()
+    expected, _ = scan_engine._request_candles('EUR/USD', 'H1', {'granularity': 'H1', 'count': 200})
+
+    failing = stub_server(**failure)
+    _scripted_draws(monkeypatch, 0.0)
+    fetched, fetcher = _fetch_async(failing, [('EUR/USD', 'H1')])
+    assert fetcher.retries == 1 and failing.request_count == 2
+    pd.testing.assert_frame_equal(fetched[('EUR/USD', 'H1')], expected)
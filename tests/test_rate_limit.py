@@ -0,0 +1,85 @@
+"""Token bucket GCRA (rate_limit.py) : réservations, adaptation aux 429, Retry-After."""
+import pytest
+
+from rate_limit import TokenBucket, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2", 2.0),
+    ("0.5", 0.5),
+    ("0", 0.0),
+    ("Wed, 21 Oct 2015 07:28:10 GMT", 10.0),
+    ("Wed, 21 Oct 2015 07:28:10 -0000", 10.0),
+    ("Wed, 21 Oct 2015 07:27:00 GMT", 0.0),      # date passée
+    ("-1", None),
+    ("soon", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_retry_after(value, expected):
+    # 1445412480 = Wed, 21 Oct 2015 07:28:00 GMT
+    assert parse_retry_after(value, now=1445412480) == expected
+
+
+def test_reservations_follow_rate_after_burst():
+    clock  = FakeClock()
+    bucket = TokenBucket(10, burst=2, clock=clock)
+    waits  = [bucket.reserve() for _ in range(4)]
+    assert waits == pytest.approx([0.0, 0.0, 0.1, 0.2])
+    clock.now += 0.2
+    assert bucket.reserve() == pytest.approx(0.1)
+    assert bucket.stats()['delayed'] == 3 and bucket.stats()['requests'] == 5
+
+
+def test_release_returns_unused_token():
+    clock  = FakeClock()
+    bucket = TokenBucket(10, burst=1, clock=clock)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1)
+    bucket.release()   # départ abandonné pendant l'attente
+    assert bucket.reserve() == pytest.approx(0.1)
+    bucket.release()
+    bucket.release()
+    bucket.release()   # jamais au-delà de la capacité
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1)
+
+
+def test_throttle_halves_rate_and_pauses_departures():
+    clock  = FakeClock()
+    bucket = TokenBucket(10, burst=5, recovery_s=60, clock=clock)
+    bucket.observe(200, "30")   # seul un 429 est pris en compte
+    assert bucket.stats()['throttled'] == 0
+    bucket.observe(429, "2")
+    stats = bucket.stats()
+    assert stats['rate'] == 5.0 and stats['throttled'] == 1 and stats['paused_for_s'] == 2.0
+    assert bucket.reserve() == pytest.approx(2.0)
+    clock.now += 2.0
+    assert bucket.reserve() == 0.0
+
+
+def test_rate_recovers_linearly_after_pause():
+    clock  = FakeClock()
+    bucket = TokenBucket(10, burst=5, recovery_s=60, clock=clock)
+    bucket.observe(429, "2")
+    clock.now += 2.0 + 12.0   # la remontée ne commence qu'après la pause
+    assert bucket.stats()['rate'] == pytest.approx(7.0)
+    clock.now += 60.0
+    assert bucket.stats()['rate'] == 10.0
+
+
+def test_repeated_throttles_stop_at_min_rate():
+    clock  = FakeClock()
+    bucket = TokenBucket(10, burst=5, min_rate=2, clock=clock)
+    for _ in range(5):
+        bucket.observe(429)
+    stats = bucket.stats()
+    assert stats['rate'] == 2.0 and stats['paused_for_s'] == 0.0 and stats['throttled'] == 5
@@ -0,0 +1,98 @@
+"""Tableau HTML mémoïsé : lignes en cache identiques au rendu direct, clé invalidée par le contenu."""
+import numpy as np
+import pytest
+
+import results_table
+from results_table import _TABLE_HEAD, _TABLE_TAIL, _row_html, results_table_html, scan_table_html
+from scan_engine import TIMEFRAMES_DISPLAY
+from scan_result import DIV_BEAR, DIV_BULL, STATUS_ERROR, STATUS_OK, ScanResult
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    _row_html.cache_clear()
+    results_table._TABLES.clear()
+    yield
+    _row_html.cache_clear()
+    results_table._TABLES.clear()
+
+
+def _result(seed, n_pairs=12):
+    rng    = np.random.default_rng(seed)
+    result = ScanResult([f'P{i:02d}/USD' for i in range(n_pairs)] + ['<b>&</b>'], TIMEFRAMES_DISPLAY)
+    for i in range(len(result)):
+        rsi = np.where(rng.random(len(TIMEFRAMES_DISPLAY)) < 0.2, np.nan, rng.uniform(0, 100, len(TIMEFRAMES_DISPLAY)))
+        div = rng.choice([0, DIV_BULL, DIV_BEAR], size=len(TIMEFRAMES_DISPLAY)).astype(np.int8)
+        result.set_row(i, rsi, div, int(rng.integers(4)))
+    return result
+
+
+def _uncached_html(result):
+    """Rendu direct, sans passer par le cache des lignes."""
+    rows = [
+        _row_html.__wrapped__(pair, status, tuple(None if v != v else v for v in rsi_row), tuple(div_row))
+        for pair, status, rsi_row, div_row in zip(
+            result.pairs, result.status.tolist(), result.rsi.tolist(), result.divergence.tolist()
+        )
+    ]
+    return _TABLE_HEAD + ''.join(rows) + _TABLE_TAIL
+
+
+def test_cached_rows_render_like_uncached():
+    result = _result(0)
+    first  = results_table_html(result)
+    assert _row_html.cache_info().misses == len(result)
+    second = results_table_html(result.copy())
+    assert _row_html.cache_info().hits == len(result)
+    assert first == second == _uncached_html(result)
+    assert '&lt;b&gt;&amp;&lt;/b&gt;' in first and '<b>&</b>' not in first
+
+
+def test_nan_cells_share_one_key():
+    """RSI NaN passé en None : deux lignes NaN identiques tombent sur la même entrée."""
+    result = ScanResult(['EUR/USD'], TIMEFRAMES_DISPLAY)
+    results_table_html(result)
+    results_table_html(result.copy())
+    assert _row_html.cache_info().hits == 1
+    assert 'N/A' in results_table_html(result)
+
+
+@pytest.mark.parametrize('change', ['rsi', 'divergence', 'status'])
+def test_row_change_invalidates_only_that_row(change):
+    result = _result(1)
+    before = results_table_html(result)
+
+    changed = result.copy()
+    if change == 'rsi':
+        changed.rsi[3, 0] = 10.0 if changed.rsi[3, 0] != 10.0 else 90.0
+    elif change == 'divergence':
+        changed.divergence[3, 2] = DIV_BULL if changed.divergence[3, 2] != DIV_BULL else DIV_BEAR
+    else:
+        changed.status[3] = STATUS_ERROR if changed.status[3] != STATUS_ERROR else STATUS_OK
+    info0 = _row_html.cache_info()
+    after = results_table_html(changed)
+    info1 = _row_html.cache_info()
+
+    assert info1.misses - info0.misses == 1
+    assert info1.hits - info0.hits == len(result) - 1
+    assert after != before
+    assert after == _uncached_html(changed)
+
+
+def test_pending_rows_until_done():
+    result = _result(2, n_pairs=3)
+    done   = np.array([True, False, True, False])
+    html   = results_table_html(result, done)
+    assert html.count('⏳') == 2
+    assert html.count('<tr>') == len(result) + 1
+
+
+def test_scan_table_built_once_per_scan():
+    result = _result(3)
+    first  = scan_table_html('scan-a', result)
+    stats0 = results_table.table_cache_stats()
+    assert scan_table_html('scan-a', result) is first
+    stats1 = results_table.table_cache_stats()
+    assert stats1['builds'] == stats0['builds']
+    assert stats1['table_hits'] == stats0['table_hits'] + 1
+    assert first == _uncached_html(result)
@@ -0,0 +1,114 @@
+"""ScanCoordinator : un seul scan pour N demandes concurrentes, réutilisation pendant SCAN_FRESHNESS_S."""
+import concurrent.futures
+import threading
+import time
+import types
+
+import pytest
+
+import scan_coordinator
+from scan_coordinator import ScanCoordinator
+
+N = 8
+
+
+def _wait_for(predicate, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end, "timeout"
+        time.sleep(0.005)
+
+
+class CountingRunner:
+    """Corps de scan factice : compte ses exécutions, bloqué jusqu'à release()."""
+
+    def __init__(self, error=None):
+        self.calls   = 0
+        self.error   = error
+        self.started = threading.Event()
+        self._go     = threading.Event()
+
+    def release(self):
+        self._go.set()
+
+    def __call__(self, job):
+        self.calls += 1
+        self.started.set()
+        self._go.wait(5)
+        if self.error is not None:
+            raise self.error
+        return {'scan_id': job.scan_id}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Horloge murale du module, avancée à la main (âge des scans terminés)."""
+    fake = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(scan_coordinator, 'time', types.SimpleNamespace(time=lambda: fake.now))
+    return fake
+
+
+def _concurrent_requests(coordinator, runner, universe=('EUR/USD',)):
+    with concurrent.futures.ThreadPoolExecutor(N) as executor:
+        futures = [executor.submit(coordinator.request, universe, runner) for _ in range(N)]
+        jobs    = [future.result(5) for future in futures]
+    runner.release()
+    assert jobs[0].wait(5)
+    return jobs
+
+
+def test_concurrent_requests_share_one_scan(clock):
+    coordinator, runner = ScanCoordinator(freshness_s=60), CountingRunner()
+    jobs = _concurrent_requests(coordinator, runner)
+    assert runner.calls == 1
+    assert all(job is jobs[0] for job in jobs)
+    assert jobs[0].result == {'scan_id': 1} and jobs[0].attached == N
+    assert coordinator.stats() == {'running': 0, 'started': 1, 'attached': N - 1, 'served_fresh': 0}
+
+
+def test_scan_error_reaches_every_session_and_is_not_reused(clock):
+    coordinator, runner = ScanCoordinator(freshness_s=60), CountingRunner(error=RuntimeError("boom"))
+    jobs = _concurrent_requests(coordinator, runner)
+    assert runner.calls == 1
+    assert all(job.error == "boom" and job.result is None for job in jobs)
+    assert coordinator.latest(('EUR/USD',)) is None
+
+    retry = CountingRunner()
+    retry.release()
+    assert coordinator.request(('EUR/USD',), retry).wait(5)
+    assert retry.calls == 1
+
+
+def test_fresh_result_is_reused_until_it_expires(clock):
+    coordinator, runner = ScanCoordinator(freshness_s=60), CountingRunner()
+    runner.release()
+    first = coordinator.request(('EUR/USD',), runner)
+    assert first.wait(5)
+    _wait_for(lambda: coordinator.stats()['running'] == 0)
+
+    clock.now += 59
+    assert coordinator.request(('EUR/USD',), runner) is first
+    assert coordinator.request(('GBP/USD',), runner) is not first   # autre univers
+    clock.now += 1
+    second = coordinator.request(('EUR/USD',), runner)
+    assert second is not first and second.wait(5)
+    assert runner.calls == 3 and coordinator.stats()['served_fresh'] == 1
+
+
+def test_published_snapshots_are_versioned_for_attached_sessions(clock):
+    coordinator, published = ScanCoordinator(), threading.Event()
+
+    def runner(job):
+        assert job.partial() == (0, None)
+        job.publish(['EUR/USD'])
+        clock.now += 1
+        job.publish(['EUR/USD', 'GBP/USD'])
+        published.set()
+        job.report(2, 2, "done")
+        return {'rows': 2}
+
+    job = coordinator.request(('EUR/USD', 'GBP/USD'), runner)
+    assert published.wait(5) and job.wait(5)
+    assert job.partial() == (2, ['EUR/USD', 'GBP/USD'])
+    assert job.first_partial_at == 1000.0     # première publication seulement
+    assert job.progress() == (2, 2, "done") and job.result == {'rows': 2}
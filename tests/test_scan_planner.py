@@ -0,0 +1,73 @@
+"""Planificateur (scan_planner.py) : clôtures OANDA (17h New York, ancre vendredi), week-end, heure d'été."""
+import pandas as pd
+import pytest
+
+from scan_planner import candle_end, cell_is_due, market_closed, next_close_time, next_reopen
+
+
+def ny(local):
+    return pd.Timestamp(local, tz='America/New_York').tz_convert('UTC')
+
+
+def utc(value):
+    return pd.Timestamp(value, tz='UTC')
+
+
+# Passage à l'heure d'été : dimanche 10/03/2024 ; retour à l'heure d'hiver : dimanche 03/11/2024.
+@pytest.mark.parametrize("granularity, last_start, expected", [
+    # Clôture du vendredi 08/03 (EST, UTC-5)
+    ('H1', '2024-03-08 15:00', '2024-03-08 22:00'),   # dernière H1 de la semaine
+    ('H4', '2024-03-08 09:00', '2024-03-08 22:00'),   # dernière H4 de la semaine
+    # Réouverture du dimanche 10/03 à 17h, déjà en EDT (UTC-4)
+    ('H1', '2024-03-08 16:00', '2024-03-10 22:00'),
+    ('H4', '2024-03-08 13:00', '2024-03-11 01:00'),
+    ('D',  '2024-03-07 17:00', '2024-03-11 21:00'),
+    ('W',  '2024-03-01 17:00', '2024-03-15 21:00'),
+    ('H4', '2024-03-10 17:00', '2024-03-11 05:00'),   # première H4 après la réouverture
+    ('M',  '2024-01-31 17:00', '2024-03-31 21:00'),   # février clos jeudi, mars finit en EDT
+    # Retour à l'heure d'hiver : réouverture du dimanche 03/11 en EST
+    ('H1', '2024-11-01 16:00', '2024-11-03 23:00'),
+    ('D',  '2024-11-01 17:00', '2024-11-04 22:00'),
+    ('W',  '2024-10-25 17:00', '2024-11-08 22:00'),
+])
+def test_next_close_time(granularity, last_start, expected):
+    assert next_close_time(ny(last_start), granularity) == utc(expected)
+
+
+@pytest.mark.parametrize("local, closed", [
+    ('2024-03-08 16:59', False),
+    ('2024-03-08 17:00', True),
+    ('2024-03-09 12:00', True),
+    ('2024-03-10 16:59', True),
+    ('2024-03-10 17:00', False),
+    ('2024-03-11 03:00', False),
+])
+def test_market_closed(local, closed):
+    assert market_closed(ny(local)) is closed
+
+
+def test_next_reopen_crosses_dst():
+    assert next_reopen(ny('2024-03-08 17:00')) == utc('2024-03-10 21:00')
+    assert next_reopen(ny('2024-11-02 09:00')) == utc('2024-11-03 22:00')
+
+
+def test_candle_end_of_daily_bar_opened_before_dst_switch():
+    # Jour de trading de 23 h : 17h EST → 17h EDT.
+    assert candle_end(ny('2024-03-09 17:00'), 'D') == utc('2024-03-10 21:00')
+
+
+@pytest.mark.parametrize("granularity, last_start", [
+    ('H1', '2024-03-08 16:00'),
+    ('H4', '2024-03-08 13:00'),
+    ('D',  '2024-03-07 17:00'),
+])
+@pytest.mark.parametrize("now", ['2024-03-08 17:30', '2024-03-09 12:00', '2024-03-10 16:30'])
+def test_cell_not_due_while_market_closed(granularity, last_start, now):
+    assert not cell_is_due(ny(last_start), granularity, ny(now))
+
+
+def test_cell_is_due_once_next_bar_can_close():
+    last = ny('2024-03-08 16:00')
+    assert not cell_is_due(last, 'H1', ny('2024-03-10 17:30'))
+    assert cell_is_due(last, 'H1', ny('2024-03-10 18:00'))
+    assert cell_is_due(None, 'H1', ny('2024-03-09 12:00'))
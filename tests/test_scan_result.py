@@ -0,0 +1,148 @@
+"""ScanResult : parité des statistiques avec les lignes imbriquées historiques, aller-retour des exports."""
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scan_engine import (
+    RSI_OVERBOUGHT, RSI_OVERSOLD, TIMEFRAMES_DISPLAY, TIMEFRAMES_FETCH_KEYS,
+    compute_statistics, create_csv_export, create_json_export,
+)
+from scan_result import DIV_CODES, DIV_LABELS, STATUS_LABELS, ScanResult
+
+SCAN_TS = pd.Timestamp('2024-06-05 12:30')
+
+
+def _legacy_statistics(results_data):
+    """compute_statistics d'avant ScanResult (une ligne = dict imbriqué par TF), à l'identique."""
+    global_rsi_values = []
+    stats_by_tf = {}
+
+    for tf in TIMEFRAMES_DISPLAY:
+        tf_data   = [row.get(tf, {}) for row in results_data]
+        valid_rsi = [d.get('rsi') for d in tf_data if pd.notna(d.get('rsi'))]
+
+        stats_by_tf[tf] = {
+            'extreme_oversold':   sum(1 for x in valid_rsi if x <= 20),
+            'oversold':           sum(1 for x in valid_rsi if 20 < x <= RSI_OVERSOLD),
+            'extreme_overbought': sum(1 for x in valid_rsi if x >= 80),
+            'overbought':         sum(1 for x in valid_rsi if RSI_OVERBOUGHT <= x < 80),
+            'bull_div':           sum(1 for d in tf_data if d.get('divergence') == 'Haussière'),
+            'bear_div':           sum(1 for d in tf_data if d.get('divergence') == 'Baissière'),
+            'valid_count':        len(valid_rsi),
+        }
+        global_rsi_values.extend(valid_rsi)
+
+    avg_global_rsi = float(np.mean(global_rsi_values)) if global_rsi_values else 50.0
+    return {
+        'by_tf':          stats_by_tf,
+        'avg_rsi':        avg_global_rsi,
+        'total_bull_div': sum(s['bull_div'] for s in stats_by_tf.values()),
+        'total_bear_div': sum(s['bear_div'] for s in stats_by_tf.values()),
+        'extreme_count':  sum(s['extreme_oversold'] + s['extreme_overbought'] for s in stats_by_tf.values()),
+    }
+
+
+def _scan(seed, n_pairs=40):
+    """Même scan aléatoire sous les deux formes : lignes imbriquées et ScanResult."""
+    rng    = np.random.default_rng(seed)
+    pairs  = [f'P{i:02d}/USD' for i in range(n_pairs)]
+    result = ScanResult(pairs, TIMEFRAMES_DISPLAY)
+    rows   = []
+    for i, pair in enumerate(pairs):
+        # Valeurs exactes aux seuils incluses : les bornes des buckets comptent.
+        rsi = rng.choice([20.0, 30.0, 70.0, 80.0, np.nan], size=len(TIMEFRAMES_DISPLAY))
+        rsi = np.where(rng.random(len(rsi)) < 0.5, rng.uniform(0, 100, len(rsi)), rsi)
+        div = rng.choice(list(DIV_LABELS), size=len(TIMEFRAMES_DISPLAY)).astype(np.int8)
+        status = int(rng.integers(len(STATUS_LABELS)))
+        result.set_row(i, rsi, div, status)
+        row = {'Devises': pair, 'Status': STATUS_LABELS[status]}
+        for tf, value, code in zip(TIMEFRAMES_DISPLAY, rsi.tolist(), div.tolist()):
+            row[tf] = {'rsi': value, 'divergence': DIV_LABELS[code]}
+        rows.append(row)
+    return rows, result
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_statistics_match_legacy_nested_rows(seed):
+    """Chaque compteur par TF, les totaux et le RSI moyen sont identiques aux lignes imbriquées."""
+    rows, result = _scan(seed)
+    stats    = compute_statistics(result)
+    expected = _legacy_statistics(rows)
+    assert stats['by_tf'] == expected['by_tf']
+    for key in ('total_bull_div', 'total_bear_div', 'extreme_count'):
+        assert stats[key] == expected[key]
+        assert type(stats[key]) is int
+    assert stats['avg_rsi'] == pytest.approx(expected['avg_rsi'], rel=1e-12)
+
+
+def test_statistics_of_empty_and_all_nan_scans():
+    """Sans RSI valide : compteurs nuls, RSI moyen par défaut (50) et biais neutre."""
+    for result in (ScanResult([], TIMEFRAMES_DISPLAY), ScanResult(['EUR/USD', 'USD/JPY'], TIMEFRAMES_DISPLAY)):
+        stats = compute_statistics(result)
+        assert stats['avg_rsi'] == 50.0
+        assert stats['market_bias'] == 'NEUTRE / INCERTAIN'
+        assert all(v == 0 for s in stats['by_tf'].values() for v in s.values())
+
+
+def test_csv_export_round_trip():
+    """Le CSV relu redonne paires, statuts, RSI arrondis et libellés de divergence du ScanResult."""
+    _, result = _scan(7, n_pairs=12)
+    df = pd.read_csv(io.BytesIO(create_csv_export(result)), encoding='utf-8-sig', keep_default_na=False)
+    assert list(df.columns) == ['Devises', 'Status'] + [
+        f'{kind}_{tf}' for tf in TIMEFRAMES_DISPLAY for kind in ('RSI', 'DIV')
+    ]
+    assert df['Devises'].tolist() == result.pairs
+    assert df['Status'].tolist() == result.status_labels()
+    for j, tf in enumerate(TIMEFRAMES_DISPLAY):
+        rsi = pd.to_numeric(df[f'RSI_{tf}'].replace('', np.nan)).to_numpy()
+        np.testing.assert_allclose(rsi, result.rsi[:, j].round(2), equal_nan=True)
+        assert [DIV_CODES[label] for label in df[f'DIV_{tf}']] == result.divergence[:, j].tolist()
+
+
+def test_json_export_round_trip():
+    """Le JSON relu redonne chaque cellule du ScanResult et les agrégats de compute_statistics."""
+    _, result = _scan(11, n_pairs=12)
+    stats   = compute_statistics(result)
+    payload = json.loads(create_json_export(result, stats, SCAN_TS))
+    enum_codes = {'BULL': 1, 'BEAR': -1, 'NONE': 0}
+
+    assert payload['meta']['instruments_count'] == len(result)
+    assert [inst['pair'] for inst in payload['instruments']] == result.pairs
+    assert [inst['status'] for inst in payload['instruments']] == result.status_labels()
+    for i, inst in enumerate(payload['instruments']):
+        for j, key in enumerate(TIMEFRAMES_FETCH_KEYS):
+            cell = inst['timeframes'][key]
+            expected = result.rsi[i, j]
+            assert (cell['rsi'] is None) if np.isnan(expected) else cell['rsi'] == round(expected, 2)
+            assert enum_codes[cell['div']] == result.divergence[i, j]
+
+    summary = payload['summary']
+    assert summary['avg_rsi'] == round(stats['avg_rsi'], 2)
+    assert summary['total_div_bull'] == stats['total_bull_div']
+    assert summary['total_div_bear'] == stats['total_bear_div']
+    assert summary['total_extremes'] == stats['extreme_count']
+    for tf, key in zip(TIMEFRAMES_DISPLAY, TIMEFRAMES_FETCH_KEYS):
+        s = stats['by_tf'][tf]
+        assert summary['by_timeframe'][key] == {
+            'extreme_oversold':   s['extreme_oversold'],
+            'oversold':           s['oversold'],
+            'overbought':         s['overbought'],
+            'extreme_overbought': s['extreme_overbought'],
+            'div_bull':           s['bull_div'],
+            'div_bear':           s['bear_div'],
+            'valid_count':        s['valid_count'],
+        }
+
+
+def test_take_keeps_rows_aligned():
+    """take() garde ensemble paire, RSI, divergences et statut de chaque ligne conservée."""
+    rows, result = _scan(3, n_pairs=10)
+    mask   = [i % 3 == 0 for i in range(len(result))]
+    subset = result.take(mask)
+    kept   = [row for row, keep in zip(rows, mask) if keep]
+    assert subset.pairs == [row['Devises'] for row in kept]
+    assert subset.status_labels() == [row['Status'] for row in kept]
+    assert compute_statistics(subset)['by_tf'] == _legacy_statistics(kept)['by_tf']
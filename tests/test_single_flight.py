@@ -0,0 +1,83 @@
+"""SingleFlight : N appelants concurrents d'une même clé → un seul appel, même issue pour tous."""
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+N = 8
+
+
+def _wait_for(predicate, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end, "timeout"
+        time.sleep(0.005)
+
+
+def _concurrent_calls(flight, fn, key='k'):
+    """Lance N appels de `key`, libère le meneur une fois les N-1 suiveurs en attente."""
+    release = threading.Event()
+
+    def blocking():
+        release.wait(5)
+        return fn()
+
+    with concurrent.futures.ThreadPoolExecutor(N) as executor:
+        futures = [executor.submit(flight.do, key, blocking) for _ in range(N)]
+        _wait_for(lambda: flight.stats()['deduplicated'] == N - 1)
+        release.set()
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result(5))
+            except Exception as e:
+                outcomes.append(e)
+    return outcomes
+
+
+def test_concurrent_callers_share_one_call():
+    flight, calls = SingleFlight(), []
+    outcomes = _concurrent_calls(flight, lambda: calls.append(1) or object())
+    assert len(calls) == 1
+    assert all(outcome is outcomes[0] for outcome in outcomes)
+    assert flight.stats() == {'calls': N, 'executed': 1, 'deduplicated': N - 1, 'inflight': 0}
+
+
+def test_leader_exception_reaches_every_caller():
+    flight, calls = SingleFlight(), []
+
+    def failing():
+        calls.append(1)
+        raise ValueError("OANDA down")
+
+    outcomes = _concurrent_calls(flight, failing)
+    assert len(calls) == 1
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert flight.stats()['inflight'] == 0
+
+
+def test_nothing_is_kept_after_the_call():
+    flight, calls = SingleFlight(), []
+    for _ in range(3):
+        flight.do('k', lambda: calls.append(1))
+    assert len(calls) == 3 and flight.stats()['deduplicated'] == 0
+
+
+def test_distinct_keys_are_not_coalesced():
+    flight = SingleFlight()
+    assert [flight.do(key, lambda key=key: key * 2) for key in (1, 2, 3)] == [2, 4, 6]
+    assert flight.stats()['executed'] == 3
+
+
+def test_follower_timeout():
+    flight, release = SingleFlight(), threading.Event()
+    leader = threading.Thread(target=flight.do, args=('k', lambda: release.wait(5)))
+    leader.start()
+    _wait_for(lambda: flight.stats()['inflight'] == 1)
+    with pytest.raises(concurrent.futures.TimeoutError):
+        flight.do('k', lambda: None, timeout=0.05)
+    release.set()
+    leader.join(5)